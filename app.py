@@ -1,10 +1,87 @@
 from __future__ import annotations
 
-from src.bot import OptionsBot
+import argparse
+import logging
+import signal
+import tempfile
+from types import FrameType
+from typing import TYPE_CHECKING
+
+from pydantic import ValidationError
+
 from src.schemas import load_alpaca_env, load_settings, load_telegram_env
 from src.utils import setup_logger
 
+if TYPE_CHECKING:
+    from src.bot import OptionsBot
+
+logger = logging.getLogger()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the options bot.")
+    parser.add_argument("--settings", default="settings.yaml")
+    parser.add_argument(
+        "--check-config",
+        action="store_true",
+        help="validate the settings and environment, then exit without touching the network",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        help="record every Alpaca and Telegram exchange to a cassette for "
+        "benchmarks/bench_replay.py; fills are polled and the cache starts empty, so the "
+        "session can be replayed without either",
+    )
+    return parser.parse_args()
+
+
+def stop_on_signals(bot: OptionsBot) -> None:
+    """Shut the scheduler down on SIGTERM (`docker stop`) and SIGINT, so that `run` returns
+    through `OptionsBot.close`. As PID 1 of its container, Python would ignore SIGTERM."""
+
+    def stop(signum: int, frame: FrameType | None) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+        if not bot.scheduler.running:
+            raise SystemExit(1)
+        bot.scheduler.shutdown(wait=False)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+
 if __name__ == "__main__":
-    setup_logger()
-    settings = load_settings()
-    OptionsBot(settings, load_alpaca_env(), load_telegram_env()).run()
+    args = parse_args()
+    try:
+        settings = load_settings(args.settings)
+    except ValidationError as e:
+        raise SystemExit(f"Invalid {args.settings}:\n{e}")
+    alpaca_env, telegram_env = load_alpaca_env(), load_telegram_env()
+    if args.check_config:
+        print(
+            f"{args.settings} OK: {', '.join(settings.symbols)}, "
+            f"trade '{settings.trade_options_schedule}', "
+            f"check '{settings.check_value_schedule}' ({settings.timezone})"
+        )
+        raise SystemExit(0)
+
+    setup_logger(json_format=settings.log_format == "json")
+    from src.bot import OptionsBot  # the SDKs are only imported once there's trading to do
+
+    if args.record is None:
+        bot = OptionsBot(settings, alpaca_env, telegram_env, settings_path=args.settings)
+        stop_on_signals(bot)
+        bot.run()
+    else:
+        from src.cassette import CassetteRecorder
+
+        settings = settings.model_copy(
+            update={"stream_fills": False, "cache_dir": tempfile.mkdtemp(prefix="options-bot-")}
+        )
+        recorder = CassetteRecorder(args.record)
+        try:  # without `settings_path`, so no reloads undo the above
+            bot = OptionsBot(settings, alpaca_env, telegram_env, wrap_transport=recorder.transport)
+            stop_on_signals(bot)
+            bot.run()
+        finally:
+            recorder.close()
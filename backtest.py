@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from src.backtest import PriceSeries, margin_grid, margin_range, run_backtest
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Backtest the wheel over a grid of call/put option margins."
+    )
+    data = parser.add_mutually_exclusive_group()
+    data.add_argument("--csv", help="daily bars with `date` and `close` (and optional `open`)")
+    data.add_argument("--years", type=float, default=20, help="years of synthetic GBM prices")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic prices")
+    parser.add_argument("--call-margins", type=margin_range, default=margin_range("0:0.2:32"))
+    parser.add_argument("--put-margins", type=margin_range, default=margin_range("0:0.2:32"))
+    parser.add_argument("--volatility", type=float, default=0.25, help="implied, annualized")
+    parser.add_argument("--rate", type=float, default=0.04, help="risk-free rate")
+    parser.add_argument("--cash", type=float, default=100_000.0)
+    parser.add_argument("--strike-step", type=float, default=1.0)
+    parser.add_argument("--selection", choices=["above", "below", "nearest"], default="above")
+    parser.add_argument("--fee", type=float, default=0.0, help="per contract")
+    parser.add_argument("--target-dte", type=int, help="expire closest to this many days out")
+    parser.add_argument("--rank-by", choices=["cagr", "max_drawdown"], default="cagr")
+    parser.add_argument("--top", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.csv:
+        prices = PriceSeries.from_csv(args.csv)
+    else:
+        prices = PriceSeries.synthetic(args.years, seed=args.seed)
+    call_margins, put_margins = margin_grid(args.call_margins, args.put_margins)
+
+    start = time.perf_counter()
+    result = run_backtest(
+        prices,
+        call_margins,
+        put_margins,
+        volatility=args.volatility,
+        rate=args.rate,
+        initial_cash=args.cash,
+        strike_step=args.strike_step,
+        selection=args.selection,
+        fee_per_contract=args.fee,
+        target_dte=args.target_dte,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{len(call_margins)} configs over {len(result.expiry_dates)} cycles "
+        f"({prices.dates[0]} to {prices.dates[-1]}) in {elapsed:.2f}s, "
+        f"buy & hold {prices.close[-1] / prices.close[0] - 1:+.1%}"
+    )
+    print(f"{'call':>7} {'put':>7} {'return':>9} {'cagr':>7} {'max dd':>7} {'assigned':>8}")
+    for i in result.ranked(args.rank_by)[: args.top]:
+        print(
+            f"{result.call_margins[i]:7.2%} {result.put_margins[i]:7.2%} "
+            f"{result.total_return[i]:+9.1%} {result.cagr[i]:+7.2%} "
+            f"{result.max_drawdown[i]:7.1%} {result.assignments[i]:8d}"
+        )
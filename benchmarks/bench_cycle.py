@@ -0,0 +1,135 @@
+"""End-to-end latency of one trade cycle against a local fake of the Alpaca REST API.
+
+Compares the previous call pattern (alpaca-py's blocking clients, one request after
+another) with `AlpacaClient`, which shares one pooled session and prefetches concurrently.
+
+    python -m benchmarks.bench_cycle --tickers 4 --latency 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.requests import StockLatestTradeRequest
+from alpaca.trading.client import TradingClient
+from alpaca.trading.enums import ContractType, OrderSide, TimeInForce
+from alpaca.trading.requests import GetOptionContractsRequest, MarketOrderRequest
+
+from src.alpaca_client import AlpacaClient
+from src.bot import OptionsBot
+from src.schemas import AlpacaEnv, Settings
+from tests.fakes import FakeAlpacaServer
+
+PRICES = {
+    "AAPL": 200.0,
+    "SPY": 500.0,
+    "QQQ": 450.0,
+    "MSFT": 400.0,
+    "NVDA": 120.0,
+    "AMZN": 180.0,
+    "META": 500.0,
+    "TSLA": 250.0,
+}
+SYMBOLS = list(PRICES)
+
+
+class _RaisingTelegram:
+    """The bot only messages Telegram on errors when `telegram=False`, fail loudly."""
+
+    def send_message(self, msg: str) -> None:
+        raise RuntimeError(msg)
+
+
+def sequential_cycle(url: str, tickers: list[str]) -> None:
+    """The requests of a cold cycle before the async client, one blocking call at a time."""
+    client = TradingClient("fake", "fake", url_override=url)
+    data_client = StockHistoricalDataClient("fake", "fake", url_override=url)
+    today = date.today()
+    friday = today + timedelta(days=(4 - today.weekday()) % 7 or 7)
+    client.get_account()
+    client.get_all_positions()
+    prices = data_client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=tickers))
+    for ticker in tickers:
+        client.get_option_contracts(
+            GetOptionContractsRequest(
+                underlying_symbols=[ticker],
+                expiration_date_gte=today,
+                expiration_date_lte=today + timedelta(days=60),
+                type=ContractType.CALL,
+                limit=10000,
+            )
+        )
+        chain = client.get_option_contracts(
+            GetOptionContractsRequest(
+                underlying_symbols=[ticker],
+                expiration_date=friday,
+                type=ContractType.PUT,
+                limit=10000,
+            )
+        )
+        strike = 0.95 * prices[ticker].price
+        contract = min(chain.option_contracts, key=lambda c: abs(c.strike_price - strike))
+        order = client.submit_order(
+            MarketOrderRequest(
+                symbol=contract.symbol, qty=1, side=OrderSide.SELL, time_in_force=TimeInForce.DAY
+            )
+        )
+        client.get_order_by_id(order.id)
+    client.get_account()
+    client.get_all_positions()
+    data_client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=tickers))
+
+
+def concurrent_cycle(url: str, tickers: list[str]) -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings = Settings(
+            tickers=tickers,
+            call_option_margin=0.05,
+            put_option_margin=0.05,
+            stream_fills=False,
+            cache_dir=cache_dir,
+            rate_limit={"requests_per_minute": 10**6, "burst": 10**4},  # latency, not the quota
+            trade_options_schedule="59 9 * * 1-5",
+            check_value_schedule="0 10-16 * * 1-5",
+        )
+        env = AlpacaEnv(api_key="fake", api_secret="fake", trading_url=url, data_url=url)
+        client = AlpacaClient(env, settings)
+        try:
+            bot = OptionsBot.__new__(OptionsBot)
+            bot.settings, bot.alpaca_client, bot.telegram_bot = settings, client, _RaisingTelegram()
+            bot.trade_options()
+        finally:
+            client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=4, choices=range(1, len(SYMBOLS) + 1))
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tickers = SYMBOLS[: args.tickers]
+    prices = {t: PRICES[t] for t in tickers}
+    # enough cash for every ticker to sell a put, so both variants place the same orders
+    with FakeAlpacaServer(prices, cash=1e6, latency=args.latency) as server:
+        for name, cycle in [("sequential", sequential_cycle), ("concurrent", concurrent_cycle)]:
+            timings = []
+            for _ in range(args.repeat):
+                server.reset_requests()
+                start = time.perf_counter()
+                cycle(server.url, tickers)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{name:>10}: median {statistics.median(timings) * 1000:7.1f} ms, "
+                f"{server.count()} requests/cycle"
+            )
+
+
+if __name__ == "__main__":
+    main()
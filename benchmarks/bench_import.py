@@ -0,0 +1,98 @@
+"""Import-time report of the bot's startup paths, from `python -X importtime`.
+
+Runs each path in a fresh interpreter (best of `--repeat`, so bytecode compilation and
+cold disk caches don't count) and prints its total import time and heaviest top-level
+imports. `tests/test_startup.py` holds the paths to their budgets.
+
+    python -m benchmarks.bench_import --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DUMMY_ENV = {
+    "ALPACA_API_KEY": "check",
+    "ALPACA_API_SECRET": "check",
+    "TELEGRAM_BOT_TOKEN": "check",
+    "TELEGRAM_CHAT_ID": "0",
+}
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for modules imported by the script itself
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Entries of `-X importtime` output, e.g. `import time:  451 |  48256 |   pydantic`."""
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def measure(args: list[str], repeat: int = 3) -> list[ImportTime]:
+    """Import times of `python <args>` run from the repo root, from the fastest of
+    `repeat` runs; raises if the command fails."""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=ROOT,
+            env={**os.environ, **DUMMY_ENV},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(parse_importtime(result.stderr))
+    return min(runs, key=total_ms)
+
+
+def total_ms(times: list[ImportTime]) -> float:
+    return sum(t.self_us for t in times) / 1000
+
+
+def check_config_args(settings_path: str) -> list[str]:
+    return ["app.py", "--settings", settings_path, "--check-config"]
+
+
+def report(name: str, times: list[ImportTime], top: int) -> None:
+    print(f"{name}: {total_ms(times):.1f} ms in {len(times)} modules")
+    for t in sorted((t for t in times if t.depth == 0), key=lambda t: -t.cumulative_us)[:top]:
+        print(f"  {t.cumulative_us / 1000:8.1f} ms  {t.module}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_path = os.path.join(tmp, "settings.yaml")
+        shutil.copy(os.path.join(ROOT, "settings.example.yaml"), settings_path)
+        paths = {
+            "app.py --check-config": check_config_args(settings_path),
+            "import src.bot": ["-c", "import src.bot"],
+        }
+        for name, command in paths.items():
+            report(name, measure(command, args.repeat), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Allocations and CPU time of parsing one trade cycle's bulk responses, models vs raw data.
+
+A cycle loads a put chain of `--contracts` contracts with the snapshots of all of them, and
+the account's positions. Responses are served from memory (recorded once from the local
+fake of the API), so only what the client does with them is measured: alpaca-py models,
+or `raw_data` mode's `ContractRecord`s, `PositionRecord`s and raw snapshot JSON.
+
+    python -m benchmarks.bench_parse --contracts 1000 --positions 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Any
+
+from alpaca.trading.enums import ContractType
+
+from src.async_client import AsyncAlpacaClient, BlockingAlpacaClient, _query_params
+from src.chain_quotes import ChainQuoteLoader, ChainQuotes
+from src.option_chain import OptionChainIndex
+from src.portfolio import PortfolioSnapshot
+from tests.fakes import FakeAlpacaServer, position_payload
+
+TICKER = "XYZ"
+
+
+class CannedAlpacaClient(AsyncAlpacaClient):
+    """Serves the fake API's responses from memory, computing each one only once."""
+
+    def __init__(self, server: FakeAlpacaServer, raw_data: bool) -> None:
+        super().__init__("bench", "bench", raw_data=raw_data)
+        self.server = server
+        self.responses: dict[tuple[str, str], Any] = {}
+
+    async def _request(
+        self,
+        method: str,
+        base_url: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        api_version: str = "v2",
+    ) -> Any:
+        query = _query_params(params) if params else {}
+        key = (f"/{api_version}{path}", str(sorted(query.items())))
+        if key not in self.responses:
+            self.responses[key] = self.server.route(method, key[0], query, json)
+        return self.responses[key]
+
+
+def make_server(contracts: int, positions: int) -> tuple[FakeAlpacaServer, date]:
+    """A fake with a single weekly expiration whose chain has `contracts` strikes (every
+    dollar within 20% of the price), and short puts on the first `positions` of them."""
+    price = contracts / 0.4
+    server = FakeAlpacaServer({TICKER: price}, weeks=1)
+    today = date.today()
+    expiration = today + timedelta(days=(4 - today.weekday()) % 7)
+    strikes = range(int(price * 0.8), int(price * 0.8) + positions)
+    server.positions = [
+        position_payload(f"{TICKER}{expiration:%y%m%d}P{strike * 1000:08d}", -1, 1.0)
+        for strike in strikes
+    ]
+    return server, expiration
+
+
+def cycle(
+    client: BlockingAlpacaClient, aclient: AsyncAlpacaClient, expiration: date
+) -> tuple[OptionChainIndex, ChainQuotes, PortfolioSnapshot]:
+    """The parsing of a cycle; returns what the bot keeps of it (the chain until it rolls
+    over, the quotes and the snapshot for their TTLs)."""
+    chains = OptionChainIndex(client)
+    quotes = ChainQuoteLoader(client, chains).quotes(TICKER, expiration, ContractType.PUT)
+    snapshot = asyncio.run(PortfolioSnapshot.fetch(aclient, [TICKER]))
+    snapshot.holdings  # noqa: B018 - what trading and reporting read of the positions
+    return chains, quotes, snapshot
+
+
+def measure(
+    server: FakeAlpacaServer, expiration: date, raw_data: bool, repeat: int
+) -> dict[str, float]:
+    """Median CPU time, and peak and retained traced memory, of a cycle; plus the number of
+    memory blocks still allocated for its results."""
+    aclient = CannedAlpacaClient(server, raw_data)
+    client = BlockingAlpacaClient(aclient)
+    try:
+        cycle(client, aclient, expiration)  # records the responses
+        cpu = []
+        for _ in range(repeat):
+            start = time.process_time()
+            cycle(client, aclient, expiration)
+            cpu.append(time.process_time() - start)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        result = cycle(client, aclient, expiration)
+        _, peak = tracemalloc.get_traced_memory()
+        retained = tracemalloc.take_snapshot().compare_to(before, "filename")
+        tracemalloc.stop()
+        del result
+    finally:
+        client.close()
+    return {
+        "cpu_ms": statistics.median(cpu) * 1000,
+        "peak_kib": peak / 1024,
+        "retained_kib": sum(d.size_diff for d in retained) / 1024,
+        "retained_blocks": sum(d.count_diff for d in retained),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", type=int, default=1000)
+    parser.add_argument("--positions", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    server, expiration = make_server(args.contracts, args.positions)
+    results = {
+        name: measure(server, expiration, raw_data, args.repeat)
+        for name, raw_data in [("models", False), ("raw_data", True)]
+    }
+    for name, r in results.items():
+        print(
+            f"{name:>8}: {r['cpu_ms']:7.1f} ms CPU, {r['peak_kib']:8.0f} KiB peak, "
+            f"{r['retained_kib']:7.0f} KiB in {r['retained_blocks']:6.0f} blocks retained"
+        )
+    models, raw = results["models"], results["raw_data"]
+    print(
+        f"raw_data saves {1 - raw['cpu_ms'] / models['cpu_ms']:.0%} CPU, "
+        f"{1 - raw['peak_kib'] / models['peak_kib']:.0%} peak memory and "
+        f"{1 - raw['retained_kib'] / models['retained_kib']:.0%} retained memory per cycle"
+    )
+
+
+if __name__ == "__main__":
+    main()
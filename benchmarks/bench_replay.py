@@ -0,0 +1,193 @@
+"""CPU time and API calls of `OptionsBot.trade_options`, replayed offline from a cassette.
+
+Record a paper session with `python app.py --record session.jsonl.gz` across a trade_options
+run, or one against the local fake of the Alpaca API with `--record-fake`, then replay it
+as often as needed: the bot gets the recorded responses (at `--speed` `real`, `instant` or
+a factor) and its clock reads the recording day. `--profile` writes cProfile stats of one
+replay, across the bot's threads.
+
+    python -m benchmarks.bench_replay session.jsonl.gz --settings settings.yaml --repeat 10
+    python -m benchmarks.bench_replay fake.jsonl.gz --record-fake --tickers 4 --profile out.prof
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import math
+import pstats
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Any
+from unittest.mock import patch
+
+from src.alpaca_client import AlpacaClient
+from src.bot import OptionsBot
+from src.cassette import Cassette, CassetteRecorder, TransportWrapper, parse_speed
+from src.metrics import METRICS
+from src.schemas import AlpacaEnv, Settings, load_settings
+from tests.fakes import FakeAlpacaServer
+
+PRICES = {"AAPL": 200.0, "SPY": 500.0, "QQQ": 450.0, "MSFT": 400.0, "NVDA": 120.0}
+REPLAY_ENV = AlpacaEnv(api_key="replay", api_secret="replay")
+
+
+class _RaisingTelegram:
+    """The bot only messages Telegram on errors when `telegram=False`, fail loudly."""
+
+    def send_message(self, msg: str) -> None:
+        raise RuntimeError(msg)
+
+
+class _ThreadProfiler:
+    """cProfile of the calling thread and of the threads it starts (the client's event
+    loop and the trade workers). From Python 3.12 one profiler already sees every thread."""
+
+    def __init__(self) -> None:
+        self.profiles: list[cProfile.Profile] = []
+
+    def __enter__(self) -> _ThreadProfiler:
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self._profile_thread()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        threading.setprofile(None)  # type: ignore[arg-type]
+        self.profiles[0].disable()  # the others end with their threads
+
+    def _profile_thread(self, *args: Any) -> None:
+        profile = cProfile.Profile()
+        self.profiles.append(profile)
+        profile.enable()
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(*self.profiles)
+
+
+def make_settings(tickers: list[str]) -> Settings:
+    return Settings(
+        tickers=tickers,
+        call_option_margin=0.05,
+        put_option_margin=0.05,
+        trade_options_schedule="59 9 * * 1-5",
+        check_value_schedule="0 10-16 * * 1-5",
+    )
+
+
+def trade_options(env: AlpacaEnv, settings: Settings, wrap: TransportWrapper) -> None:
+    """One trade cycle of a bot that is only the Alpaca client (no jobs, journal or
+    Telegram), over a fresh cache so it makes every request a cold start does."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings = settings.model_copy(
+            update={
+                "cache_dir": cache_dir,
+                "stream_fills": False,
+                "journal_path": None,
+                "rate_limit": settings.rate_limit.model_copy(  # CPU time, not the quota
+                    update={"requests_per_minute": 10**6, "burst": 10**4}
+                ),
+            }
+        )
+        client = AlpacaClient(env, settings, wrap_transport=wrap)
+        try:
+            bot = OptionsBot.__new__(OptionsBot)
+            bot.settings, bot.alpaca_client, bot.telegram_bot = settings, client, _RaisingTelegram()
+            bot.trade_options()
+        finally:
+            client.close()
+
+
+def record_fake(path: str, settings: Settings) -> None:
+    prices = {t: PRICES[t] for t in settings.symbols}
+    with FakeAlpacaServer(prices, cash=1e6) as server:
+        env = AlpacaEnv(
+            api_key="fake", api_secret="fake", trading_url=server.url, data_url=server.url
+        )
+        recorder = CassetteRecorder(path)
+        try:
+            trade_options(env, settings, recorder.transport)
+        finally:
+            recorder.close()
+    print(f"recorded {recorder.recorded} requests to {path}")
+
+
+def replay(cassette: Cassette, settings: Settings, speed: float) -> dict[str, Any]:
+    """Replay the cassette into one trade cycle on the day it was recorded, with the bot's
+    own waits (fill polling) compressed like the responses."""
+
+    class RecordingDay(date):
+        @classmethod
+        def today(cls) -> date:
+            return date.fromtimestamp(cassette.started_at)
+
+    sleep = time.sleep
+
+    def compressed_sleep(seconds: float) -> None:
+        if not math.isinf(speed):
+            sleep(seconds / speed)
+
+    replayer = cassette.replayer(speed)
+    METRICS.reset()
+    with (
+        patch("src.alpaca_client.date", RecordingDay),
+        patch("src.alpaca_client.time.sleep", compressed_sleep),
+    ):
+        cpu, wall = time.process_time(), time.perf_counter()
+        trade_options(REPLAY_ENV, settings, replayer.transport)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    calls = {name: c["calls"] for name, c in METRICS.snapshot()["calls"].items()}
+    return {
+        "cpu": cpu,
+        "wall": wall,
+        "served": replayer.served,
+        "remaining": replayer.remaining,
+        "calls": calls,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cassette")
+    parser.add_argument("--settings", default="settings.yaml", help="the recorded session's")
+    parser.add_argument("--speed", type=parse_speed, default="instant", help="real, instant or x")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", metavar="PATH", help="write cProfile stats of one replay")
+    parser.add_argument(
+        "--record-fake", action="store_true", help="first record the cassette from the fake API"
+    )
+    parser.add_argument("--tickers", type=int, default=4, choices=range(1, len(PRICES) + 1))
+    args = parser.parse_args()
+
+    if args.record_fake:
+        settings = make_settings(list(PRICES)[: args.tickers])
+        record_fake(args.cassette, settings)
+    else:
+        settings = load_settings(args.settings)
+    cassette = Cassette.load(args.cassette)
+
+    runs = [replay(cassette, settings, args.speed) for _ in range(args.repeat)]
+    if len({(r["served"], tuple(r["calls"].items())) for r in runs}) > 1:
+        print("warning: replays differ in the requests they made")
+    last = runs[-1]
+    print(
+        f"trade_options: median {statistics.median(r['cpu'] for r in runs) * 1000:7.1f} ms CPU, "
+        f"{statistics.median(r['wall'] for r in runs) * 1000:7.1f} ms wall, "
+        f"{last['served']} requests replayed ({last['remaining']} of the cassette unused)"
+    )
+    for name, calls in last["calls"].items():
+        print(f"{calls:>6}  {name}")
+
+    if args.profile:
+        with _ThreadProfiler() as profiler:
+            replay(cassette, settings, args.speed)
+        profiler.stats().dump_stats(args.profile)
+        profiler.stats().sort_stats("cumulative").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ set -euo pipefail
 ENV_LOCAL_PATH="./.env"
 SETTINGS_PATH="./settings.yaml"
 
+# `--settings-only` just copies settings.yaml, which the running bot reloads by itself
+SETTINGS_ONLY=false
+if [[ "${1:-}" == "--settings-only" ]]; then
+  SETTINGS_ONLY=true
+fi
+
 if [[ ! -f "$ENV_LOCAL_PATH" ]]; then
   echo "ERROR: $ENV_LOCAL_PATH not found."
   exit 1
@@ -43,6 +49,14 @@ fi
 IMAGE_NAME="$BOT_NAME"
 APP_PATH="${SERVER_PATH%/}/${BOT_NAME}"
 
+if [[ "$SETTINGS_ONLY" == true ]]; then
+  echo "==> 🔧 Copy \`settings.yaml\` to server"
+  # written in place, so the bind-mounted file in the container sees the change
+  scp "$SETTINGS_PATH" "${SERVER_USER}@${SERVER_HOST}:~/${APP_PATH}/settings.yaml" >/dev/null 2>&1
+  echo "==> ✅ Success"
+  exit 0
+fi
+
 echo "==> 📦 Pull latest code on server"
 ssh "${SERVER_USER}@${SERVER_HOST}" << EOF >/dev/null 2>&1
 set -euo pipefail
@@ -93,7 +107,9 @@ else
   DOCKER_CMD="sudo docker"
 fi
 
-# Build fresh image
+# Build fresh image, stopping the old container with SIGTERM first so it saves its state,
+# flushes the journal and delivers queued Telegram messages
+\$DOCKER_CMD stop -t 60 "${IMAGE_NAME}" >/dev/null 2>&1 || true
 \$DOCKER_CMD rm -f "${IMAGE_NAME}" >/dev/null 2>&1 || true
 cd "\$APPDIR"
 \$DOCKER_CMD build -t "${IMAGE_NAME}:latest" . >/dev/null 2>&1
@@ -103,6 +119,8 @@ cd "\$APPDIR"
   --restart unless-stopped \\
   --env-file "\$APPDIR/.env" \\
   -v "\$APPDIR/logs:/app/logs" \\
+  -v "\$APPDIR/cache:/app/cache" \\
+  -v "\$APPDIR/settings.yaml:/app/settings.yaml" \\
   "${IMAGE_NAME}:latest" >/dev/null 2>&1
 EOF
 
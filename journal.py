@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from src.journal import JOURNAL_PATH, Journal
+
+
+def timestamp(value: str) -> float:
+    """ISO date or datetime, UTC unless it carries an offset."""
+    at = datetime.fromisoformat(value)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.timestamp()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the trade and portfolio journal.")
+    parser.add_argument("--db", default=JOURNAL_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("import", help="backfill from monthly YYYY-MM.log files")
+    backfill.add_argument("--log-dir", default="logs")
+
+    premium = commands.add_parser("premium", help="net premium collected")
+    premium.add_argument(
+        "--by", choices=["day", "week", "month", "quarter", "year", "symbol", "underlying"]
+    )
+    assignments = commands.add_parser("assignments", help="options exercised into shares")
+    values = commands.add_parser("values", help="portfolio value history")
+    values.add_argument(
+        "--every", choices=["day", "week", "month", "quarter", "year"], default="day"
+    )
+
+    for command in (premium, assignments, values):
+        command.add_argument("--since", type=timestamp, help="e.g. 2025-01-01")
+        command.add_argument("--until", type=timestamp, help="exclusive")
+    return parser.parse_args()
+
+
+def utc(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    journal = Journal(args.db)
+    start = time.perf_counter()
+    try:
+        if args.command == "import":
+            counts = journal.import_logs(args.log_dir)
+            print(", ".join(f"{n} {event} lines" for event, n in counts.items()))
+        elif args.command == "premium":
+            for key, total in journal.premium(args.since, args.until, by=args.by):
+                print(f"{key:<24} ${total:>14,.2f}")
+        elif args.command == "assignments":
+            for a in journal.assignments(args.since, args.until):
+                print(f"{utc(a.time)}  {a.option:<24} {a.shares:+,.0f} {a.underlying}")
+        else:
+            for period, value in journal.value_history(args.since, args.until, every=args.every):
+                print(f"{period:<12} ${value:>14,.2f}")
+    finally:
+        journal.close()
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
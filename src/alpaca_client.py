@@ -1,62 +1,160 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import os
 import time
 from datetime import date, timedelta
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
-from alpaca.data.historical import StockHistoricalDataClient
+import numpy as np
 from alpaca.data.requests import StockLatestTradeRequest
-from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import (
-    AssetClass,
-    ContractType,
-    OrderSide,
-    OrderStatus,
-    PositionSide,
-    TimeInForce,
-)
-from alpaca.trading.models import OptionContract, Order, Position, TradeAccount
-from alpaca.trading.requests import GetOptionContractsRequest, MarketOrderRequest
-
-from src.schemas import AlpacaEnv, Settings
+from alpaca.trading.enums import ContractType, OrderSide, OrderStatus, TimeInForce
+from alpaca.trading.models import OptionContract, Order, TradeAccount
+from alpaca.trading.requests import MarketOrderRequest
+
+from src.async_client import AsyncAlpacaClient, BlockingAlpacaClient
+from src.chain_quotes import ChainQuoteLoader, LiquidityFilter
+from src.expirations import ExpirationCalendar, expiration_horizon
+from src.market_calendar import TradingCalendar
+from src.metrics import METRICS
+from src.option_chain import ContractRecord, OptionChainIndex, StrikeSelection
+from src.portfolio import SNAPSHOT_REST_CALLS, PortfolioSnapshot, Positions, ticker_prices
+from src.pricing import DAYS_PER_YEAR, delta_index, greeks
+from src.rate_limit import RetryPolicy, shared_bucket
+from src.schemas import AlpacaEnv, Settings, TickerSettings
 from src.utils import cached_property_ttl
 
+if TYPE_CHECKING:
+    from src.cassette import TransportWrapper
+    from src.fills import FillTracker
+
 logger = logging.getLogger()
 
+FILL_TIMEOUT = 60
+FILL_POLL_INTERVAL = 2
+RISK_FREE_RATE = 0.04
+STATE_FILE = "state.json"
+MAX_STATE_AGE = 24 * 3600  # older snapshots aren't worth serving, even while refreshing
+
 
-def _signed_qty(p: Position) -> str:
-    q = abs(float(p.qty))
-    if p.side == PositionSide.SHORT:
-        q = -q
-    return str(int(q)) if q.is_integer() else str(q)
+def max_rest_calls_per_cycle(n_tickers: int, cold: bool = False) -> int:
+    """Upper bound on REST calls made by one trade cycle over `n_tickers` tickers: a shared
+    snapshot, order submission plus fill polling per ticker (a poll every
+    `FILL_POLL_INTERVAL` seconds, from the start to the end of `FILL_TIMEOUT`), and a
+    snapshot refresh for reporting. A cold start adds one (single-page) calendar and chain
+    query per ticker, and `target_delta` or liquidity filters one snapshots query per 100
+    contracts of the chain. Retries of failed requests, up to `rate_limit.max_retries` per
+    request, are not counted."""
+    per_ticker = 1 + FILL_TIMEOUT // FILL_POLL_INTERVAL + 1 + (2 if cold else 0)
+    return 2 * SNAPSHOT_REST_CALLS + n_tickers * per_ticker
 
 
 class AlpacaClient:
-    def __init__(self, env: AlpacaEnv, settings: Settings) -> None:
+    def __init__(
+        self,
+        env: AlpacaEnv,
+        settings: Settings,
+        wrap_transport: TransportWrapper | None = None,
+    ) -> None:
         self.settings = settings
-        self.client = TradingClient(env.api_key, env.api_secret, paper=settings.paper_trading)
-        self.data_client = StockHistoricalDataClient(env.api_key, env.api_secret)
-        self.get_ticker_price(settings.ticker)  # validate ticker
+        self.aclient = AsyncAlpacaClient(
+            env.api_key,
+            env.api_secret,
+            paper=settings.paper_trading,
+            trading_url=env.trading_url,
+            data_url=env.data_url,
+            raw_data=settings.raw_data,
+            limiter=shared_bucket(
+                env.api_key, settings.rate_limit.requests_per_minute, settings.rate_limit.burst
+            ),
+            retry=RetryPolicy(
+                settings.rate_limit.max_retries,
+                settings.rate_limit.backoff,
+                settings.rate_limit.max_backoff,
+            ),
+            wrap_transport=wrap_transport,
+        )
+        self.client = self.data_client = BlockingAlpacaClient(self.aclient)
+        self.expiration_calendar = ExpirationCalendar(
+            self.client,
+            cache_dir=settings.cache_dir,
+            horizon_days=expiration_horizon(t.target_dte for t in settings.tickers),
+        )
+        self.trading_calendar = TradingCalendar(self.client, cache_dir=settings.cache_dir)
+        self.option_chains = OptionChainIndex(self.client)
+        self.chain_quotes = ChainQuoteLoader(self.data_client, self.option_chains)
+        self.state_path = os.path.join(settings.cache_dir, STATE_FILE)
+        restored = self.restore_state()
+        METRICS.watch_cache("snapshot", lambda: AlpacaClient.snapshot.stats(self))
+        self.fill_tracker: FillTracker | None = None
+        if settings.stream_fills:
+            from src.fills import FillTracker  # the websocket stack only when streaming
+
+            self.fill_tracker = FillTracker(
+                env.api_key, env.api_secret, settings.paper_trading, url_override=env.stream_url
+            )
+            self.fill_tracker.start()
+        self.get_ticker_prices(settings.symbols)  # validate tickers
+        if restored:
+            AlpacaClient.snapshot.revalidate(self)
 
     @cached_property_ttl(ttl=60)
+    def snapshot(self) -> PortfolioSnapshot:
+        return self.client.run(PortfolioSnapshot.fetch(self.aclient, self.settings.symbols))
+
+    def refresh_snapshot(self) -> None:
+        AlpacaClient.snapshot.invalidate(self)
+
+    def save_state(self) -> None:
+        """Write the portfolio snapshot and option chains under `cache_dir` for the next
+        start to warm up from (the expiration calendar keeps its own file there)."""
+        snapshot: PortfolioSnapshot | None = AlpacaClient.snapshot.peek(self)
+        state = {
+            "saved_at": time.time(),
+            "snapshot": snapshot.to_dict() if snapshot is not None else None,
+            "chains": self.option_chains.to_list(),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Failed to write state {self.state_path}: {e}")
+
+    def restore_state(self) -> bool:
+        """Load what `save_state` wrote. The snapshot is served as stale until refreshed,
+        and only if it is recent and covers every ticker. Returns whether it was loaded."""
+        if not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            chains = self.option_chains.restore(state["chains"], date.today())
+            snapshot = state["snapshot"] and PortfolioSnapshot.from_dict(state["snapshot"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable state {self.state_path}: {e}")
+            return False
+        age = time.time() - snapshot.fetched_at if snapshot else float("inf")
+        usable = age < MAX_STATE_AGE and set(self.settings.symbols) <= set(snapshot.prices)
+        if usable:
+            AlpacaClient.snapshot.seed(self, snapshot, age)
+        logger.debug(
+            f"Restored {chains} option chains"
+            + (f" and a {age:.0f}s old portfolio snapshot" if usable else "")
+        )
+        return usable
+
+    @property
     def account(self) -> TradeAccount:
-        account = self.client.get_account()
-        if not isinstance(account, TradeAccount):
-            raise TypeError(f"Expected TradeAccount, got {type(account).__name__}")
-        return account
+        return self.snapshot.account
 
-    @cached_property_ttl(ttl=60)
-    def positions(self) -> dict[str, dict[str, str | None]]:
-        ticker = self.settings.ticker
-        return {
-            **{str(self.account.currency): {"qty": str(self.account.cash), "price": "1.00"}},
-            **{ticker: {"qty": "0", "price": str(self.get_ticker_price(ticker))}},
-            **{
-                str(p.symbol): {"qty": _signed_qty(p), "price": str(p.current_price)}
-                for p in cast(list[Position], self.client.get_all_positions())
-            },
-        }
+    @property
+    def positions(self) -> Positions:
+        return self.snapshot.holdings
 
     @property
     def portfolio_value(self) -> float:
@@ -75,76 +173,177 @@ class AlpacaClient:
             raise RuntimeError(f"Ticker price is unavailable for `{ticker}`!")
         return ticker_price
 
-    def get_expiration_date(self, ticker: str) -> date:
-        friday = date.today() + timedelta(days=(4 - date.today().weekday()) % 7 or 7)
-        for offset in range((friday - date.today()).days + 1):
-            candidate = friday - timedelta(days=offset)
-            contracts = self.client.get_option_contracts(
-                GetOptionContractsRequest(
-                    underlying_symbols=[ticker],
-                    expiration_date=candidate,
-                    limit=1,
-                )
+    def get_ticker_prices(self, tickers: list[str]) -> dict[str, float]:
+        latest_trades = self.data_client.get_stock_latest_trade(
+            StockLatestTradeRequest(symbol_or_symbols=tickers)
+        )
+        return ticker_prices(latest_trades, tickers)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Switch to edited `settings`, keeping every cache. Added tickers are validated
+        first (raising `RuntimeError` for one without a price) and fetched with the next
+        snapshot, and a further `target_dte` refetches the expiration calendars."""
+        added = [t for t in settings.symbols if t not in self.settings.symbols]
+        if added:
+            self.get_ticker_prices(added)
+        self.settings = settings
+        self.expiration_calendar.horizon_days = expiration_horizon(
+            t.target_dte for t in settings.tickers
+        )
+        if added:
+            AlpacaClient.snapshot.invalidate(self)
+
+    def prefetch(self) -> None:
+        """Fetch the portfolio snapshot and warm the expiration calendars of all tickers
+        concurrently, ahead of the per-ticker trade cycles."""
+        today = date.today()
+
+        async def gather() -> None:
+            await asyncio.gather(
+                asyncio.to_thread(AlpacaClient.snapshot.fresh, self),  # never trade on stale
+                *(
+                    asyncio.to_thread(self.expiration_calendar.expirations, ticker, today)
+                    for ticker in self.settings.symbols
+                ),
             )
-            if getattr(contracts, "option_contracts", None):
-                if candidate != friday:
-                    logger.info(f"No contracts for {friday}, using {candidate} instead")
-                return candidate
-        raise RuntimeError(f"No option expiration dates found for `{ticker}`!")
+
+        self.client.run(gather())
+
+    def close(self) -> None:
+        if self.fill_tracker is not None:
+            self.fill_tracker.stop()
+        self.client.close()
+
+    def get_expiration_date(self, ticker: str, target_dte: int | None = None) -> date:
+        """Closest listed expiration on or before next Friday, or the listed expiration
+        closest to `target_dte` days out if set."""
+        today = date.today()
+        if target_dte is not None:
+            expiration_date = self.expiration_calendar.nearest_to_dte(ticker, target_dte, today)
+            if expiration_date is None:
+                raise RuntimeError(f"No option expiration dates found for `{ticker}`!")
+            return expiration_date
+
+        friday = today + timedelta(days=(4 - today.weekday()) % 7 or 7)
+        expiration_date = self.expiration_calendar.on_or_before(ticker, friday, today)
+        if expiration_date is None:
+            raise RuntimeError(f"No option expiration dates found for `{ticker}`!")
+        if expiration_date != friday:
+            logger.info(f"No contracts for {friday}, using {expiration_date} instead")
+        return expiration_date
 
     def have_option_contracts(self, ticker: str) -> bool:
-        """Match OCC symbols (e.g. AAPL250926C00210000) by checking that the ticker
-        is followed by a digit to avoid false matches (e.g. ticker A matching AAPL)."""
-        return any(
-            p.symbol[: len(ticker)] == ticker
-            and len(p.symbol) > len(ticker)
-            and p.symbol[len(ticker)].isdigit()
-            and p.asset_class == AssetClass.US_OPTION
-            for p in cast(list[Position], self.client.get_all_positions())
-        )
+        return self.snapshot.has_options(ticker)
 
     def get_option_contract(
         self,
         ticker: str,
         expiration_date: date,
-        price_gte: float,
+        strike_price: float,
         option_type: ContractType,
-    ) -> OptionContract:
-        contracts = self.client.get_option_contracts(
-            GetOptionContractsRequest(
-                underlying_symbols=[ticker],
-                expiration_date=expiration_date,
-                type=option_type,
-                strike_price_gte=str(price_gte),
-                limit=1000,
-            )
+        selection: StrikeSelection = "above",
+        liquidity: LiquidityFilter | None = None,
+    ) -> OptionContract | ContractRecord:
+        eligible = None
+        if liquidity is not None and liquidity.active:
+            quotes = self.chain_quotes.quotes(ticker, expiration_date, option_type)
+            eligible = liquidity.mask(quotes).tolist()
+        contract = self.option_chains.select(
+            ticker, expiration_date, option_type, strike_price, selection, eligible
         )
+        if contract is None:
+            qualifier = "liquid " if eligible is not None else ""
+            raise RuntimeError(f"No {qualifier}option contracts found for `{ticker}`!")
+        return contract
 
-        if contracts is None or not hasattr(contracts, "option_contracts"):
-            raise RuntimeError(f"Option contracts are unavailable for `{ticker}`!")
-
-        option_contracts = getattr(contracts, "option_contracts", [])
-        if not option_contracts:
-            raise RuntimeError(f"No option contracts found for `{ticker}`!")
-
-        return option_contracts[0]
-
-    def trade_options(self) -> dict | None:
-        ticker = self.settings.ticker
+    def get_delta_contract(
+        self,
+        ticker: str,
+        expiration_date: date,
+        option_type: ContractType,
+        target_delta: float,
+        liquidity: LiquidityFilter | None = None,
+    ) -> OptionContract | ContractRecord | None:
+        """Contract whose absolute delta is closest to `target_delta`, with volatility
+        implied by the quote mids of the whole chain (or the snapshot's own delta where
+        ours can't be solved). None if no eligible contract is quoted."""
+        chain = self.option_chains.chain(ticker, expiration_date, option_type)
+        if not chain.symbols:
+            return None
+        quotes = self.chain_quotes.quotes(ticker, expiration_date, option_type)
+        result = greeks(
+            quotes.mid,
+            self.snapshot.prices[ticker],
+            np.asarray(chain.strikes),
+            max((expiration_date - date.today()).days, 1) / DAYS_PER_YEAR,
+            RISK_FREE_RATE,
+            option_type == ContractType.CALL,
+        )
+        delta = np.where(np.isnan(result.delta), quotes.delta, result.delta)
+        if liquidity is not None and liquidity.active:
+            delta[~liquidity.mask(quotes)] = np.nan
+        i = delta_index(delta, target_delta)
+        if i is None:
+            logger.warning(f"No usable {option_type.value} quotes for `{ticker}`")
+            return None
+        logger.debug(
+            f"Delta {delta[i]:.3f} (IV {result.iv[i]:.3f}) at strike {chain.strikes[i]} "
+            f"for `{ticker}`"
+        )
+        return chain.contracts[i]
+
+    def cash_allocations(self) -> dict[str, float]:
+        """Split cash evenly between the tickers that are going to sell cash-secured puts
+        this cycle, so that concurrent per-ticker cycles don't over-commit the account."""
+        put_tickers = [
+            ticker
+            for ticker in self.settings.symbols
+            if self.positions.qty(ticker) <= 0
+            and not self.have_option_contracts(ticker)
+        ]
+        if not put_tickers:
+            return {}
+        cash = self.positions.qty("USD")
+        return {ticker: cash / len(put_tickers) for ticker in put_tickers}
+
+    def trade_options(
+        self, ticker_settings: TickerSettings, cash: float | None = None
+    ) -> dict | None:
+        """Trade cycle of a single ticker. Account, position and price reads all come from
+        the shared `snapshot`, see `max_rest_calls_per_cycle` for the resulting bound."""
+        ticker = ticker_settings.ticker
         if self.have_option_contracts(ticker):
-            logger.debug("Options are in portfolio already, skipping options trade.")
+            logger.debug(f"Options on {ticker} are in portfolio already, skipping options trade.")
             return None
 
-        expiration_date = self.get_expiration_date(ticker)
-        ticker_price = self.get_ticker_price(ticker)
+        expiration_date = self.get_expiration_date(ticker, ticker_settings.target_dte)
+        ticker_price = self.snapshot.prices[ticker]
+        liquidity = LiquidityFilter(
+            ticker_settings.min_bid, ticker_settings.max_spread, ticker_settings.min_open_interest
+        )
 
-        if float(self.positions.get(ticker, {}).get("qty") or "0") > 0:
-            strike_price = (1 + self.settings.call_option_margin) * ticker_price
-            order = self.sell_covered_calls(ticker, expiration_date, strike_price)
+        if self.positions.qty(ticker) > 0:
+            strike_price = (1 + ticker_settings.call_option_margin) * ticker_price
+            order = self.sell_covered_calls(
+                ticker,
+                expiration_date,
+                strike_price,
+                selection=ticker_settings.strike_selection,
+                target_delta=ticker_settings.target_delta,
+                liquidity=liquidity,
+            )
             option_type = "call"
         else:
-            strike_price = (1 - self.settings.put_option_margin) * ticker_price
-            order = self.sell_covered_puts(ticker, expiration_date, strike_price)
+            strike_price = (1 - ticker_settings.put_option_margin) * ticker_price
+            order = self.sell_covered_puts(
+                ticker,
+                expiration_date,
+                strike_price,
+                cash,
+                selection=ticker_settings.strike_selection,
+                target_delta=ticker_settings.target_delta,
+                liquidity=liquidity,
+            )
             option_type = "put"
 
         if order is None:
@@ -154,8 +353,6 @@ class AlpacaClient:
         if filled_order is None:
             return None
 
-        self._ttl_positions = None  # force refresh so reports reflect the new contract
-
         return {
             "type": option_type,
             "side": cast(OrderSide, filled_order.side).value,
@@ -166,9 +363,17 @@ class AlpacaClient:
         }
 
     def sell_covered_calls(
-        self, ticker: str, expiration_date: date, strike_price: float
+        self,
+        ticker: str,
+        expiration_date: date,
+        strike_price: float,
+        selection: StrikeSelection = "above",
+        target_delta: float | None = None,
+        liquidity: LiquidityFilter | None = None,
     ) -> Order | None:
-        ticker_qty = float(self.positions[ticker]["qty"] or "0")
+        """Sell calls at `strike_price`, or at the strike closest to `target_delta` if set
+        and the chain is quoted, among contracts that pass `liquidity`."""
+        ticker_qty = self.positions.qty(ticker)
         if ticker_qty < 100:
             logger.debug(
                 f"Only have {ticker_qty} shares of {ticker}, "
@@ -177,17 +382,41 @@ class AlpacaClient:
             return None
 
         call_contract_qty = int(ticker_qty / 100)
-        call_contract = self.get_option_contract(
-            ticker, expiration_date, strike_price, ContractType.CALL
-        )
+        call_contract = None
+        if target_delta is not None:
+            call_contract = self.get_delta_contract(
+                ticker, expiration_date, ContractType.CALL, target_delta, liquidity
+            )
+        if call_contract is None:
+            call_contract = self.get_option_contract(
+                ticker, expiration_date, strike_price, ContractType.CALL, selection, liquidity
+            )
 
         logger.debug(f"Selling {call_contract_qty} calls for {ticker}: {call_contract}")
         return self.submit_sell_order(call_contract.symbol, call_contract_qty)
 
     def sell_covered_puts(
-        self, ticker: str, expiration_date: date, strike_price: float
+        self,
+        ticker: str,
+        expiration_date: date,
+        strike_price: float,
+        cash: float | None = None,
+        selection: StrikeSelection = "above",
+        target_delta: float | None = None,
+        liquidity: LiquidityFilter | None = None,
     ) -> Order | None:
-        cash = float(self.positions["USD"]["qty"] or "0")
+        """Sell cash-secured puts at `strike_price`, or at the strike closest to
+        `target_delta` if set and the chain is quoted, among contracts that pass
+        `liquidity`."""
+        if cash is None:
+            cash = self.positions.qty("USD")
+        put_contract = None
+        if target_delta is not None:
+            put_contract = self.get_delta_contract(
+                ticker, expiration_date, ContractType.PUT, target_delta, liquidity
+            )
+            if put_contract is not None:
+                strike_price = float(put_contract.strike_price)
         if cash < 100 * strike_price:
             logger.debug(
                 f"Only have cash for {cash / strike_price:.2f} shares "
@@ -196,9 +425,10 @@ class AlpacaClient:
             return None
 
         put_contract_qty = int(cash / strike_price / 100)
-        put_contract = self.get_option_contract(
-            ticker, expiration_date, strike_price, ContractType.PUT
-        )
+        if put_contract is None:
+            put_contract = self.get_option_contract(
+                ticker, expiration_date, strike_price, ContractType.PUT, selection, liquidity
+            )
 
         logger.debug(f"Selling {put_contract_qty} puts for {ticker}: {put_contract}")
         return self.submit_sell_order(put_contract.symbol, put_contract_qty)
@@ -220,14 +450,29 @@ class AlpacaClient:
         return order
 
     def wait_for_fill(
-        self, order: Order, timeout: int = 60, poll_interval: int = 2
+        self, order: Order, timeout: int = FILL_TIMEOUT, poll_interval: int = FILL_POLL_INTERVAL
     ) -> Order | None:
+        """Wait for the order on the trade-updates stream, falling back to polling
+        `get_order_by_id` when the stream is down (or drops mid-wait). The order is polled
+        at least once, so a fill the stream missed is still seen after the timeout."""
         start = time.time()
-        while time.time() - start < timeout:
+        if self.fill_tracker is not None and self.fill_tracker.connected:
+            if (update := self.fill_tracker.wait(str(order.id), timeout)) is not None:
+                order = update
+                if order.status in (OrderStatus.FILLED, OrderStatus.PARTIALLY_FILLED):
+                    logger.info(f"Order {order.id} filled at {order.filled_avg_price}")
+                    return order
+                logger.warning(f"Order {order.id} not filled, status: {order.status}")
+                return None
+            logger.debug(f"No trade update for order {order.id}, polling instead")
+
+        while True:
             order = cast(Order, self.client.get_order_by_id(order.id))
             if order.status in (OrderStatus.FILLED, OrderStatus.PARTIALLY_FILLED):
                 logger.info(f"Order {order.id} filled at {order.filled_avg_price}")
                 return order
+            if time.time() - start >= timeout:
+                break
             time.sleep(poll_interval)
         logger.warning(f"Order {order.id} not filled within {timeout}s, status: {order.status}")
         return None
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Coroutine, TypeVar, cast
+from uuid import UUID, uuid4
+
+import httpx
+from alpaca.common.enums import BaseURL
+from alpaca.common.exceptions import APIError
+from alpaca.common.types import RawData
+from alpaca.data.historical.utils import parse_obj_as_symbol_dict
+from alpaca.data.models import OptionsSnapshot, Trade
+from alpaca.data.requests import OptionSnapshotRequest, StockLatestTradeRequest
+from alpaca.trading.models import (
+    Calendar,
+    OptionContractsResponse,
+    Order,
+    Position,
+    TradeAccount,
+)
+from alpaca.trading.requests import GetCalendarRequest, GetOptionContractsRequest, OrderRequest
+
+from src.metrics import METRICS, instrumented
+from src.rate_limit import RetryPolicy, TokenBucket, time_left
+
+if TYPE_CHECKING:
+    from src.cassette import TransportWrapper
+
+logger = logging.getLogger()
+
+T = TypeVar("T")
+
+MAX_CONNECTIONS = 20
+REQUEST_TIMEOUT = 30.0
+OPTION_SYMBOLS_BATCH = 100  # symbols per option market data request
+OPTION_SNAPSHOTS_PAGE = 1000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _query_params(params: dict[str, Any]) -> dict[str, str]:
+    """Encode request fields the way Alpaca expects them in a query string: enums by value
+    and lists comma-separated (httpx would otherwise use `str()` and repeat the key)."""
+    encoded = {}
+    for key, value in params.items():
+        if isinstance(value, list):
+            value = ",".join(str(v.value if isinstance(v, Enum) else v) for v in value)
+        elif isinstance(value, Enum):
+            value = value.value
+        encoded[key] = str(value)
+    return encoded
+
+
+class AsyncAlpacaClient:
+    """Async counterpart of alpaca-py's `TradingClient` and `StockHistoricalDataClient` for
+    the endpoints the bot uses. Methods take the same request models and return the same
+    response models, and all requests share one pooled keep-alive HTTP session. Every
+    method call is recorded in `METRICS`.
+
+    Like alpaca-py's `raw_data`, `raw_data=True` makes the bulk endpoints (option
+    contracts, positions and option snapshots) return the decoded JSON instead, for callers
+    that only read a few fields of each of hundreds of models.
+
+    Every request first takes a token from `limiter`, if given (shared by all clients of
+    an account, see `shared_bucket`). Rate-limited requests, and reads and order submissions
+    that fail with a server or network error, are retried with jittered exponential backoff
+    under `retry`, unless that would run past the `request_deadline` of the caller. Orders
+    carry a `client_order_id`, and a retried submission first looks the order up by it, so
+    an order the API accepted before failing is never submitted twice.
+
+    `wrap_transport`, if given, wraps the HTTP transport of the session, e.g. to record
+    or replay its traffic (see `src.cassette`)."""
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        paper: bool = True,
+        trading_url: str | None = None,
+        data_url: str | None = None,
+        raw_data: bool = False,
+        limiter: TokenBucket | None = None,
+        retry: RetryPolicy = RetryPolicy(),
+        wrap_transport: TransportWrapper | None = None,
+    ) -> None:
+        self.raw_data = raw_data
+        self.wrap_transport = wrap_transport
+        self.limiter = limiter
+        self.retry = retry
+        default_trading_url = BaseURL.TRADING_PAPER if paper else BaseURL.TRADING_LIVE
+        # by value: an f-string of the enum member is `BaseURL.DATA` on Python 3.11
+        self.trading_url: str = trading_url or default_trading_url.value
+        self.data_url: str = data_url or BaseURL.DATA.value
+        self.headers = {"APCA-API-KEY-ID": api_key, "APCA-API-SECRET-KEY": api_secret}
+        self._session: httpx.AsyncClient | None = None
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        # created lazily so that it binds to the event loop it is used from
+        if self._session is None:
+            transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS
+                )
+            )
+            if self.wrap_transport is not None:
+                transport = self.wrap_transport(transport)
+            self._session = httpx.AsyncClient(
+                headers=self.headers, timeout=REQUEST_TIMEOUT, transport=transport
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        base_url: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        api_version: str = "v2",
+        retry: bool = True,
+        before_retry: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """Send a request, retrying as described on the class. `before_retry`, required to
+        retry a failed non-GET request, is awaited before each retry and its result, unless
+        None, returned instead of retrying."""
+        idempotent = method == "GET" or before_retry is not None
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            error: Exception
+            try:
+                response = await self.session.request(
+                    method,
+                    f"{base_url}/{api_version}{path}",
+                    params=_query_params(params) if params else None,
+                    json=json,
+                )
+            except httpx.TransportError as e:
+                error, retryable = e, idempotent
+            else:
+                if not response.is_error:
+                    return response.json() if response.content else None
+                error = APIError(response.text)
+                retryable = response.status_code == 429 or (
+                    idempotent and response.status_code in RETRY_STATUSES
+                )
+            delay = self.retry.delay(attempt)
+            if not (retry and retryable and attempt < self.retry.max_retries):
+                raise error
+            if delay > time_left():
+                logger.warning(f"{method} {path} failed, out of time to retry: {error}")
+                raise error
+            logger.warning(
+                f"{method} {path} failed, retry {attempt + 1}/{self.retry.max_retries} "
+                f"in {delay:.2f}s: {error}"
+            )
+            METRICS.observe("alpaca", "retry", delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            if before_retry is not None and (result := await before_retry()) is not None:
+                return result
+
+    @instrumented("alpaca")
+    async def get_account(self) -> TradeAccount:
+        return TradeAccount(**await self._request("GET", self.trading_url, "/account"))
+
+    @instrumented("alpaca")
+    async def get_all_positions(self) -> list[Position] | list[RawData]:
+        positions = await self._request("GET", self.trading_url, "/positions")
+        return positions if self.raw_data else [Position(**p) for p in positions]
+
+    @instrumented("alpaca")
+    async def get_calendar(self, filters: GetCalendarRequest) -> list[Calendar]:
+        response = await self._request(
+            "GET", self.trading_url, "/calendar", filters.to_request_fields()
+        )
+        return [Calendar(**c) for c in response]
+
+    @instrumented("alpaca")
+    async def get_option_contracts(
+        self, request: GetOptionContractsRequest
+    ) -> OptionContractsResponse | RawData:
+        response = await self._request(
+            "GET", self.trading_url, "/options/contracts", request.to_request_fields()
+        )
+        return response if self.raw_data else OptionContractsResponse(**response)
+
+    @instrumented("alpaca")
+    async def submit_order(self, order_data: OrderRequest) -> Order:
+        data = order_data.to_request_fields()
+        client_order_id = data.setdefault("client_order_id", str(uuid4()))
+
+        async def submitted() -> Any:
+            try:
+                return await self._request(
+                    "GET",
+                    self.trading_url,
+                    "/orders:by_client_order_id",
+                    {"client_order_id": client_order_id},
+                    retry=False,
+                )
+            except (APIError, httpx.TransportError):
+                return None  # not found (or unknown), resubmitting is safe under the same id
+
+        response = await self._request(
+            "POST", self.trading_url, "/orders", json=data, before_retry=submitted
+        )
+        return Order(**response)
+
+    @instrumented("alpaca")
+    async def get_order_by_id(self, order_id: UUID | str) -> Order:
+        return Order(**await self._request("GET", self.trading_url, f"/orders/{order_id}"))
+
+    @instrumented("alpaca")
+    async def get_stock_latest_trade(
+        self, request_params: StockLatestTradeRequest
+    ) -> dict[str, Trade]:
+        response = await self._request(
+            "GET", self.data_url, "/stocks/trades/latest", request_params.to_request_fields()
+        )
+        return cast(dict[str, Trade], parse_obj_as_symbol_dict(Trade, response.get("trades")))
+
+    @instrumented("alpaca")
+    async def get_option_snapshot(
+        self, request_params: OptionSnapshotRequest
+    ) -> dict[str, OptionsSnapshot] | dict[str, RawData]:
+        """Snapshots (latest quote and trade, greeks) of any number of option symbols, in
+        batches of `OPTION_SYMBOLS_BATCH` symbols requested concurrently."""
+        params = request_params.to_request_fields()
+        symbols = params.pop("symbols").split(",")
+
+        async def fetch(batch: list[str]) -> dict[str, Any]:
+            snapshots: dict[str, Any] = {}
+            page_token = None
+            while True:
+                response = await self._request(
+                    "GET",
+                    self.data_url,
+                    "/options/snapshots",
+                    {
+                        **params,
+                        "symbols": batch,
+                        "limit": OPTION_SNAPSHOTS_PAGE,
+                        **({"page_token": page_token} if page_token else {}),
+                    },
+                    api_version="v1beta1",
+                )
+                snapshots.update(response.get("snapshots") or {})
+                if not (page_token := response.get("next_page_token")):
+                    return snapshots
+
+        batches = await asyncio.gather(
+            *(
+                fetch(symbols[i : i + OPTION_SYMBOLS_BATCH])
+                for i in range(0, len(symbols), OPTION_SYMBOLS_BATCH)
+            )
+        )
+        snapshots = {symbol: raw for batch in batches for symbol, raw in batch.items()}
+        if self.raw_data:
+            return snapshots
+        return cast(
+            dict[str, OptionsSnapshot], parse_obj_as_symbol_dict(OptionsSnapshot, snapshots)
+        )
+
+
+class BlockingAlpacaClient:
+    """Synchronous facade over `AsyncAlpacaClient`: coroutines run on one dedicated event
+    loop thread, so blocking callers on any thread share the same pooled session."""
+
+    def __init__(self, aclient: AsyncAlpacaClient) -> None:
+        self.aclient = aclient
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="alpaca-http", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        future: Future[T] = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result()
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.aclient, name)
+        if not asyncio.iscoroutinefunction(method):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.run(method(*args, **kwargs))
+
+    def close(self) -> None:
+        if self.loop.is_running():
+            self.run(self.aclient.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
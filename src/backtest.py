@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import csv
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from src.option_chain import StrikeSelection
+from src.pricing import black_scholes
+
+TRADING_DAYS = 252
+CONTRACT_SIZE = 100
+
+
+@dataclass
+class PriceSeries:
+    """Daily bars of one underlying. `open` is optional, entries use the close if absent."""
+
+    dates: np.ndarray  # datetime64[D]
+    close: np.ndarray
+    open: np.ndarray | None = None
+
+    @classmethod
+    def from_csv(
+        cls, path: str, date_column: str = "date", close_column: str = "close"
+    ) -> PriceSeries:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            raise RuntimeError(f"No price data in `{path}`!")
+        rows.sort(key=lambda r: r[date_column])
+        return cls(
+            dates=np.array([r[date_column][:10] for r in rows], dtype="datetime64[D]"),
+            close=np.array([float(r[close_column]) for r in rows]),
+            open=np.array([float(r["open"]) for r in rows]) if "open" in rows[0] else None,
+        )
+
+    @classmethod
+    def synthetic(
+        cls,
+        years: float = 20,
+        start_price: float = 100.0,
+        drift: float = 0.07,
+        volatility: float = 0.2,
+        seed: int | None = 0,
+        start: date = date(2000, 1, 3),
+    ) -> PriceSeries:
+        """Geometric Brownian motion sampled on business days."""
+        n = int(years * TRADING_DAYS)
+        first = np.datetime64(start, "D")
+        dates = np.busday_offset(first, np.arange(n), roll="forward")
+        dt = 1 / TRADING_DAYS
+        shocks = np.random.default_rng(seed).standard_normal(n)
+        log_returns = (drift - volatility**2 / 2) * dt + volatility * np.sqrt(dt) * shocks
+        log_returns[0] = 0.0
+        return cls(dates=dates, close=start_price * np.exp(np.cumsum(log_returns)))
+
+
+@dataclass
+class ExpiryCycles:
+    """One row per trade cycle: the bar the bot sells on, and the bar of the Friday expiry
+    it picks. The next cycle starts on the bar after expiry, like the live bot, which only
+    trades while it holds no contracts."""
+
+    entry_dates: np.ndarray
+    expiry_dates: np.ndarray
+    entry: np.ndarray
+    expiry: np.ndarray
+    years_to_expiry: np.ndarray
+
+    @classmethod
+    def from_prices(cls, prices: PriceSeries, target_dte: int | None = None) -> ExpiryCycles:
+        days = prices.dates.astype("datetime64[D]").astype(np.int64)
+        if target_dte is None:
+            # weekly: sell on the first bar of each Monday-to-Friday week, expire on its last
+            weeks = (days + 3) // 7  # 1970-01-01 was a Thursday, shift so weeks start Monday
+            starts = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+            ends = np.r_[starts[1:] - 1, len(days) - 1]
+        else:
+            starts, ends = cls._dte_cycles(days, target_dte)
+        opens = prices.open if prices.open is not None else prices.close
+        return cls(
+            entry_dates=prices.dates[starts],
+            expiry_dates=prices.dates[ends],
+            entry=opens[starts],
+            expiry=prices.close[ends],
+            years_to_expiry=(ends - starts + 1) / TRADING_DAYS,
+        )
+
+    @staticmethod
+    def _dte_cycles(days: np.ndarray, target_dte: int) -> tuple[np.ndarray, np.ndarray]:
+        """Cycles expiring on the Friday closest to `target_dte` days out, ties going to the
+        earlier one, as `ExpirationCalendar.nearest_to_dte` picks among weekly listings."""
+        starts, ends = [], []
+        i = 0
+        while i < len(days):
+            target = int(days[i]) + target_dte
+            before = target - ((target + 3) % 7 - 4) % 7  # Friday on or before the target
+            fridays = [f for f in (before, before + 7) if f >= days[i]]
+            expiry = min(fridays, key=lambda f: (abs(f - target), f))
+            if expiry > days[-1]:
+                break
+            end = int(np.searchsorted(days, expiry, side="right")) - 1
+            starts.append(i)
+            ends.append(end)
+            i = end + 1
+        return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+
+def listed_strike(target: np.ndarray, step: float, selection: StrikeSelection) -> np.ndarray:
+    """Snap target strikes to a grid of `step`, as `OptionChain.index` picks listed ones."""
+    if step <= 0:
+        return target
+    snap = {"above": np.ceil, "below": np.floor, "nearest": np.round}[selection]
+    return np.maximum(snap(target / step) * step, step)
+
+
+@dataclass
+class BacktestResult:
+    call_margins: np.ndarray
+    put_margins: np.ndarray
+    expiry_dates: np.ndarray
+    equity: np.ndarray  # cycles x configs, marked at each expiry
+    premiums: np.ndarray
+    assignments: np.ndarray
+    initial_cash: float
+
+    @property
+    def final_equity(self) -> np.ndarray:
+        return self.equity[-1]
+
+    @property
+    def total_return(self) -> np.ndarray:
+        return self.final_equity / self.initial_cash - 1
+
+    @property
+    def cagr(self) -> np.ndarray:
+        days = (self.expiry_dates[-1] - self.expiry_dates[0]).astype(int)
+        years = max(days / 365.25, 1 / 52)
+        return (self.final_equity / self.initial_cash) ** (1 / years) - 1
+
+    @property
+    def max_drawdown(self) -> np.ndarray:
+        peaks = np.maximum(np.maximum.accumulate(self.equity, axis=0), self.initial_cash)
+        return np.max(1 - self.equity / peaks, axis=0)
+
+    def ranked(self, by: str = "cagr") -> np.ndarray:
+        """Config indices, best first."""
+        metric = getattr(self, by)
+        return np.argsort(-metric if by != "max_drawdown" else metric, kind="stable")
+
+
+def margin_range(value: str) -> np.ndarray:
+    """`0.05` for a single margin or `start:stop:num` for an evenly spaced range."""
+    parts = [float(p) for p in value.split(":")]
+    if len(parts) == 1:
+        return np.array(parts)
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError("expected `margin` or `start:stop:num`")
+    return np.linspace(parts[0], parts[1], int(parts[2]))
+
+
+def margin_grid(
+    call_margins: np.ndarray, put_margins: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Every (call, put) combination, flattened into two aligned arrays."""
+    calls, puts = np.meshgrid(call_margins, put_margins, indexing="ij")
+    return calls.ravel(), puts.ravel()
+
+
+def run_backtest(
+    prices: PriceSeries,
+    call_margins: np.ndarray,
+    put_margins: np.ndarray,
+    volatility: float = 0.25,
+    rate: float = 0.04,
+    initial_cash: float = 100_000.0,
+    strike_step: float = 1.0,
+    selection: StrikeSelection = "above",
+    fee_per_contract: float = 0.0,
+    target_dte: int | None = None,
+) -> BacktestResult:
+    """Replay `AlpacaClient.trade_options` for every (call, put) margin pair: sell covered
+    calls while holding shares and cash-secured puts otherwise, expiring next Friday (or
+    the Friday closest to `target_dte`), with assignment at expiry and Black-Scholes
+    premiums at `volatility`.
+
+    Strikes and premiums of all cycles and configs are computed up front as cycles x
+    configs arrays. Only the wheel's position state carries over from cycle to cycle, so
+    the one remaining loop is over cycles, with each step vectorized over all configs."""
+    call_margins = np.asarray(call_margins, dtype=float)
+    put_margins = np.asarray(put_margins, dtype=float)
+    if call_margins.shape != put_margins.shape:
+        raise ValueError("`call_margins` and `put_margins` must have the same shape")
+
+    cycles = ExpiryCycles.from_prices(prices, target_dte)
+    entry, expiry = cycles.entry[:, None], cycles.expiry[:, None]
+    years = cycles.years_to_expiry[:, None]
+    call_strikes = listed_strike(entry * (1 + call_margins), strike_step, selection)
+    put_strikes = listed_strike(entry * (1 - put_margins), strike_step, selection)
+    call_premiums = black_scholes(entry, call_strikes, years, volatility, rate, call=True)
+    put_premiums = black_scholes(entry, put_strikes, years, volatility, rate, call=False)
+    called_away = expiry > call_strikes
+    put_assigned = expiry < put_strikes
+
+    n_cycles, n_configs = call_strikes.shape
+    cash = np.full(n_configs, float(initial_cash))
+    shares = np.zeros(n_configs)
+    premiums = np.zeros(n_configs)
+    assignments = np.zeros(n_configs, dtype=np.int64)
+    equity = np.empty((n_cycles, n_configs))
+
+    for i in range(n_cycles):
+        sell_puts = shares <= 0
+        calls = np.floor(shares / CONTRACT_SIZE)
+        puts = np.where(sell_puts, np.floor(cash / (CONTRACT_SIZE * put_strikes[i])), 0.0)
+
+        credit = CONTRACT_SIZE * (calls * call_premiums[i] + puts * put_premiums[i])
+        credit -= fee_per_contract * (calls + puts)
+        cash += credit
+        premiums += credit
+
+        delivered = np.where(called_away[i], calls * CONTRACT_SIZE, 0.0)
+        bought = np.where(put_assigned[i], puts * CONTRACT_SIZE, 0.0)
+        cash += delivered * call_strikes[i] - bought * put_strikes[i]
+        shares += bought - delivered
+        assignments += (delivered > 0) + (bought > 0)
+        equity[i] = cash + shares * cycles.expiry[i]
+
+    return BacktestResult(
+        call_margins=call_margins,
+        put_margins=put_margins,
+        expiry_dates=cycles.expiry_dates,
+        equity=equity,
+        premiums=premiums,
+        assignments=assignments,
+        initial_cash=initial_cash,
+    )
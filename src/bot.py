@@ -1,38 +1,88 @@
 from __future__ import annotations
 
+import contextvars
 import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable
 
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobEvent
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from src.alpaca_client import AlpacaClient
+from src.journal import Journal
+from src.metrics import METRICS, MetricsServer
+from src.portfolio import PositionRecord, format_number
+from src.rate_limit import request_deadline
 from src.schemas import AlpacaEnv, Settings, TelegramEnv
+from src.scheduler import SafeBlockingScheduler, job_executors, job_options, job_trigger
+from src.settings_watcher import SettingsWatcher
 from src.telegram_bot import TelegramBot
-from src.utils import SafeBlockingScheduler
+
+if TYPE_CHECKING:
+    from src.cassette import TransportWrapper
 
 logger = logging.getLogger()
 
+METRICS_DUMP_PATH = os.path.join("logs", "metrics.jsonl")
+JOBS = ["trade_options", "check_value"]
+# settings a running bot can't switch to: clients, pools and the jobs started with them
+RESTART_SETTINGS = {
+    "paper_trading",
+    "cache_dir",
+    "stream_fills",
+    "raw_data",
+    "log_format",
+    "metrics_port",
+    "metrics_dump_interval",
+    "journal_path",
+    "state_save_interval",
+    "watch_settings",
+    "rate_limit",
+}
+
 
-def _format_position(symbol: str, data: dict, currency: str) -> str:
-    qty = data["qty"] or "0"
-    if symbol == currency:
-        return f"${float(qty):,.2f}"
-    price = float(data["price"] or 0)
-    return f"{qty} x ${price:,.2f}"
+def _format_position(p: PositionRecord, currency: str) -> str:
+    if p.symbol == currency:
+        return f"${p.qty:,.2f}"
+    return f"{format_number(p.qty)} x ${p.price or 0:,.2f}"
 
 
 class OptionsBot:
     notify_on_trade = True
     notify_on_check = False
+    journal: Journal | None = None
+    metrics_server: MetricsServer | None = None
+    settings_watcher: SettingsWatcher | None = None
 
     def __init__(
-        self, settings: Settings, alpaca_env: AlpacaEnv, telegram_env: TelegramEnv
+        self,
+        settings: Settings,
+        alpaca_env: AlpacaEnv,
+        telegram_env: TelegramEnv,
+        settings_path: str | None = None,
+        wrap_transport: TransportWrapper | None = None,
     ) -> None:
         self.settings = settings
+        self.settings_path = settings_path
         logger.debug(f"{settings.bot_name} initializing...")
-        self.telegram_bot = TelegramBot(telegram_env)
-        self.alpaca_client = AlpacaClient(alpaca_env, settings)
-        self.scheduler = SafeBlockingScheduler(timezone=settings.tz)
+        self.telegram_bot = TelegramBot(telegram_env, wrap_transport=wrap_transport)
+        self.telegram_bot.connect()  # handshake with Telegram while the tickers are validated
+        self.alpaca_client = AlpacaClient(alpaca_env, settings, wrap_transport=wrap_transport)
+        self.scheduler = SafeBlockingScheduler(
+            timezone=settings.tz, executors=job_executors(settings.scheduler, JOBS)
+        )
+        self.scheduler.add_listener(
+            self._on_job_skipped, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
+        if settings.metrics_port is not None:
+            self.metrics_server = MetricsServer(port=settings.metrics_port)
+            self.metrics_server.start()
+        if settings.journal_path is not None:
+            self.journal = Journal(settings.journal_path)
         self.telegram_bot.send_message(msg=f"🔆 {settings.bot_name} is running!")
 
     def run(self) -> None:
@@ -41,9 +91,8 @@ class OptionsBot:
         )
         self.scheduler.add_job(
             self.run_trade_options,
-            CronTrigger.from_crontab(
-                self.settings.trade_options_schedule, timezone=self.settings.tz
-            ),
+            self._trigger(self.settings.trade_options_schedule),
+            **job_options(self.settings.scheduler, "trade_options"),
         )
 
         logger.info(
@@ -51,35 +100,162 @@ class OptionsBot:
         )
         self.scheduler.add_job(
             self.run_check_value,
-            CronTrigger.from_crontab(self.settings.check_value_schedule, timezone=self.settings.tz),
+            self._trigger(self.settings.check_value_schedule),
+            **job_options(self.settings.scheduler, "check_value"),
         )
 
-        self.scheduler.start()
+        if self.settings.state_save_interval is not None:
+            self.scheduler.add_job(
+                self.alpaca_client.save_state,
+                IntervalTrigger(seconds=self.settings.state_save_interval),
+            )
+
+        if self.settings.metrics_dump_interval is not None:
+            self.scheduler.add_job(
+                METRICS.dump_json,
+                IntervalTrigger(seconds=self.settings.metrics_dump_interval),
+                args=[METRICS_DUMP_PATH],
+            )
+
+        if self.settings_path is not None and self.settings.watch_settings:
+            self.settings_watcher = SettingsWatcher(
+                self.settings_path, self.settings, self.apply_settings, self._report_error
+            )
+            self.settings_watcher.start()
 
-    def run_trade_options(self) -> None:
         try:
-            self.trade_options(telegram=self.notify_on_trade)
-        except Exception as e:
-            error_msg = f"Error during trade_options: {e}"
-            logger.error(error_msg)
-            self.telegram_bot.send_message(msg=f"⚠️ {error_msg}")
+            self.scheduler.start()
+        finally:
+            self.close()
+
+    def _trigger(self, schedule: str) -> BaseTrigger:
+        return job_trigger(schedule, self.settings.tz, self.alpaca_client.trading_calendar)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Switch to edited `settings` without a restart, keeping clients and caches: the
+        tickers and their margins are swapped in place and the jobs rescheduled. Changes
+        to `RESTART_SETTINGS`, `scheduler.executors` and, with per-job pools sized to it,
+        a job's `max_instances` are kept for the next start. Raises `RuntimeError`,
+        changing nothing, if a new ticker has no price."""
+        old = self.settings
+        changed = [n for n in Settings.model_fields if getattr(settings, n) != getattr(old, n)]
+        deferred = [n for n in changed if n in RESTART_SETTINGS]
+        if settings.scheduler.executors != old.scheduler.executors:
+            deferred.append("scheduler.executors")
+        scheduler = settings.scheduler.model_copy(update={"executors": old.scheduler.executors})
+        if old.scheduler.executors == "per_job":
+            for job in JOBS:
+                max_instances = getattr(old.scheduler, job).max_instances
+                if getattr(scheduler, job).max_instances != max_instances:
+                    deferred.append(f"scheduler.{job}.max_instances")
+                    job_settings = getattr(scheduler, job).model_copy(
+                        update={"max_instances": max_instances}
+                    )
+                    scheduler = scheduler.model_copy(update={job: job_settings})
+        kept = {n: getattr(old, n) for n in deferred if "." not in n}
+        settings = settings.model_copy(update={"scheduler": scheduler, **kept})
+        self.alpaca_client.apply_settings(settings)
+        self.settings = settings
+
+        for job, schedule, old_schedule in [
+            ("trade_options", settings.trade_options_schedule, old.trade_options_schedule),
+            ("check_value", settings.check_value_schedule, old.check_value_schedule),
+        ]:
+            if (schedule, settings.timezone) != (old_schedule, old.timezone):
+                logger.info(f"Schedule {job}: '{schedule}' ({settings.tz})")
+                self.scheduler.reschedule_job(job, trigger=self._trigger(schedule))
+            options = job_options(settings.scheduler, job)
+            if options != job_options(old.scheduler, job):
+                del options["id"]
+                self.scheduler.modify_job(job, **options)
+
+        applied = [n for n in changed if getattr(settings, n) != getattr(old, n)] or ["nothing"]
+        msg = f"settings reloaded, applied {', '.join(applied)}"
+        if deferred:
+            msg += f"; restart to apply {', '.join(deferred)}"
+        logger.info(msg)
+        self.telegram_bot.send_message(msg=f"🔧 {msg}")
+
+    def close(self) -> None:
+        if self.settings_watcher is not None:
+            self.settings_watcher.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.journal is not None:
+            self.journal.close()
+        self.alpaca_client.save_state()
+        self.alpaca_client.close()
+        self.telegram_bot.close()  # delivers messages still queued
+
+    def run_trade_options(self) -> None:
+        self._run_job("trade_options", lambda: self.trade_options(telegram=self.notify_on_trade))
 
     def run_check_value(self) -> None:
+        self._run_job("check_value", lambda: self.report_value(telegram=self.notify_on_check))
+
+    def _run_job(self, name: str, job: Callable[[], None]) -> None:
+        """Run a scheduled job, reporting its errors and runs over its latency budget.
+        Failed requests are only retried within that budget."""
+        budget = getattr(self.settings.scheduler, name).latency_budget
+        start = time.perf_counter()
         try:
-            self.report_value(telegram=self.notify_on_check)
+            with METRICS.timer("job", name), request_deadline(budget):
+                job()
         except Exception as e:
-            error_msg = f"Error during check_value: {e}"
-            logger.error(error_msg)
-            self.telegram_bot.send_message(msg=f"⚠️ {error_msg}")
+            self._report_error(f"Error during {name}: {e}")
+        elapsed = time.perf_counter() - start
+        if budget is not None and elapsed > budget:
+            self._report_error(f"{name} took {elapsed:.1f}s, over its {budget:g}s budget")
+
+    def _on_job_skipped(self, event: JobEvent) -> None:
+        reason = "missed its start time" if event.code == EVENT_JOB_MISSED else "still running"
+        self._report_error(f"Skipped a run of {event.job_id}: {reason}")
+
+    def _report_error(self, error_msg: str) -> None:
+        logger.error(error_msg)
+        self.telegram_bot.send_message(msg=f"⚠️ {error_msg}")
 
     def trade_options(self, telegram: bool = False) -> None:
-        if trade := self.alpaca_client.trade_options():
+        """Run the per-ticker trade cycles concurrently on a bounded worker pool. The
+        positions snapshot and expiration calendars are prefetched once up front and shared
+        by all cycles, and cash is split between the tickers that sell cash-secured puts."""
+        tickers = self.settings.tickers
+        self.alpaca_client.prefetch()
+        cash = self.alpaca_client.cash_allocations()
+        with ThreadPoolExecutor(
+            max_workers=min(self.settings.max_workers, len(tickers)),
+            thread_name_prefix="trade",
+        ) as pool:
+            # each cycle runs in a copy of this context, so it keeps the request deadline
+            futures = {
+                t.ticker: pool.submit(
+                    contextvars.copy_context().run,
+                    self.alpaca_client.trade_options,
+                    t,
+                    cash.get(t.ticker),
+                )
+                for t in tickers
+            }
+
+        trades = []
+        for ticker, future in futures.items():
+            try:
+                if trade := future.result():
+                    trades.append(trade)
+            except Exception as e:
+                self._report_error(f"Error during trade_options for {ticker}: {e}")
+
+        for trade in trades:
             self.report_trade(trade, telegram=telegram)
+        if trades:
+            self.alpaca_client.refresh_snapshot()  # so reports reflect the new contracts
             self.report_positions(telegram=telegram)
             self.report_value(telegram=telegram)
 
     def report_trade(self, trade: dict, telegram: bool = False) -> None:
         logger.info(json.dumps({"trade": trade}))
+        if self.journal is not None:
+            self.journal.record_trade(trade)
         if telegram:
             msg = (
                 f"{trade['side']} {trade['symbol']} x {trade['qty']}"
@@ -88,17 +264,22 @@ class OptionsBot:
             self.telegram_bot.send_message(msg=f"🤝 {msg}")
 
     def report_positions(self, telegram: bool = False) -> None:
-        positions = self.alpaca_client.positions
+        snapshot = self.alpaca_client.snapshot
+        positions = snapshot.holdings.to_dict()
         logger.info(json.dumps({"positions": positions}))
+        if self.journal is not None:
+            self.journal.record_positions(positions)
         if telegram:
-            currency = str(self.alpaca_client.account.currency)
             rows = "\n".join(
-                f"  {s}: {_format_position(s, d, currency)}," for s, d in positions.items()
+                f"  {p.symbol}: {_format_position(p, snapshot.currency)},"
+                for p in snapshot.holdings
             )
             self.telegram_bot.send_message(msg=f"💰 positions: {{\n{rows}\n}}")
 
     def report_value(self, telegram: bool = False) -> None:
         value = self.alpaca_client.portfolio_value
         logger.info(json.dumps({"portfolio_value": value}))
+        if self.journal is not None:
+            self.journal.record_value(value)
         if telegram:
             self.telegram_bot.send_message(msg=f"💲 portfolio value: ${value:,.2f}")
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+logger = logging.getLogger()
+
+CASSETTE_VERSION = 1
+REAL_TIME = 1.0
+INSTANT = math.inf
+VOLATILE_FIELDS = {"client_order_id"}  # random per request, so not part of its identity
+KEPT_HEADERS = {"content-type", "retry-after"}  # all the clients read of a response
+
+_TELEGRAM_TOKEN = re.compile(r"/bot[^/]+/")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+TransportWrapper = Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]
+
+
+def parse_speed(value: str) -> float:
+    """Replay speed from `real`, `instant` or a factor (`10` replays ten times faster)."""
+    if value == "real":
+        return REAL_TIME
+    if value == "instant":
+        return INSTANT
+    speed = float(value)
+    if speed <= 0:
+        raise ValueError(f"speed must be positive, got {value}")
+    return speed
+
+
+def request_key(request: httpx.Request) -> tuple[str, str, str]:
+    """What identifies a request on a cassette: method, URL without the Telegram token or
+    `VOLATILE_FIELDS`, and a digest of the body without them."""
+    url = urlsplit(_TELEGRAM_TOKEN.sub("/bot<token>/", str(request.url)))
+    query = urlencode([(k, v) for k, v in parse_qsl(url.query) if k not in VOLATILE_FIELDS])
+    body = request.content
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        stable = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+        body = json.dumps(stable, sort_keys=True).encode()
+    digest = hashlib.sha1(body).hexdigest()[:16] if body else ""
+    return request.method, urlunsplit(url._replace(query=query)), digest
+
+
+def _target(url: str) -> str:
+    """Path and query of `url`: a replay may go to other hosts, e.g. the live API's."""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _dateless_target(url: str) -> str:
+    """`_target` with the values of date parameters masked, since a replay on another day
+    asks for other dates (a calendar month, a range of expirations)."""
+    parts = urlsplit(url)
+    query = urlencode([(k, "<date>" if _DATE.match(v) else v) for k, v in parse_qsl(parts.query)])
+    return f"{parts.path}?{query}" if query else parts.path
+
+
+@dataclass
+class Interaction:
+    """One request and its response, `at` seconds into the session and `duration`
+    seconds apart."""
+
+    at: float
+    duration: float
+    method: str
+    url: str
+    body: str  # digest of the request body, see `request_key`
+    status: int
+    headers: dict[str, str]
+    content: bytes
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return self.method, _target(self.url), self.body
+
+    @property
+    def dateless_key(self) -> tuple[str, str]:
+        return self.method, _dateless_target(self.url)
+
+    def to_dict(self) -> dict[str, Any]:
+        try:
+            content, encoding = self.content.decode(), None
+        except UnicodeDecodeError:
+            content, encoding = base64.b64encode(self.content).decode(), "base64"
+        raw = {
+            "at": round(self.at, 4),
+            "duration": round(self.duration, 4),
+            "method": self.method,
+            "url": self.url,
+            "body": self.body,
+            "status": self.status,
+            "headers": self.headers,
+            "content": content,
+        }
+        return raw if encoding is None else {**raw, "encoding": encoding}
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> Interaction:
+        content = raw["content"]
+        return cls(
+            at=raw["at"],
+            duration=raw["duration"],
+            method=raw["method"],
+            url=raw["url"],
+            body=raw["body"],
+            status=raw["status"],
+            headers=raw["headers"],
+            content=(
+                base64.b64decode(content) if raw.get("encoding") == "base64" else content.encode()
+            ),
+        )
+
+
+class CassetteRecorder:
+    """Records every exchange of the clients whose transports it wraps (Alpaca's and
+    Telegram's alike) to a gzipped JSON-lines cassette, one line per exchange as it
+    completes, so a session that dies keeps what it recorded. Only the headers in
+    `KEPT_HEADERS` are kept and the Telegram token is dropped from URLs. API keys are
+    never stored because they travel in request headers."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self.recorded = 0
+        self._write({"version": CASSETTE_VERSION, "started_at": time.time()})
+
+    def transport(self, transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+        return RecordingTransport(self, transport)
+
+    def add(self, interaction: Interaction) -> None:
+        with self._lock:
+            self._write(interaction.to_dict())
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        logger.info(f"Recorded {self.recorded} HTTP exchanges to {self.path}")
+
+    def _write(self, line: dict[str, Any]) -> None:
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, recorder: CassetteRecorder, transport: httpx.AsyncBaseTransport) -> None:
+        self.recorder = recorder
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        try:
+            content = await response.aread()  # decoded, so `content-encoding` is dropped
+        finally:
+            await response.aclose()
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        method, url, body = request_key(request)
+        self.recorder.add(
+            Interaction(
+                at=start - self.recorder._start,
+                duration=time.monotonic() - start,
+                method=method,
+                url=url,
+                body=body,
+                status=response.status_code,
+                headers=headers,
+                content=content,
+            )
+        )
+        return httpx.Response(response.status_code, headers=headers, content=content)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class CassetteMiss(LookupError):
+    """A replayed session sent a request its cassette has no (more) responses for."""
+
+
+@dataclass
+class Cassette:
+    started_at: float  # epoch seconds the recording started
+    interactions: list[Interaction]
+
+    @classmethod
+    def load(cls, path: str) -> Cassette:
+        lines = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    lines.append(json.loads(line))
+            except (EOFError, ValueError):  # cut short by a session that died
+                logger.warning(f"{path} is truncated, replaying its first {len(lines)} lines")
+        if not lines or lines[0].get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette")
+        return cls(lines[0]["started_at"], [Interaction.from_dict(raw) for raw in lines[1:]])
+
+    def replayer(self, speed: float = REAL_TIME) -> CassetteReplayer:
+        return CassetteReplayer(self, speed)
+
+
+class CassetteReplayer:
+    """Serves a cassette's responses to the clients whose transports it replaces, without
+    a network. A request gets the first unserved response recorded for the same request
+    (see `request_key`, on any host), or else for the same method, path and query but for
+    the dates in it and with any body; anything else is a `CassetteMiss`. Responses follow
+    the session's timeline divided by `speed` (`REAL_TIME`, faster or `INSTANT`), see
+    `delay`."""
+
+    def __init__(self, cassette: Cassette, speed: float = REAL_TIME) -> None:
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._by_key: dict[tuple[str, str, str], deque[int]] = {}
+        self._by_dateless_key: dict[tuple[str, str], deque[int]] = {}
+        self._interactions = cassette.interactions
+        self._served = [False] * len(cassette.interactions)
+        self._first_at = min((i.at for i in cassette.interactions), default=0.0)
+        self._started: float | None = None  # when the replay's first request came
+        for i, interaction in enumerate(cassette.interactions):
+            self._by_key.setdefault(interaction.key, deque()).append(i)
+            self._by_dateless_key.setdefault(interaction.dateless_key, deque()).append(i)
+
+    @property
+    def served(self) -> int:
+        return sum(self._served)
+
+    @property
+    def remaining(self) -> int:
+        return len(self._served) - self.served
+
+    def transport(self, transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+        return ReplayTransport(self)
+
+    def next(self, request: httpx.Request) -> Interaction:
+        method, url, body = request_key(request)
+        key = method, _target(url), body
+        dateless_key = method, _dateless_target(url)
+        with self._lock:
+            for queue in (self._by_key.get(key), self._by_dateless_key.get(dateless_key)):
+                while queue:
+                    i = queue.popleft()
+                    if not self._served[i]:
+                        self._served[i] = True
+                        return self._interactions[i]
+        raise CassetteMiss(f"No recorded response left for {method} {url}")
+
+    def delay(self, interaction: Interaction) -> float:
+        """Seconds to hold back `interaction`'s response: its recorded `duration`, or longer
+        if the replay is ahead of the session, so that the gaps between requests are kept
+        too. Both are divided by `speed`, measured from the first request of the replay."""
+        if math.isinf(self.speed):
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            if self._started is None:
+                self._started = now
+            elapsed = now - self._started
+        due = (interaction.at - self._first_at + interaction.duration) / self.speed
+        return max(interaction.duration / self.speed, due - elapsed)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, replayer: CassetteReplayer) -> None:
+        self.replayer = replayer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        interaction = self.replayer.next(request)
+        if (delay := self.replayer.delay(interaction)) > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            interaction.status, headers=interaction.headers, content=interaction.content
+        )
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from alpaca.common.types import RawData
+from alpaca.data.models import OptionsSnapshot
+from alpaca.data.requests import OptionSnapshotRequest
+from alpaca.trading.enums import ContractType
+
+from src.async_client import BlockingAlpacaClient
+from src.option_chain import OptionChain, OptionChainIndex
+
+logger = logging.getLogger()
+
+QUOTE_TTL = 5.0  # seconds; quotes move, but one trade cycle may look at a chain twice
+
+
+@dataclass
+class ChainQuotes:
+    """Market data of an `OptionChain` as arrays aligned with its strikes: NaN where a
+    contract has no quote (or greek), zero open interest where it is not reported."""
+
+    bid: np.ndarray
+    ask: np.ndarray
+    open_interest: np.ndarray
+    iv: np.ndarray
+    delta: np.ndarray
+    fetched_at: float
+
+    @classmethod
+    def from_snapshots(
+        cls, chain: OptionChain, snapshots: dict[str, OptionsSnapshot] | dict[str, RawData]
+    ) -> ChainQuotes:
+        n = len(chain.symbols)
+        bid, ask, iv, delta = (np.full(n, np.nan) for _ in range(4))
+        for i, symbol in enumerate(chain.symbols):
+            if (snapshot := snapshots.get(symbol)) is not None:
+                bid[i], ask[i], iv[i], delta[i] = _snapshot_fields(snapshot)
+        open_interest = np.array(
+            [float(getattr(c, "open_interest", None) or 0) for c in chain.contracts]
+        )
+        return cls(bid, ask, open_interest, iv, delta, time.monotonic())
+
+    @property
+    def mid(self) -> np.ndarray:
+        """Mid price of two-sided quotes, NaN otherwise."""
+        two_sided = (self.bid > 0) & (self.ask > 0)
+        return np.where(two_sided, (self.bid + self.ask) / 2, np.nan)
+
+
+def _snapshot_fields(snapshot: OptionsSnapshot | RawData) -> tuple[float, ...]:
+    """Bid, ask, implied volatility and delta of a snapshot model or of its raw JSON (from
+    a `raw_data` client), NaN where missing."""
+    if isinstance(snapshot, dict):
+        quote = snapshot.get("latestQuote") or {}
+        greeks = snapshot.get("greeks") or {}
+        fields = (
+            quote.get("bp"),
+            quote.get("ap"),
+            snapshot.get("impliedVolatility"),
+            greeks.get("delta"),
+        )
+    else:
+        quote, greeks = snapshot.latest_quote, snapshot.greeks
+        fields = (
+            quote and quote.bid_price,
+            quote and quote.ask_price,
+            snapshot.implied_volatility,
+            greeks and greeks.delta,
+        )
+    return tuple(np.nan if v is None else v for v in fields)
+
+
+@dataclass(frozen=True)
+class LiquidityFilter:
+    """Minimum bid (dollars), maximum bid-ask spread relative to the mid, and minimum open
+    interest a contract must have to be sold. Unset bounds don't filter."""
+
+    min_bid: float | None = None
+    max_spread: float | None = None
+    min_open_interest: int | None = None
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.min_bid, self.max_spread, self.min_open_interest))
+
+    def mask(self, quotes: ChainQuotes) -> np.ndarray:
+        eligible = np.ones(len(quotes.bid), dtype=bool)
+        with np.errstate(invalid="ignore"):  # NaN quotes compare False, i.e. ineligible
+            if self.min_bid is not None:
+                eligible &= quotes.bid >= self.min_bid
+            if self.max_spread is not None:
+                eligible &= (quotes.ask - quotes.bid) / quotes.mid <= self.max_spread
+            if self.min_open_interest is not None:
+                eligible &= quotes.open_interest >= self.min_open_interest
+        return eligible
+
+
+class ChainQuoteLoader:
+    """Snapshots of every contract in a chain, fetched in batched multi-symbol requests
+    (concurrently, see `AsyncAlpacaClient.get_option_snapshot`) and cached for `ttl`
+    seconds per (underlying, expiration, type). Like chains, quotes of an underlying are
+    dropped once it rolls over to a new expiration."""
+
+    def __init__(
+        self, client: BlockingAlpacaClient, chains: OptionChainIndex, ttl: float = QUOTE_TTL
+    ) -> None:
+        self.client = client
+        self.chains = chains
+        self.ttl = ttl
+        self._quotes: dict[tuple[str, date, ContractType], ChainQuotes] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple[str, date, ContractType], threading.Lock] = {}
+
+    def _fresh(self, key: tuple[str, date, ContractType]) -> ChainQuotes | None:
+        quotes = self._quotes.get(key)
+        if quotes is not None and time.monotonic() - quotes.fetched_at < self.ttl:
+            return quotes
+        return None
+
+    def quotes(
+        self, ticker: str, expiration_date: date, option_type: ContractType
+    ) -> ChainQuotes:
+        key = (ticker, expiration_date, option_type)
+        if (quotes := self._fresh(key)) is not None:
+            return quotes
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if (quotes := self._fresh(key)) is None:
+                chain = self.chains.chain(ticker, expiration_date, option_type)
+                snapshots = (
+                    self.client.get_option_snapshot(
+                        OptionSnapshotRequest(symbol_or_symbols=chain.symbols)
+                    )
+                    if chain.symbols
+                    else {}
+                )
+                quotes = ChainQuotes.from_snapshots(chain, snapshots)
+                logger.debug(
+                    f"Fetched {len(snapshots)}/{len(chain.symbols)} {option_type.value} "
+                    f"snapshots for `{ticker}` expiring {expiration_date}"
+                )
+                with self._lock:
+                    for stale in [
+                        k for k in self._quotes if k[0] == ticker and k[1] != expiration_date
+                    ]:
+                        del self._quotes[stale]
+                        self._key_locks.pop(stale, None)
+                    self._quotes[key] = quotes
+        return quotes
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        with self._lock:
+            for key in [k for k in self._quotes if ticker is None or k[0] == ticker]:
+                del self._quotes[key]
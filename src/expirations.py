@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Any, Iterable
+
+import numpy as np
+from alpaca.trading.enums import ContractType
+
+from src.async_client import BlockingAlpacaClient
+from src.occ import parse_occ_many
+from src.option_chain import iter_option_contracts
+
+logger = logging.getLogger()
+
+HORIZON_DAYS = 60  # listings fetched ahead by default, enough for the nearest Friday
+HORIZON_MARGIN_DAYS = 35  # past the furthest `target_dte`, a monthly cycle to compare with
+
+
+def expiration_horizon(target_dtes: Iterable[int | None]) -> int:
+    """Days of listings to fetch for `nearest_to_dte` to find the listings on both sides
+    of every target in `target_dtes` (None being next Friday)."""
+    furthest = max((d for d in target_dtes if d is not None), default=None)
+    return HORIZON_DAYS if furthest is None else max(HORIZON_DAYS, furthest + HORIZON_MARGIN_DAYS)
+
+
+class ExpirationCalendar:
+    """Listed option expirations per underlying, fetched once per trading day and kept
+    sorted in memory (and optionally on disk) so lookups are a bisect, not an API call.
+    Listings are fetched `horizon_days` ahead, and raising it makes the ones fetched for
+    a shorter horizon stale."""
+
+    def __init__(
+        self,
+        client: BlockingAlpacaClient,
+        cache_dir: str | None = None,
+        horizon_days: int = HORIZON_DAYS,
+    ) -> None:
+        self.client = client
+        self.horizon_days = horizon_days
+        self.path = os.path.join(cache_dir, "expirations.json") if cache_dir else None
+        self._index: dict[str, tuple[date, int, list[date]]] = self._load()
+        self._lock = threading.Lock()
+        self._ticker_locks: dict[str, threading.Lock] = {}
+
+    def expirations(self, ticker: str, today: date) -> list[date]:
+        cached = self._index.get(ticker)
+        if self._fresh(cached, today):
+            return cached[2]  # type: ignore[index]
+        with self._lock:
+            ticker_lock = self._ticker_locks.setdefault(ticker, threading.Lock())
+        with ticker_lock:
+            cached = self._index.get(ticker)
+            if not self._fresh(cached, today):
+                horizon_days = self.horizon_days
+                dates = self._fetch(ticker, today, horizon_days)
+                with self._lock:
+                    self._index[ticker] = (today, horizon_days, dates)
+                    self._save()
+        return self._index[ticker][2]
+
+    def _fresh(self, cached: tuple[date, int, list[date]] | None, today: date) -> bool:
+        return cached is not None and cached[0] == today and cached[1] >= self.horizon_days
+
+    def on_or_before(self, ticker: str, target: date, today: date) -> date | None:
+        """Latest listed expiration in `[today, target]`, if any."""
+        dates = self.expirations(ticker, today)
+        i = bisect_right(dates, target)
+        if i == 0 or dates[i - 1] < today:
+            return None
+        return dates[i - 1]
+
+    def on_or_after(self, ticker: str, target: date, today: date) -> date | None:
+        """Earliest listed expiration on or after `target`, if any."""
+        dates = self.expirations(ticker, today)
+        i = bisect_left(dates, max(target, today))
+        return dates[i] if i < len(dates) else None
+
+    def nearest_to_dte(self, ticker: str, days: int, today: date) -> date | None:
+        """Listed expiration closest to `days` days out, preferring the earlier one on ties."""
+        target = today + timedelta(days=days)
+        candidates = [
+            d
+            for d in (
+                self.on_or_before(ticker, target, today),
+                self.on_or_after(ticker, target, today),
+            )
+            if d is not None
+        ]
+        return min(candidates, key=lambda d: (abs((d - target).days), d), default=None)
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        if ticker is None:
+            self._index.clear()
+        else:
+            self._index.pop(ticker, None)
+
+    def _fetch(self, ticker: str, today: date, horizon_days: int) -> list[date]:
+        symbols = [
+            contract.symbol
+            for contract in iter_option_contracts(
+                self.client,
+                underlying_symbols=[ticker],
+                expiration_date_gte=today,
+                expiration_date_lte=today + timedelta(days=horizon_days),
+                type=ContractType.CALL,
+            )
+        ]
+        parsed = parse_occ_many(symbols)
+        expirations = np.unique(parsed.expiration[parsed.of(ticker)]).tolist()
+        logger.debug(f"Fetched {len(expirations)} expiration dates for `{ticker}`")
+        return expirations
+
+    def _load(self) -> dict[str, tuple[date, int, list[date]]]:
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                raw: dict[str, Any] = json.load(f)
+            return {
+                ticker: (
+                    date.fromisoformat(entry["fetched"]),
+                    int(entry.get("horizon", HORIZON_DAYS)),
+                    [date.fromisoformat(d) for d in entry["dates"]],
+                )
+                for ticker, entry in raw.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable expiration cache {self.path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        raw = {
+            ticker: {
+                "fetched": fetched.isoformat(),
+                "horizon": horizon_days,
+                "dates": [d.isoformat() for d in dates],
+            }
+            for ticker, (fetched, horizon_days, dates) in self._index.items()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(raw, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write expiration cache {self.path}: {e}")
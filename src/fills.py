@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from alpaca.trading.enums import TradeEvent
+from alpaca.trading.models import Order, TradeUpdate
+from alpaca.trading.stream import TradingStream
+
+logger = logging.getLogger()
+
+RESOLVING_EVENTS = {
+    TradeEvent.FILL,
+    TradeEvent.PARTIAL_FILL,
+    TradeEvent.CANCELED,
+    TradeEvent.EXPIRED,
+    TradeEvent.REJECTED,
+}
+MAX_UNCLAIMED_UPDATES = 1000
+CONNECTION_CHECK_INTERVAL = 0.25
+
+
+class _TradingStream(TradingStream):
+    """`TradingStream` that exposes whether the websocket is currently connected, and
+    counts connections so that a drop-and-reconnect can't go unnoticed."""
+
+    def __init__(self, *args, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        super().__init__(*args, **kwargs)
+        self.connected = threading.Event()
+        self.connections = 0
+
+    async def _start_ws(self) -> None:
+        await super()._start_ws()
+        self.connections += 1
+        self.connected.set()
+
+    async def close(self) -> None:
+        self.connected.clear()
+        await super().close()
+
+
+class FillTracker:
+    """Resolves per-order futures from Alpaca's trade-updates websocket, which runs on a
+    single background connection. Updates that arrive before the order is tracked (the
+    stream can beat `submit_order` returning) are held until claimed."""
+
+    def __init__(
+        self, api_key: str, api_secret: str, paper: bool = True, url_override: str | None = None
+    ) -> None:
+        self.stream = _TradingStream(api_key, api_secret, paper=paper, url_override=url_override)
+        self.stream.subscribe_trade_updates(self._on_trade_update)
+        self._futures: dict[str, Future[Order]] = {}
+        self._unclaimed: OrderedDict[str, Order] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self.stream.connected.is_set()
+
+    def start(self, wait: float = 0) -> bool:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.stream.run, name="trade-updates", daemon=True
+            )
+            self._thread.start()
+        return self.stream.connected.wait(wait) if wait else self.connected
+
+    def stop(self) -> None:
+        loop = self.stream._loop
+        if self._thread is not None and loop is not None and loop.is_running():
+            self.stream.stop()
+            # closing the socket wakes the consumer, which otherwise checks for stop every 5s
+            asyncio.run_coroutine_threadsafe(self.stream.close(), loop).result(timeout=5)
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def track(self, order_id: str) -> Future[Order]:
+        with self._lock:
+            future = self._futures.setdefault(order_id, Future())
+            if (order := self._unclaimed.pop(order_id, None)) is not None:
+                self._resolve(order_id, order)
+        return future
+
+    def untrack(self, order_id: str) -> None:
+        with self._lock:
+            self._futures.pop(order_id, None)
+
+    def wait(self, order_id: str, timeout: float) -> Order | None:
+        """Wait for the order to resolve, returning None on timeout or if the stream
+        drops, so the caller can fall back to polling."""
+        connection = self.stream.connections
+        future = self.track(order_id)
+        deadline = time.monotonic() + timeout
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+                if future.done():
+                    return future.result()
+                if not self.connected or self.stream.connections != connection:
+                    return None
+                try:
+                    return future.result(timeout=min(remaining, CONNECTION_CHECK_INTERVAL))
+                except FutureTimeoutError:
+                    pass
+            return future.result() if future.done() else None
+        finally:
+            self.untrack(order_id)
+
+    async def _on_trade_update(self, update: TradeUpdate) -> None:
+        if update.event not in RESOLVING_EVENTS:
+            return
+        order_id = str(update.order.id)
+        logger.debug(f"Trade update for order {order_id}: {update.event}")
+        with self._lock:
+            if order_id in self._futures:
+                self._resolve(order_id, update.order)
+            else:
+                self._unclaimed[order_id] = update.order
+                while len(self._unclaimed) > MAX_UNCLAIMED_UPDATES:
+                    self._unclaimed.popitem(last=False)
+
+    def _resolve(self, order_id: str, order: Order) -> None:
+        future = self._futures.pop(order_id)
+        if not future.done():
+            future.set_result(order)
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Literal
+
+from src.occ import occ_underlying
+
+logger = logging.getLogger()
+
+JOURNAL_PATH = os.path.join("logs", "journal.db")
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0  # seconds a record may wait for more to batch with
+CONTRACT_SIZE = 100
+
+Period = Literal["day", "week", "month", "quarter", "year"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    underlying TEXT,
+    type TEXT,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL NOT NULL,
+    status TEXT,
+    UNIQUE (time, symbol, side, qty)
+);
+CREATE INDEX IF NOT EXISTS trades_symbol ON trades (symbol, time);
+CREATE INDEX IF NOT EXISTS trades_underlying ON trades (underlying, time);
+CREATE TABLE IF NOT EXISTS positions (
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL,
+    UNIQUE (time, symbol)
+);
+CREATE INDEX IF NOT EXISTS positions_symbol ON positions (symbol, time);
+CREATE TABLE IF NOT EXISTS portfolio_values (
+    time REAL PRIMARY KEY,
+    value REAL NOT NULL
+) WITHOUT ROWID;
+"""
+# the unique constraints lead with `time`, so they double as the time indexes and make
+# re-imports of the same log lines no-ops
+
+INSERTS = {
+    "trades": "INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "positions": "INSERT OR IGNORE INTO positions VALUES (?, ?, ?, ?)",
+    "portfolio_values": "INSERT OR IGNORE INTO portfolio_values VALUES (?, ?)",
+}
+
+PERIOD_FORMATS = {
+    "day": "strftime('%Y-%m-%d', time, 'unixepoch')",
+    "week": "strftime('%Y-W%W', time, 'unixepoch')",
+    "month": "strftime('%Y-%m', time, 'unixepoch')",
+    "quarter": "strftime('%Y', time, 'unixepoch') || '-Q' || "
+    "((CAST(strftime('%m', time, 'unixepoch') AS INTEGER) + 2) / 3)",
+    "year": "strftime('%Y', time, 'unixepoch')",
+}
+
+
+@dataclass
+class Assignment:
+    time: float
+    option: str
+    underlying: str
+    shares: float  # change in the underlying position, negative when called away
+
+
+class Journal:
+    """Trades, position snapshots and portfolio values in an indexed SQLite database.
+    Writes are queued and committed in batches by a background thread (in WAL mode, so
+    queries never wait on them); `flush` blocks until everything queued is committed."""
+
+    def __init__(
+        self,
+        path: str = JOURNAL_PATH,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._read = self._connect()
+        self._read.executescript(SCHEMA)
+        self._read_lock = threading.Lock()
+        self._queue: queue.Queue[tuple[str, tuple[Any, ...]] | None] = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="journal", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record_trade(self, trade: dict[str, Any], at: float | None = None) -> None:
+        symbol = trade["symbol"]
+        self._queue.put(
+            (
+                "trades",
+                (
+                    _whole_second(at),
+                    symbol,
+                    occ_underlying(symbol) or symbol,
+                    trade.get("type"),
+                    trade["side"],
+                    float(trade["qty"]),
+                    float(trade["filled_avg_price"]),
+                    trade.get("status"),
+                ),
+            )
+        )
+
+    def record_positions(
+        self, positions: dict[str, dict[str, str | None]], at: float | None = None
+    ) -> None:
+        at = _whole_second(at)
+        for symbol, data in positions.items():
+            price = data.get("price")
+            row = (at, symbol, float(data.get("qty") or 0), float(price) if price else None)
+            self._queue.put(("positions", row))
+
+    def record_value(self, value: float, at: float | None = None) -> None:
+        self._queue.put(("portfolio_values", (_whole_second(at), value)))
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._read.close()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                rows = [item for item in batch if item is not None]
+                try:
+                    self._write(conn, rows)
+                except sqlite3.Error as e:
+                    logger.error(f"Journal write of {len(rows)} records failed: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if batch[-1] is None:
+                    return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows: list[tuple[str, tuple[Any, ...]]]) -> None:
+        by_table: dict[str, list[tuple[Any, ...]]] = {}
+        for table, row in rows:
+            by_table.setdefault(table, []).append(row)
+        with conn:
+            conn.execute("BEGIN")
+            for table, table_rows in by_table.items():
+                conn.executemany(INSERTS[table], table_rows)
+
+    def _query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        with self._read_lock:
+            return self._read.execute(sql, params).fetchall()
+
+    def premium(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        by: Period | Literal["symbol", "underlying"] | None = None,
+    ) -> list[tuple[str, float]]:
+        """Net premium collected (sells minus buys, per contract of 100) between `since`
+        and `until`, in total or grouped `by` a period or symbol."""
+        if by is None:
+            group = "'total'"
+        elif by in ("symbol", "underlying"):
+            group = by
+        else:
+            group = PERIOD_FORMATS[by]
+        return self._query(
+            f"SELECT {group} AS k, SUM(CASE WHEN side = 'sell' THEN 1 ELSE -1 END * qty * price)"
+            f" * {CONTRACT_SIZE} FROM trades WHERE time >= ? AND time < ? GROUP BY k ORDER BY k",
+            _range(since, until),
+        )
+
+    def value_history(
+        self, since: float | None = None, until: float | None = None, every: Period = "day"
+    ) -> list[tuple[str, float]]:
+        """Last recorded portfolio value of every period."""
+        # SQLite takes the bare `value` column from the row that has MAX(time)
+        rows = self._query(
+            f"SELECT {PERIOD_FORMATS[every]} AS k, value, MAX(time) FROM portfolio_values"
+            " WHERE time >= ? AND time < ? GROUP BY k ORDER BY k",
+            _range(since, until),
+        )
+        return [(period, value) for period, value, _ in rows]
+
+    def assignments(
+        self, since: float | None = None, until: float | None = None
+    ) -> list[Assignment]:
+        """Option positions that disappeared between two consecutive position snapshots
+        while the position in their underlying changed, i.e. were exercised."""
+        rows = self._query(
+            "SELECT time, symbol, qty FROM positions WHERE time >= ? AND time < ?"
+            " ORDER BY time",
+            _range(since, until),
+        )
+        assignments = []
+        previous: dict[str, float] | None = None
+        for at, snapshot in _group_by_time(rows):
+            if previous is not None:
+                for symbol in previous.keys() - snapshot.keys():
+                    underlying = occ_underlying(symbol)
+                    if underlying is None:
+                        continue
+                    shares = snapshot.get(underlying, 0.0) - previous.get(underlying, 0.0)
+                    if shares:
+                        assignments.append(Assignment(at, symbol, underlying, shares))
+            previous = snapshot
+        return assignments
+
+    def import_logs(self, log_dir: str = "logs") -> dict[str, int]:
+        """Backfill from the monthly `YYYY-MM.log` files, in text or JSON format. Lines
+        already in the journal are skipped, so importing twice is harmless."""
+        counts = {"trade": 0, "positions": 0, "portfolio_value": 0}
+        pattern = os.path.join(log_dir, "[0-9][0-9][0-9][0-9]-[0-9][0-9].log")
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8") as f:
+                for at, event in parse_log_lines(f):
+                    if "trade" in event:
+                        self.record_trade(event["trade"], at)
+                    elif "positions" in event:
+                        self.record_positions(event["positions"], at)
+                    elif "portfolio_value" in event:
+                        self.record_value(float(event["portfolio_value"]), at)
+                    else:
+                        continue
+                    counts[next(iter(event))] += 1
+        self.flush()
+        return counts
+
+
+def _whole_second(at: float | None) -> float:
+    """`at` (or now) truncated to the second, like the text log's timestamps, so that rows
+    imported from the log are the rows the bot already journaled live."""
+    return float(int(time.time() if at is None else at))
+
+
+def _range(since: float | None, until: float | None) -> tuple[float, float]:
+    return (float("-inf") if since is None else since, float("inf") if until is None else until)
+
+
+def _group_by_time(
+    rows: list[tuple[float, str, float]],
+) -> Iterator[tuple[float, dict[str, float]]]:
+    current: float | None = None
+    snapshot: dict[str, float] = {}
+    for at, symbol, qty in rows:
+        if at != current:
+            if current is not None:
+                yield current, snapshot
+            current, snapshot = at, {}
+        snapshot[symbol] = qty
+    if current is not None:
+        yield current, snapshot
+
+
+def parse_log_lines(lines: Iterable[str]) -> Iterator[tuple[float, dict[str, Any]]]:
+    """(timestamp, payload) of every JSON report in log lines written by `setup_logger`:
+    `2025-09-26 13:59:01Z | INFO | {...}` or `{"time": ..., "data": {...}}`."""
+    for line in lines:
+        line = line.strip()
+        try:
+            if line.startswith("{"):
+                entry = json.loads(line)
+                if not isinstance(entry.get("data"), dict):
+                    continue
+                at = datetime.strptime(entry["time"], "%Y-%m-%dT%H:%M:%S.%fZ")
+                payload = entry["data"]
+            else:
+                stamp, _, message = line.split(" | ", 2)
+                if not message.startswith("{"):
+                    continue
+                at = datetime.strptime(stamp, "%Y-%m-%d %H:%M:%SZ")
+                payload = json.loads(message)
+        except (ValueError, KeyError):
+            continue
+        if isinstance(payload, dict):
+            yield at.replace(tzinfo=timezone.utc).timestamp(), payload
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import TYPE_CHECKING, Any
+
+import pytz  # type: ignore
+
+if TYPE_CHECKING:  # the SDK is imported on first fetch, settings only parse schedules
+    from src.async_client import BlockingAlpacaClient
+
+logger = logging.getLogger()
+
+MARKET_TZ = pytz.timezone("America/New_York")
+REGULAR_OPEN = dtime(9, 30)
+REGULAR_CLOSE = dtime(16, 0)
+CALENDAR_TTL = 30 * 24 * 3600  # a fetched month is refetched after this long
+FALLBACK_TTL = 3600  # a month of assumed regular sessions is retried after this long
+MONTHS_AHEAD = 3  # searched for the next session before giving up
+
+_SESSION_TIME = re.compile(r"(open|close)(?:([+-])(\d+)([mh]))?")
+_DURATION = re.compile(r"(\d+)([mh])")
+_UNIT_SECONDS = {"m": 60, "h": 3600}
+
+
+@dataclass
+class SessionMonth:
+    """Sessions of one month as sorted epoch seconds, so lookups are a bisect."""
+
+    fetched_at: float
+    opens: array
+    closes: array
+    regular: bool = False  # assumed after a failed fetch, not from Alpaca
+
+    @property
+    def expires_at(self) -> float:
+        return self.fetched_at + (FALLBACK_TTL if self.regular else CALENDAR_TTL)
+
+
+class TradingCalendar:
+    """Alpaca's trading calendar, fetched a month at a time (about once a month) and kept
+    in memory and optionally on disk, so checking whether and when the market is open
+    doesn't take an API call. Holidays have no session and early closes close early."""
+
+    def __init__(self, client: BlockingAlpacaClient, cache_dir: str | None = None) -> None:
+        self.client = client
+        self.path = os.path.join(cache_dir, "calendar.json") if cache_dir else None
+        self._months: dict[str, SessionMonth] = self._load()
+        self._lock = threading.Lock()
+
+    def next_session(self, ts: float) -> tuple[float, float] | None:
+        """Open and close (epoch seconds) of the session under way at `ts`, or else of the
+        next one; None if there is none within `MONTHS_AHEAD` months."""
+        day = datetime.fromtimestamp(ts, MARKET_TZ).date()
+        month = day.replace(day=1)
+        for _ in range(MONTHS_AHEAD):
+            sessions = self.month(month)
+            i = bisect_left(sessions.closes, ts)
+            if i < len(sessions.closes):
+                return sessions.opens[i], sessions.closes[i]
+            month = _next_month(month)
+        return None
+
+    def month(self, month: date) -> SessionMonth:
+        key = f"{month:%Y-%m}"
+        cached = self._months.get(key)
+        if cached is not None and cached.expires_at > time.time():
+            return cached
+        with self._lock:
+            cached = self._months.get(key)
+            if cached is None or cached.expires_at <= time.time():
+                cached = self._months[key] = self._fetch(month)
+                if not cached.regular:
+                    self._save()
+        return cached
+
+    def _fetch(self, month: date) -> SessionMonth:
+        from alpaca.trading.requests import GetCalendarRequest
+
+        end = _next_month(month) - timedelta(days=1)
+        try:
+            calendar = self.client.get_calendar(GetCalendarRequest(start=month, end=end))
+            sessions = [(day.open, day.close) for day in calendar]
+            regular = False
+            logger.debug(f"Fetched {len(sessions)} trading sessions for {month:%Y-%m}")
+        except Exception as e:
+            logger.warning(
+                f"Failed to fetch the trading calendar for {month:%Y-%m}, "
+                f"assuming regular weekday sessions: {e}"
+            )
+            sessions = [
+                (datetime.combine(day, REGULAR_OPEN), datetime.combine(day, REGULAR_CLOSE))
+                for day in (month + timedelta(days=i) for i in range((end - month).days + 1))
+                if day.weekday() < 5
+            ]
+            regular = True
+        return SessionMonth(
+            time.time(),
+            array("d", (MARKET_TZ.localize(open_).timestamp() for open_, _ in sessions)),
+            array("d", (MARKET_TZ.localize(close).timestamp() for _, close in sessions)),
+            regular,
+        )
+
+    def _load(self) -> dict[str, SessionMonth]:
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                raw: dict[str, Any] = json.load(f)
+            return {
+                key: SessionMonth(
+                    float(entry["fetched"]),
+                    array("d", (s[0] for s in entry["sessions"])),
+                    array("d", (s[1] for s in entry["sessions"])),
+                )
+                for key, entry in raw.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            logger.warning(f"Ignoring unreadable trading calendar cache {self.path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        current = f"{datetime.now(MARKET_TZ):%Y-%m}"
+        raw = {
+            key: {"fetched": month.fetched_at, "sessions": list(zip(month.opens, month.closes))}
+            for key, month in self._months.items()
+            if key >= current and not month.regular
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(raw, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write trading calendar cache {self.path}: {e}")
+
+
+@dataclass(frozen=True)
+class SessionTime:
+    anchor: str  # "open" or "close"
+    offset: float = 0.0  # seconds
+
+    def resolve(self, open_: float, close: float) -> float:
+        return (open_ if self.anchor == "open" else close) + self.offset
+
+
+@dataclass(frozen=True)
+class SessionSchedule:
+    """Run times relative to each trading session: once at `start`, or `every` so many
+    seconds from `start` until `until`. Times outside the session are dropped, so a run
+    past an early close is skipped rather than run after hours."""
+
+    start: SessionTime
+    every: float | None = None
+    until: SessionTime = SessionTime("close")
+
+    def fire_times(self, open_: float, close: float) -> list[float]:
+        start = self.start.resolve(open_, close)
+        end = min(self.until.resolve(open_, close), close)
+        if self.every is None:
+            times = [start]
+        else:
+            times = [start + i * self.every for i in range(int((end - start) // self.every) + 1)]
+        return [t for t in times if open_ <= t <= end]
+
+
+def parse_session_schedule(spec: str) -> SessionSchedule | None:
+    """Parse a schedule like `open+29m`, `close-10m`, `every 1h` or
+    `every 30m from open+15m until close-15m`; None if `spec` isn't one (it may be a cron
+    pattern instead). Raises `ValueError` if it is one but malformed."""
+    words = re.sub(r"\s*([+-])\s*", r"\1", spec.strip().lower()).split()
+    if not words or not re.match(r"(open|close|every)\b", words[0]):
+        return None
+    if words[0] != "every":
+        if len(words) != 1:
+            raise ValueError(f"unexpected '{' '.join(words[1:])}'")
+        return SessionSchedule(_session_time(words[0]))
+    if len(words) % 2 != 0:
+        raise ValueError("expected `every <duration> [from <time>] [until <time>]`")
+    options = dict(zip(words[2::2], words[3::2]))
+    if unknown := set(options) - {"from", "until"}:
+        raise ValueError(f"unexpected '{', '.join(sorted(unknown))}'")
+    every = _duration(words[1])
+    if every <= 0:
+        raise ValueError("`every` must be positive")
+    return SessionSchedule(
+        _session_time(options.get("from", "open")),
+        every,
+        _session_time(options.get("until", "close")),
+    )
+
+
+def _session_time(word: str) -> SessionTime:
+    match = _SESSION_TIME.fullmatch(word)
+    if match is None:
+        raise ValueError(f"expected `open` or `close` with an optional offset, got '{word}'")
+    anchor, sign, amount, unit = match.groups()
+    offset = int(amount) * _UNIT_SECONDS[unit] if amount else 0
+    if offset and (anchor, sign) in (("open", "-"), ("close", "+")):
+        raise ValueError(f"'{word}' is never while the market is open")
+    return SessionTime(anchor, -offset if sign == "-" else offset)
+
+
+def _duration(word: str) -> float:
+    match = _DURATION.fullmatch(word)
+    if match is None:
+        raise ValueError(f"expected a duration like `30m` or `1h`, got '{word}'")
+    return int(match[1]) * _UNIT_SECONDS[match[2]]
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, TypeVar
+
+logger = logging.getLogger()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PREFIX = "options_bot"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass
+class CallStats:
+    """Counts and latency histogram of one kind of call. `buckets[i]` counts the calls
+    that took at most `BUCKETS[i]` seconds (and longer than `BUCKETS[i - 1]`)."""
+
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+
+    def observe(self, seconds: float, error: bool) -> None:
+        self.calls += 1
+        self.errors += error
+        self.seconds += seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+
+class MetricsRegistry:
+    """Call counts, error counts and latencies keyed by (kind, name), e.g. ("alpaca",
+    "get_account"), plus the stats of `cached_property_ttl` caches, rendered in the
+    Prometheus text format. Recording a call costs a clock read and a locked update."""
+
+    def __init__(self) -> None:
+        self._calls: dict[tuple[str, str], CallStats] = {}
+        self._caches: dict[str, Callable[[], dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            stats = self._calls.get((kind, name))
+            if stats is None:
+                stats = self._calls[(kind, name)] = CallStats()
+            stats.observe(seconds, error)
+
+    @contextmanager
+    def timer(self, kind: str, name: str) -> Iterator[None]:
+        """Record the enclosed block as one call, an error if it raises."""
+        start = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, error)
+
+    def watch_cache(self, name: str, stats: Callable[[], dict[str, int]]) -> None:
+        """Export the hit/miss counts returned by `stats`, e.g. `Owner.prop.stats(obj)`."""
+        with self._lock:
+            self._caches[name] = stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._caches.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            calls = {
+                key: CallStats(s.calls, s.errors, s.seconds, list(s.buckets))
+                for key, s in self._calls.items()
+            }
+            caches = dict(self._caches)
+        cache_stats = {name: stats() for name, stats in caches.items()}
+        return {
+            "calls": {
+                f"{kind}.{name}": {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "mean_seconds": s.seconds / s.calls,
+                    "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], s.buckets)),
+                }
+                for (kind, name), s in sorted(calls.items(), key=lambda item: item[0])
+            },
+            "caches": {
+                name: {**stats, "hit_rate": _hit_rate(stats)}
+                for name, stats in sorted(cache_stats.items())
+            },
+        }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            calls = [
+                (key, CallStats(s.calls, s.errors, s.seconds, list(s.buckets)))
+                for key, s in sorted(self._calls.items(), key=lambda item: item[0])
+            ]
+            caches = sorted(self._caches.items())
+        lines = [
+            f"# HELP {PREFIX}_calls_total Outbound API calls and scheduled job runs.",
+            f"# TYPE {PREFIX}_calls_total counter",
+            *(f"{PREFIX}_calls_total{_labels(k, n)} {s.calls}" for (k, n), s in calls),
+            f"# HELP {PREFIX}_errors_total Calls and job runs that raised.",
+            f"# TYPE {PREFIX}_errors_total counter",
+            *(f"{PREFIX}_errors_total{_labels(k, n)} {s.errors}" for (k, n), s in calls),
+            f"# HELP {PREFIX}_call_duration_seconds Latency of calls and job runs.",
+            f"# TYPE {PREFIX}_call_duration_seconds histogram",
+        ]
+        for (kind, name), s in calls:
+            cumulative = 0
+            for le, count in zip([*map(str, BUCKETS), "+Inf"], s.buckets):
+                cumulative += count
+                labels = _labels(kind, name, le=le)
+                lines.append(f"{PREFIX}_call_duration_seconds_bucket{labels} {cumulative}")
+            lines.append(f"{PREFIX}_call_duration_seconds_sum{_labels(kind, name)} {s.seconds}")
+            lines.append(f"{PREFIX}_call_duration_seconds_count{_labels(kind, name)} {s.calls}")
+        lines += [
+            f"# HELP {PREFIX}_cache_events_total Lookups of TTL-cached properties by outcome.",
+            f"# TYPE {PREFIX}_cache_events_total counter",
+        ]
+        for cache, stats in caches:
+            for event, count in stats().items():
+                labels = f'{{cache="{cache}",event="{event}"}}'
+                lines.append(f"{PREFIX}_cache_events_total{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path: str) -> None:
+        """Append a timestamped snapshot to the newline-delimited JSON file at `path`."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), **self.snapshot()}) + "\n")
+
+
+def _labels(kind: str, name: str, **extra: str) -> str:
+    pairs = {"kind": kind, "name": name, **extra}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+
+def _hit_rate(stats: dict[str, int]) -> float | None:
+    hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+    total = hits + stats.get("misses", 0)
+    return hits / total if total else None
+
+
+METRICS = MetricsRegistry()
+
+
+def instrumented(kind: str, name: str | None = None) -> Callable[[F], F]:
+    """Record every call of the decorated function or coroutine function in `METRICS`."""
+
+    def decorator(func: F) -> F:
+        label = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with METRICS.timer(kind, label):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with METRICS.timer(kind, label):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class MetricsServer:
+    """Serves `GET /metrics` on a daemon thread."""
+
+    def __init__(
+        self, registry: MetricsRegistry = METRICS, host: str = "127.0.0.1", port: int = 9464
+    ) -> None:
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        logger.info(f"Serving metrics on http://{self._server.server_address[0]}:{self.port}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
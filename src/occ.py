@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+ROOT_WIDTH = 6  # at most, Alpaca doesn't pad the root like the OCC does
+SUFFIX_WIDTH = 15  # YYMMDD, C or P, and the strike in thousandths as eight digits
+PARSE_CACHE_SIZE = 4096  # symbols; positions and a few chains, reparsed every cycle
+
+_OCC_SYMBOL = re.compile(r"([A-Z0-9]{1,6})([0-9]{2})([0-9]{2})([0-9]{2})([CP])([0-9]{8})")
+_ZERO, _NINE = ord("0"), ord("9")
+_STRIKE_PLACES = 10 ** np.arange(7, -1, -1, dtype=np.int64)
+
+
+class OccSymbol(NamedTuple):
+    underlying: str
+    expiration: date
+    is_call: bool
+    strike: float
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_occ(symbol: str) -> OccSymbol | None:
+    """Parse an OCC option symbol, e.g. AAPL250926C00210000 is the AAPL 210 call
+    expiring 2025-09-26; None if `symbol` isn't one (a stock or currency)."""
+    match = _OCC_SYMBOL.fullmatch(symbol)
+    if match is None:
+        return None
+    root, yy, mm, dd, kind, strike = match.groups()
+    try:
+        expiration = date(2000 + int(yy), int(mm), int(dd))
+    except ValueError:
+        return None
+    return OccSymbol(root, expiration, kind == "C", int(strike) / 1000)
+
+
+def occ_underlying(symbol: str) -> str | None:
+    """Underlying of an OCC option symbol (AAPL250926C00210000 -> AAPL), None if it isn't
+    one. Compare it for equality: `A` options are not `AAPL` options."""
+    parsed = parse_occ(symbol)
+    return None if parsed is None else parsed.underlying
+
+
+@dataclass
+class OccArrays:
+    """Fields of many OCC symbols as parallel arrays. Where `valid` is False the symbol
+    isn't one and the other fields are blank: "", NaT, False and NaN."""
+
+    underlying: np.ndarray  # str
+    expiration: np.ndarray  # datetime64[D]
+    is_call: np.ndarray  # bool
+    strike: np.ndarray  # float64
+    valid: np.ndarray  # bool
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def of(self, underlying: str) -> np.ndarray:
+        """Mask of the options on exactly `underlying`."""
+        return self.valid & (self.underlying == underlying)
+
+
+def parse_occ_many(symbols: Sequence[str]) -> OccArrays:
+    """`parse_occ` of a whole position list or chain at once: the symbols are right-aligned
+    into a matrix of code points so every field is a fixed column range, parsed for all
+    rows together."""
+    n, width = len(symbols), ROOT_WIDTH + SUFFIX_WIDTH
+    raw = np.asarray(symbols, dtype=str).reshape(n)
+    lengths = np.char.str_len(raw)
+    columns = max(width, raw.dtype.itemsize // 4)
+    padded = np.char.rjust(raw, columns) if n else raw.astype(f"U{columns}")
+    codes = padded.view(np.uint32).reshape(n, columns)[:, -width:].astype(np.int64)
+    root, digits = codes[:, :ROOT_WIDTH], codes[:, ROOT_WIDTH:] - _ZERO
+    kind = digits[:, 6] + _ZERO
+    digits = np.delete(digits, 6, axis=1)
+
+    root_len = lengths - SUFFIX_WIDTH
+    in_root = np.arange(ROOT_WIDTH) >= (ROOT_WIDTH - root_len)[:, None]
+    alnum = ((root >= _ZERO) & (root <= _NINE)) | ((root >= ord("A")) & (root <= ord("Z")))
+    valid = (
+        (root_len >= 1)
+        & (root_len <= ROOT_WIDTH)
+        & np.where(in_root, alnum, True).all(axis=1)
+        & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        & ((kind == ord("C")) | (kind == ord("P")))
+    )
+
+    yy, mm, dd = (digits[:, i] * 10 + digits[:, i + 1] for i in (0, 2, 4))
+    valid &= (mm >= 1) & (mm <= 12) & (dd >= 1) & (dd <= 31)
+    months = np.where(valid, (yy + 30) * 12 + mm - 1, 0).astype("datetime64[M]")
+    expiration = months.astype("datetime64[D]") + np.where(valid, dd - 1, 0)
+    valid &= expiration.astype("datetime64[M]") == months  # e.g. no February 30
+
+    underlying = np.char.lstrip(root.astype(np.uint32).copy().view(f"U{ROOT_WIDTH}").ravel())
+    return OccArrays(
+        underlying=np.where(valid, underlying, ""),
+        expiration=np.where(valid, expiration, np.datetime64("NaT")),
+        is_call=valid & (kind == ord("C")),
+        strike=np.where(valid, digits[:, 6:] @ _STRIKE_PLACES / 1000, np.nan),
+        valid=valid,
+    )
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from typing import TYPE_CHECKING, Any, Iterator, Literal, Sequence
+
+import numpy as np
+
+from src.occ import parse_occ_many
+
+if TYPE_CHECKING:  # the SDK is imported on first use, backtests never need it
+    from alpaca.trading.enums import ContractType
+    from alpaca.trading.models import OptionContract
+
+    from src.async_client import BlockingAlpacaClient
+
+logger = logging.getLogger()
+
+PAGE_LIMIT = 10000
+
+StrikeSelection = Literal["above", "below", "nearest"]
+
+
+class ContractRecord:
+    """The fields of an `OptionContract` the bot reads, parsed straight from the JSON of a
+    `raw_data` client rather than validated into the full model."""
+
+    __slots__ = ("symbol", "strike_price", "expiration_date", "open_interest")
+
+    def __init__(
+        self,
+        symbol: str,
+        strike_price: float,
+        expiration_date: date,
+        open_interest: str | None = None,
+    ) -> None:
+        self.symbol = symbol
+        self.strike_price = strike_price
+        self.expiration_date = expiration_date
+        self.open_interest = open_interest
+
+    @classmethod
+    def from_raw(cls, raw: dict[str, Any]) -> ContractRecord:
+        return cls(
+            raw["symbol"],
+            float(raw["strike_price"]),
+            date.fromisoformat(raw["expiration_date"]),
+            raw.get("open_interest"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "strike_price": self.strike_price,
+            "expiration_date": self.expiration_date.isoformat(),
+            "open_interest": self.open_interest,
+        }
+
+    def __repr__(self) -> str:
+        return f"ContractRecord({self.symbol!r}, {self.strike_price}, {self.expiration_date})"
+
+
+def iter_option_contracts(
+    client: BlockingAlpacaClient, **params: Any
+) -> Iterator[OptionContract | ContractRecord]:
+    """Yield every contract matching `params`, following `next_page_token`; as
+    `ContractRecord`s if `client` returns raw data."""
+    from alpaca.trading.requests import GetOptionContractsRequest
+
+    page_token = None
+    while True:
+        response = client.get_option_contracts(
+            GetOptionContractsRequest(**params, limit=PAGE_LIMIT, page_token=page_token)
+        )
+        if isinstance(response, dict):
+            yield from map(ContractRecord.from_raw, response.get("option_contracts") or [])
+            page_token = response.get("next_page_token")
+        else:
+            yield from getattr(response, "option_contracts", None) or []
+            page_token = getattr(response, "next_page_token", None)
+        if not page_token:
+            return
+
+
+@dataclass
+class OptionChain:
+    """Contracts of one (underlying, expiration, type), sorted by strike."""
+
+    strikes: array = field(default_factory=lambda: array("d"))
+    symbols: list[str] = field(default_factory=list)
+    contracts: list[OptionContract | ContractRecord] = field(default_factory=list)
+
+    @classmethod
+    def from_contracts(
+        cls, contracts: list[OptionContract | ContractRecord], underlying: str | None = None
+    ) -> OptionChain:
+        """Chain of `contracts` sorted by the strikes in their symbols, keeping only those on
+        exactly `underlying` if given."""
+        parsed = parse_occ_many([c.symbol for c in contracts])
+        keep = parsed.valid if underlying is None else parsed.of(underlying)
+        order = np.flatnonzero(keep)[np.argsort(parsed.strike[keep], kind="stable")]
+        return cls(
+            strikes=array("d", parsed.strike[order].tolist()),
+            symbols=[contracts[i].symbol for i in order],
+            contracts=[contracts[i] for i in order],
+        )
+
+    def index(
+        self,
+        price: float,
+        selection: StrikeSelection = "above",
+        eligible: Sequence[bool] | None = None,
+    ) -> int | None:
+        """Position of the nearest strike at-or-above, at-or-below or closest to `price`,
+        among the `eligible` ones if given."""
+        if eligible is not None:
+            positions = [i for i, ok in enumerate(eligible) if ok]
+            subset = OptionChain(strikes=array("d", (self.strikes[i] for i in positions)))
+            j = subset.index(price, selection)
+            return positions[j] if j is not None else None
+        if selection == "above":
+            i = bisect_left(self.strikes, price)
+            return i if i < len(self.strikes) else None
+        if selection == "below":
+            i = bisect_right(self.strikes, price)
+            return i - 1 if i > 0 else None
+        i = bisect_left(self.strikes, price)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.strikes)]
+        return min(candidates, key=lambda j: abs(self.strikes[j] - price), default=None)
+
+
+class OptionChainIndex:
+    """Option chains keyed by (underlying, expiration, type), fetched in full once and
+    then served from memory. Chains of an underlying are dropped once it rolls over to a
+    new expiration."""
+
+    def __init__(self, client: BlockingAlpacaClient) -> None:
+        self.client = client
+        self._chains: dict[tuple[str, date, ContractType], OptionChain] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple[str, date, ContractType], threading.Lock] = {}
+
+    def chain(self, ticker: str, expiration_date: date, option_type: ContractType) -> OptionChain:
+        key = (ticker, expiration_date, option_type)
+        if (chain := self._chains.get(key)) is not None:
+            return chain
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if (chain := self._chains.get(key)) is None:
+                chain = OptionChain.from_contracts(
+                    list(
+                        iter_option_contracts(
+                            self.client,
+                            underlying_symbols=[ticker],
+                            expiration_date=expiration_date,
+                            type=option_type,
+                        )
+                    ),
+                    underlying=ticker,
+                )
+                logger.debug(
+                    f"Fetched {len(chain.symbols)} {option_type.value} contracts "
+                    f"for `{ticker}` expiring {expiration_date}"
+                )
+                with self._lock:
+                    self._roll(ticker, expiration_date)
+                    self._chains[key] = chain
+        return chain
+
+    def select(
+        self,
+        ticker: str,
+        expiration_date: date,
+        option_type: ContractType,
+        price: float,
+        selection: StrikeSelection = "above",
+        eligible: Sequence[bool] | None = None,
+    ) -> OptionContract | ContractRecord | None:
+        chain = self.chain(ticker, expiration_date, option_type)
+        i = chain.index(price, selection, eligible)
+        return chain.contracts[i] if i is not None else None
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        with self._lock:
+            for key in [k for k in self._chains if ticker is None or k[0] == ticker]:
+                del self._chains[key]
+
+    def to_list(self) -> list[dict[str, Any]]:
+        with self._lock:
+            chains = list(self._chains.items())
+        return [
+            {
+                "ticker": ticker,
+                "expiration_date": expiration_date.isoformat(),
+                "type": option_type.value,
+                "contracts": [
+                    c.to_dict() if isinstance(c, ContractRecord) else c.model_dump(mode="json")
+                    for c in chain.contracts
+                ],
+            }
+            for (ticker, expiration_date, option_type), chain in chains
+        ]
+
+    def restore(self, raw: list[dict[str, Any]], today: date) -> int:
+        """Add the chains saved by `to_list` that haven't expired and aren't loaded yet, as
+        `ContractRecord`s; returns how many were added."""
+        from alpaca.trading.enums import ContractType
+
+        restored = 0
+        for entry in raw:
+            expiration_date = date.fromisoformat(entry["expiration_date"])
+            if expiration_date < today:
+                continue
+            key = (entry["ticker"], expiration_date, ContractType(entry["type"]))
+            chain = OptionChain.from_contracts(
+                [ContractRecord.from_raw(c) for c in entry["contracts"]], entry["ticker"]
+            )
+            with self._lock:
+                if key not in self._chains:
+                    self._chains[key] = chain
+                    restored += 1
+        return restored
+
+    def _roll(self, ticker: str, expiration_date: date) -> None:
+        for key in [k for k in self._chains if k[0] == ticker and k[1] != expiration_date]:
+            logger.debug(f"Dropping `{ticker}` chain for {key[1]}, rolled to {expiration_date}")
+            del self._chains[key]
+            self._key_locks.pop(key, None)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from src.occ import occ_underlying
+
+if TYPE_CHECKING:  # the SDK is imported on first use
+    from alpaca.data.models import Trade
+    from alpaca.trading.models import Position, TradeAccount
+
+    from src.async_client import AsyncAlpacaClient
+
+logger = logging.getLogger()
+
+SNAPSHOT_REST_CALLS = 3  # account, positions, batched latest trades
+
+
+class PositionRecord:
+    """A holding with its numbers parsed once: signed quantity (negative when short) and
+    price as floats. Built from a `Position` model or straight from its JSON (of a
+    `raw_data` client or the snapshot cache); option positions know their underlying."""
+
+    __slots__ = ("symbol", "qty", "price", "asset_class", "underlying")
+
+    def __init__(
+        self,
+        symbol: str,
+        qty: float | str,
+        price: float | str | None = None,
+        asset_class: str = "us_equity",
+    ) -> None:
+        self.symbol = symbol
+        self.qty = float(qty)
+        self.price = None if price is None else float(price)
+        self.asset_class = asset_class
+        self.underlying = occ_underlying(symbol) if asset_class == "us_option" else None
+
+    @classmethod
+    def from_raw(cls, raw: dict[str, Any]) -> PositionRecord:
+        qty = abs(float(raw["qty"]))
+        return cls(
+            raw["symbol"],
+            -qty if raw["side"] == "short" else qty,
+            raw.get("current_price"),
+            raw["asset_class"],
+        )
+
+    @classmethod
+    def from_model(cls, p: Position) -> PositionRecord:
+        qty = abs(float(p.qty))
+        return cls(
+            str(p.symbol),
+            -qty if p.side.value == "short" else qty,
+            p.current_price,
+            p.asset_class.value,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """The `Position` JSON fields `from_raw` reads."""
+        return {
+            "symbol": self.symbol,
+            "qty": format_number(abs(self.qty)),
+            "side": "short" if self.qty < 0 else "long",
+            "current_price": None if self.price is None else format_number(self.price),
+            "asset_class": self.asset_class,
+        }
+
+    def __repr__(self) -> str:
+        return f"PositionRecord({self.symbol!r}, {format_number(self.qty)} @ {self.price})"
+
+
+class Positions:
+    """Holdings by symbol, with option positions also indexed by their underlying."""
+
+    __slots__ = ("_by_symbol", "_by_underlying")
+
+    def __init__(self, records: Iterable[PositionRecord] = ()) -> None:
+        self._by_symbol: dict[str, PositionRecord] = {}
+        for record in records:
+            self._by_symbol[record.symbol] = record
+        self._by_underlying: dict[str, list[PositionRecord]] = {}
+        for record in self._by_symbol.values():
+            if record.underlying is not None:
+                self._by_underlying.setdefault(record.underlying, []).append(record)
+
+    def __iter__(self) -> Iterator[PositionRecord]:
+        return iter(self._by_symbol.values())
+
+    def __len__(self) -> int:
+        return len(self._by_symbol)
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._by_symbol
+
+    def __getitem__(self, symbol: str) -> PositionRecord:
+        return self._by_symbol[symbol]
+
+    def get(self, symbol: str) -> PositionRecord | None:
+        return self._by_symbol.get(symbol)
+
+    def qty(self, symbol: str) -> float:
+        record = self._by_symbol.get(symbol)
+        return record.qty if record is not None else 0.0
+
+    def options(self, underlying: str) -> list[PositionRecord]:
+        return self._by_underlying.get(underlying, [])
+
+    def to_dict(self) -> dict[str, dict[str, str | None]]:
+        """Quantities and prices by symbol as strings, as logged and journaled."""
+        return {
+            r.symbol: {
+                "qty": format_number(r.qty),
+                "price": None if r.price is None else format_number(r.price),
+            }
+            for r in self._by_symbol.values()
+        }
+
+
+def format_number(x: float) -> str:
+    return str(int(x)) if x.is_integer() else str(x)
+
+
+def ticker_prices(latest_trades: dict[str, Trade], tickers: list[str]) -> dict[str, float]:
+    prices = {}
+    for ticker in tickers:
+        latest_trade = latest_trades.get(ticker)
+        if latest_trade is None or latest_trade.price is None:
+            raise RuntimeError(f"Ticker price is unavailable for `{ticker}`!")
+        prices[ticker] = latest_trade.price
+    logger.debug(f"Ticker prices: {prices}")
+    return prices
+
+
+@dataclass
+class PortfolioSnapshot:
+    """Account, positions and underlying prices fetched together once per cycle, with
+    the resulting holdings indexed by symbol and underlying."""
+
+    account: TradeAccount
+    positions: list[PositionRecord]
+    prices: dict[str, float]
+    fetched_at: float = field(default_factory=time.time)
+
+    @classmethod
+    async def fetch(cls, client: AsyncAlpacaClient, tickers: list[str]) -> PortfolioSnapshot:
+        """Fetch account, positions and the latest trades of all `tickers` concurrently."""
+        from alpaca.data.requests import StockLatestTradeRequest
+
+        account, positions, latest_trades = await asyncio.gather(
+            client.get_account(),
+            client.get_all_positions(),
+            client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=tickers)),
+        )
+        prices = ticker_prices(latest_trades, tickers)
+        records = [
+            PositionRecord.from_raw(p) if isinstance(p, dict) else PositionRecord.from_model(p)
+            for p in positions
+        ]
+        logger.debug(f"Portfolio snapshot: {len(records)} positions")
+        return cls(account=account, positions=records, prices=prices)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "account": self.account.model_dump(mode="json"),
+            "positions": [p.to_dict() for p in self.positions],
+            "prices": self.prices,
+            "fetched_at": self.fetched_at,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> PortfolioSnapshot:
+        from alpaca.trading.models import TradeAccount
+
+        return cls(
+            account=TradeAccount.model_validate(raw["account"]),
+            positions=[PositionRecord.from_raw(p) for p in raw["positions"]],
+            prices={ticker: float(price) for ticker, price in raw["prices"].items()},
+            fetched_at=float(raw["fetched_at"]),
+        )
+
+    @property
+    def currency(self) -> str:
+        return str(self.account.currency)
+
+    @cached_property
+    def holdings(self) -> Positions:
+        """Cash under the account currency, every ticker (at zero shares unless held) and
+        every open position."""
+        return Positions(
+            [
+                PositionRecord(self.currency, self.account.cash or 0, 1.0, "cash"),
+                *(PositionRecord(ticker, 0.0, price) for ticker, price in self.prices.items()),
+                *self.positions,
+            ]
+        )
+
+    def has_options(self, ticker: str) -> bool:
+        return bool(self.holdings.options(ticker))
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+IV_TOLERANCE = 1e-6
+MIN_TIME_VALUE = 0.005  # below half a cent a quote says nothing about volatility
+IV_MAX_ITERATIONS = 50
+DAYS_PER_YEAR = 365
+
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _cdf_pdf(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Abramowitz & Stegun 7.1.26 approximation of erf, accurate to ~1e-7; its exp(-x^2/2)
+    # term is the density up to a constant, so both come out of one pass
+    t = 1 / (1 + 0.3275911 / np.sqrt(2) * np.abs(x))
+    poly = t * (
+        0.254829592
+        + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429)))
+    )
+    gauss = np.exp(-x * x / 2)
+    return 0.5 + np.copysign(0.5 - 0.5 * poly * gauss, x), gauss / SQRT_2PI
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    return _cdf_pdf(x)[0]
+
+
+def _d1_d2(
+    spot: np.ndarray, strike: np.ndarray, years: np.ndarray, volatility: np.ndarray, rate: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    vol_sqrt_t = volatility * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate + volatility**2 / 2) * years) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t, vol_sqrt_t
+
+
+def black_scholes(
+    spot: np.ndarray | float,
+    strike: np.ndarray,
+    years: np.ndarray | float,
+    volatility: np.ndarray | float,
+    rate: float,
+    call: np.ndarray | bool,
+) -> np.ndarray:
+    """Black-Scholes price of European options, broadcasting over all array arguments."""
+    d1, d2, _ = _d1_d2(spot, strike, years, np.asarray(volatility), rate)
+    discount = np.exp(-rate * years)
+    if call is True or call is False:  # skip the other leg when all options are one type
+        sign = 1 if call else -1
+        return sign * (spot * norm_cdf(sign * d1) - strike * discount * norm_cdf(sign * d2))
+    call_price = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    put_price = strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(call, call_price, put_price)
+
+
+def implied_volatility(
+    price: np.ndarray,
+    spot: np.ndarray | float,
+    strike: np.ndarray,
+    years: np.ndarray | float,
+    rate: float,
+    call: np.ndarray | bool,
+) -> np.ndarray:
+    """Implied volatility of every option at once, by Newton's method safeguarded with
+    bisection: each option keeps a bracket on its root, and a Newton step that would leave
+    the bracket (or has no vega to work with) bisects instead. NaN where the price carries
+    no volatility information: outside the no-arbitrage bounds or with less than
+    `MIN_TIME_VALUE` over intrinsic value."""
+    price = np.asarray(price, dtype=float)
+    spot, strike, years, call = (
+        np.broadcast_to(np.asarray(a, dtype=dtype), price.shape).ravel()
+        for a, dtype in ((spot, float), (strike, float), (years, float), (call, bool))
+    )
+    flat_price = price.ravel()
+    discount = np.exp(-rate * years)
+    sign = np.where(call, 1.0, -1.0)
+    intrinsic = np.maximum(sign * (spot - strike * discount), 0)
+    upper = np.where(call, spot, strike * discount)
+    valid = (flat_price - intrinsic >= MIN_TIME_VALUE) & (flat_price < upper) & (years > 0)
+
+    # iterate on the valid subset only, all of it until every option has converged
+    s, k, t, sg, df, target = (
+        a[valid] for a in (spot, strike, years, sign, discount, flat_price)
+    )
+    sqrt_t = np.sqrt(t)
+    log_moneyness = np.log(s / k) + rate * t
+    lo = np.full(target.shape, MIN_VOLATILITY)
+    hi = np.full(target.shape, MAX_VOLATILITY)
+    # start from the Corrado-Miller approximation, on call prices by put-call parity
+    forward_gap = s - k * df
+    half = target + np.where(sg > 0, 0, forward_gap) - forward_gap / 2
+    root = np.sqrt(np.maximum(half**2 - forward_gap**2 / np.pi, 0))
+    vol = np.clip(SQRT_2PI / (s + k * df) * (half + root) / sqrt_t, 0.05, MAX_VOLATILITY / 2)
+    signed_spot, signed_strike = sg * s, sg * k * df
+    for _ in range(IV_MAX_ITERATIONS):
+        vol_sqrt_t = vol * sqrt_t
+        d1 = log_moneyness / vol_sqrt_t + vol_sqrt_t / 2
+        # one pass over both legs: N(sg*d1), N(sg*d2), and the density at d1 for free
+        cdf, pdf = _cdf_pdf(sg * np.stack((d1, d1 - vol_sqrt_t)))
+        diff = signed_spot * cdf[0] - signed_strike * cdf[1] - target
+        vega = s * pdf[0] * sqrt_t
+
+        above = diff > 0  # price increases with volatility, so the root is below
+        np.copyto(hi, vol, where=above)
+        np.copyto(lo, vol, where=~above)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            new = vol - diff / vega
+        bisect = ~np.isfinite(new) | (new < lo) | (new > hi)
+        np.copyto(new, (lo + hi) / 2, where=bisect)
+        done = np.abs(new - vol).max(initial=0) < IV_TOLERANCE
+        vol = new
+        if done:
+            break
+
+    sigma = np.full(flat_price.shape, np.nan)
+    sigma[valid] = vol
+    return sigma.reshape(price.shape)
+
+
+@dataclass
+class Greeks:
+    """Per-strike arrays. Theta is per calendar day, vega per volatility point (0.01)."""
+
+    iv: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    theta: np.ndarray
+    vega: np.ndarray
+
+
+def greeks(
+    price: np.ndarray,
+    spot: float,
+    strike: np.ndarray,
+    years: float,
+    rate: float,
+    call: np.ndarray | bool,
+) -> Greeks:
+    """Implied volatility and Greeks of a whole chain from its option prices (e.g. quote
+    mids), sharing d1/d2 between all Greeks."""
+    iv = implied_volatility(price, spot, strike, years, rate, call)
+    d1, d2, vol_sqrt_t = _d1_d2(np.asarray(spot), strike, np.asarray(years), iv, rate)
+    (n1, n2), (pdf, _) = _cdf_pdf(np.stack((d1, d2)))
+    carry = rate * strike * np.exp(-rate * years)
+    # N(-x) = 1 - N(x) turns the call formulas into the put ones
+    put = ~np.asarray(call)
+    theta = -spot * pdf * iv / (2 * np.sqrt(years)) - carry * (n2 - put)
+    return Greeks(
+        iv=iv,
+        delta=n1 - put,
+        gamma=pdf / (spot * vol_sqrt_t),
+        theta=theta / DAYS_PER_YEAR,
+        vega=spot * pdf * np.sqrt(years) / 100,
+    )
+
+
+def delta_index(delta: np.ndarray, target: float) -> int | None:
+    """Position of the strike whose absolute delta is closest to `target`."""
+    distance = np.abs(np.abs(delta) - target)
+    if np.isnan(distance).all():
+        return None
+    return int(np.nanargmin(distance))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+_buckets: dict[tuple[str, int, int], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `capacity`.
+    Each acquisition reserves its slot under a lock and then sleeps until it comes up
+    outside of it, so one bucket can be shared by clients on any thread or event loop and
+    waiters are served in order."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests: int, burst: int) -> TokenBucket:
+        """A bucket that never lets more than `requests` through in any minute: up to
+        `burst` at once, refilled at `requests - burst` a minute."""
+        return cls((requests - burst) / 60, burst)
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, 0.0)
+
+    async def acquire(self) -> None:
+        if (wait := self.reserve()) > 0:
+            await asyncio.sleep(wait)
+
+
+def shared_bucket(key: str, requests_per_minute: int, burst: int) -> TokenBucket:
+    """The process-wide bucket of `key` (an account's API key, whose quota all its clients
+    share) at this limit, created on first use."""
+    with _buckets_lock:
+        bucket_key = (key, requests_per_minute, burst)
+        if bucket_key not in _buckets:
+            _buckets[bucket_key] = TokenBucket.per_minute(requests_per_minute, burst)
+        return _buckets[bucket_key]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 4
+    backoff: float = 0.5  # seconds, doubled on every retry
+    max_backoff: float = 8.0
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (from 0): uniformly random up to
+        the exponential backoff ("full jitter"), so clients that failed together don't
+        retry together."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+@contextmanager
+def request_deadline(seconds: float | None) -> Iterator[None]:
+    """Stop retrying requests made in this context (including coroutines it submits to
+    another thread's event loop) once `seconds` have passed; None for no deadline."""
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float:
+    """Seconds until the deadline of the current context, infinite if there is none."""
+    deadline = _deadline.get()
+    return float("inf") if deadline is None else deadline - time.monotonic()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, tzinfo
+from typing import Any
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.base import STATE_STOPPED
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+
+from src.market_calendar import TradingCalendar, parse_session_schedule
+from src.schemas import JobSettings, SchedulerSettings
+
+MAX_SCHEDULER_WAIT = 3600
+MAX_SESSIONS_AHEAD = 31  # searched for a run time before the trigger gives up
+SHARED_WORKERS = 10  # APScheduler's own default
+MAINTENANCE_WORKERS = 2  # metrics dumps, state saves
+
+
+class SafeBlockingScheduler(BlockingScheduler):
+    def _main_loop(self) -> None:  # type: ignore[override]
+        wait_seconds: float = MAX_SCHEDULER_WAIT
+        while self.state != STATE_STOPPED:  # type: ignore[attr-defined]
+            self._event.wait(wait_seconds)  # type: ignore[attr-defined]
+            self._event.clear()  # type: ignore[attr-defined]
+            # None means nothing is scheduled; 0 means the next run came due while this round
+            # was being processed, and must not turn into an hour's sleep
+            next_wait = self._process_jobs()
+            wait_seconds = min(
+                MAX_SCHEDULER_WAIT if next_wait is None else next_wait, MAX_SCHEDULER_WAIT
+            )
+
+
+class SessionTrigger(BaseTrigger):
+    """Fires at the times of a session schedule (see `parse_session_schedule`) in each
+    trading session of `calendar`. Closed days have no session and are skipped without an
+    API call once their month is cached."""
+
+    def __init__(self, spec: str, calendar: TradingCalendar, timezone: tzinfo) -> None:
+        schedule = parse_session_schedule(spec)
+        if schedule is None:
+            raise ValueError(f"Not a session schedule: '{spec}'")
+        self.spec = spec
+        self.schedule = schedule
+        self.calendar = calendar
+        self.timezone = timezone
+
+    def get_next_fire_time(
+        self, previous_fire_time: datetime | None, now: datetime
+    ) -> datetime | None:
+        after = (
+            (previous_fire_time + timedelta(microseconds=1)).timestamp()
+            if previous_fire_time is not None
+            else now.timestamp()
+        )
+        for _ in range(MAX_SESSIONS_AHEAD):
+            if (session := self.calendar.next_session(after)) is None:
+                return None
+            for fire_time in self.schedule.fire_times(*session):
+                if fire_time >= after:
+                    return datetime.fromtimestamp(fire_time, self.timezone)
+            after = session[1] + 1
+        return None
+
+    def __str__(self) -> str:
+        return f"session[{self.spec}]"
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({self.spec!r}, timezone='{self.timezone}')>"
+
+
+def job_trigger(spec: str, timezone: tzinfo, calendar: TradingCalendar) -> BaseTrigger:
+    """Trigger of a job schedule: a `SessionTrigger` for session schedules like
+    `open+29m`, else a `CronTrigger` for cron patterns."""
+    if parse_session_schedule(spec) is not None:
+        return SessionTrigger(spec, calendar, timezone)
+    return CronTrigger.from_crontab(spec, timezone=timezone)
+
+
+def job_executors(settings: SchedulerSettings, jobs: list[str]) -> dict[str, ThreadPoolExecutor]:
+    """In `per_job` mode each of `jobs` gets a pool of its own, sized to its
+    `max_instances`, so a trade blocked on a fill can't hold up the value check; anything
+    else runs on a small `default` pool. In `shared` mode everything shares one pool."""
+    if settings.executors == "shared":
+        return {"default": ThreadPoolExecutor(SHARED_WORKERS)}
+    return {
+        "default": ThreadPoolExecutor(MAINTENANCE_WORKERS),
+        **{job: ThreadPoolExecutor(_job_settings(settings, job).max_instances) for job in jobs},
+    }
+
+
+def job_options(settings: SchedulerSettings, job: str) -> dict[str, Any]:
+    """`add_job` keyword arguments of the job named `job`."""
+    job_settings = _job_settings(settings, job)
+    return {
+        "id": job,
+        "name": job,
+        "executor": "default" if settings.executors == "shared" else job,
+        "max_instances": job_settings.max_instances,
+        "coalesce": job_settings.coalesce,
+        "misfire_grace_time": job_settings.misfire_grace_time,
+    }
+
+
+def _job_settings(settings: SchedulerSettings, job: str) -> JobSettings:
+    return getattr(settings, job)
@@ -2,23 +2,126 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
+from typing import Any, Literal
 
 import pytz  # type: ignore
 import yaml
-from apscheduler.triggers.cron import CronTrigger
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
-class Settings(BaseModel):
-    bot_name: str = "options-bot"
-    paper_trading: bool = True
+class TickerSettings(BaseModel):
     ticker: str
     call_option_margin: float = Field(gt=-1, lt=1)
     put_option_margin: float = Field(gt=-1, lt=1)
+    target_dte: int | None = Field(default=None, ge=0)
+    strike_selection: Literal["above", "below", "nearest"] = "above"
+    target_delta: float | None = Field(default=None, gt=0, lt=1)
+    min_bid: float | None = Field(default=None, ge=0)
+    max_spread: float | None = Field(default=None, gt=0)
+    min_open_interest: int | None = Field(default=None, ge=0)
+
+
+class JobSettings(BaseModel):
+    max_instances: int = Field(default=1, ge=1)
+    coalesce: bool = True
+    misfire_grace_time: int | None = Field(default=60, ge=1)  # None runs late jobs regardless
+    latency_budget: float | None = Field(default=None, gt=0)  # seconds, reported when exceeded
+
+
+class SchedulerSettings(BaseModel):
+    executors: Literal["shared", "per_job"] = "per_job"
+    trade_options: JobSettings = JobSettings(misfire_grace_time=300, latency_budget=120)
+    check_value: JobSettings = JobSettings(latency_budget=30)
+
+
+class RateLimitSettings(BaseModel):
+    requests_per_minute: int = Field(default=190, ge=2)  # Alpaca allows 200 per account
+    burst: int = Field(default=20, ge=1)  # of the above, how many may go at once
+    max_retries: int = Field(default=4, ge=0)
+    backoff: float = Field(default=0.5, gt=0)  # seconds before the first retry, then doubled
+    max_backoff: float = Field(default=8.0, gt=0)
+
+    @model_validator(mode="after")
+    def validate_burst(self) -> RateLimitSettings:
+        if self.burst >= self.requests_per_minute:
+            raise ValueError("`burst` must be less than `requests_per_minute`")
+        return self
+
+
+class Settings(BaseModel):
+    bot_name: str = "options-bot"
+    paper_trading: bool = True
+    ticker: str | None = None
+    tickers: list[TickerSettings] = []
+    call_option_margin: float | None = Field(default=None, gt=-1, lt=1)
+    put_option_margin: float | None = Field(default=None, gt=-1, lt=1)
+    target_dte: int | None = Field(default=None, ge=0)
+    strike_selection: Literal["above", "below", "nearest"] = "above"
+    target_delta: float | None = Field(default=None, gt=0, lt=1)
+    min_bid: float | None = Field(default=None, ge=0)
+    max_spread: float | None = Field(default=None, gt=0)
+    min_open_interest: int | None = Field(default=None, ge=0)
+    max_workers: int = Field(default=8, ge=1)
+    cache_dir: str = "cache"
+    stream_fills: bool = True
+    raw_data: bool = True
+    log_format: Literal["text", "json"] = "text"
+    metrics_port: int | None = Field(default=None, ge=0, le=65535)
+    metrics_dump_interval: int | None = Field(default=None, ge=1)
+    journal_path: str | None = "logs/journal.db"
+    state_save_interval: int | None = Field(default=300, ge=1)
+    watch_settings: bool = True
+    scheduler: SchedulerSettings = SchedulerSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
     timezone: str = "America/New_York"
     trade_options_schedule: str
     check_value_schedule: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def inherit_ticker_margins(cls, data: Any) -> Any:
+        """Entries of `tickers` may be bare symbols or omit margins, in which case the
+        top-level values of the same fields are used."""
+        if not isinstance(data, dict) or not data.get("tickers"):
+            return data
+        defaults = {
+            k: data[k]
+            for k in TickerSettings.model_fields
+            if k != "ticker" and data.get(k) is not None
+        }
+        return {
+            **data,
+            "tickers": [
+                {**defaults, "ticker": t} if isinstance(t, str) else {**defaults, **t}
+                for t in data["tickers"]
+            ],
+        }
+
+    @model_validator(mode="after")
+    def resolve_tickers(self) -> Settings:
+        if not self.tickers:
+            if self.ticker is None:
+                raise ValueError("Either `ticker` or `tickers` must be set")
+            if self.call_option_margin is None or self.put_option_margin is None:
+                raise ValueError("`call_option_margin` and `put_option_margin` must be set")
+            self.tickers = [
+                TickerSettings(
+                    ticker=self.ticker,
+                    call_option_margin=self.call_option_margin,
+                    put_option_margin=self.put_option_margin,
+                    target_dte=self.target_dte,
+                    strike_selection=self.strike_selection,
+                    target_delta=self.target_delta,
+                    min_bid=self.min_bid,
+                    max_spread=self.max_spread,
+                    min_open_interest=self.min_open_interest,
+                )
+            ]
+        symbols = self.symbols
+        if len(set(symbols)) != len(symbols):
+            raise ValueError(f"Duplicate tickers in {symbols}")
+        return self
+
     @field_validator("timezone")
     @classmethod
     def validate_timezone(cls, v: str) -> str:
@@ -30,13 +133,26 @@ class Settings(BaseModel):
 
     @field_validator("trade_options_schedule", "check_value_schedule")
     @classmethod
-    def validate_cron(cls, v: str) -> str:
+    def validate_schedule(cls, v: str) -> str:
+        from apscheduler.triggers.cron import CronTrigger
+
+        from src.market_calendar import parse_session_schedule
+
+        try:
+            if parse_session_schedule(v) is not None:
+                return v
+        except ValueError as e:
+            raise ValueError(f"Invalid session schedule '{v}': {e}")
         try:
             CronTrigger.from_crontab(v)
         except ValueError as e:
             raise ValueError(f"Invalid cron pattern '{v}': {e}")
         return v
 
+    @property
+    def symbols(self) -> list[str]:
+        return [t.ticker for t in self.tickers]
+
     @property
     def tz(self) -> pytz.BaseTzInfo:
         return pytz.timezone(self.timezone)
@@ -45,6 +161,9 @@ class Settings(BaseModel):
 class AlpacaEnv(BaseModel):
     api_key: str
     api_secret: str
+    trading_url: str | None = None
+    data_url: str | None = None
+    stream_url: str | None = None
 
 
 class TelegramEnv(BaseModel):
@@ -65,7 +184,13 @@ def load_alpaca_env() -> AlpacaEnv:
     secret = os.getenv("ALPACA_API_SECRET", "")
     if not key or not secret:
         raise SystemExit("ALPACA_API_KEY and ALPACA_API_SECRET must be set")
-    return AlpacaEnv(api_key=key, api_secret=secret)
+    return AlpacaEnv(
+        api_key=key,
+        api_secret=secret,
+        trading_url=os.getenv("ALPACA_TRADING_URL") or None,
+        data_url=os.getenv("ALPACA_DATA_URL") or None,
+        stream_url=os.getenv("ALPACA_STREAM_URL") or None,
+    )
 
 
 def load_telegram_env() -> TelegramEnv:
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable
+
+import yaml
+from pydantic import ValidationError
+
+from src.schemas import Settings, load_settings
+
+logger = logging.getLogger()
+
+POLL_INTERVAL = 0.5  # seconds between mtime checks where inotify isn't available
+DEBOUNCE = 0.1  # seconds without further events before a changed file is read
+STOP_INTERVAL = 0.5  # seconds between checks for `stop` while waiting for events
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+FILE_EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE  # written in place, e.g. a bind mount
+DIR_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE  # replaced, e.g. by an editor
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then `len` bytes of name
+
+
+class _Inotify:
+    """The bits of Linux's inotify the watcher needs, through libc."""
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise _errno_error("inotify_init1")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise _errno_error(f"inotify_add_watch {path}")
+        return wd
+
+    def read(self) -> list[tuple[int, str]]:
+        """Pending events as (watch descriptor, file name), without blocking."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+            events.append((wd, name))
+            offset += length
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _errno_error(call: str) -> OSError:
+    errno = ctypes.get_errno()
+    return OSError(errno, f"{call}: {os.strerror(errno)}")
+
+
+class SettingsWatcher:
+    """Reloads the settings file whenever it changes, from a background thread: every
+    valid edit goes to `on_change`, and the reason an invalid one was rejected (bad YAML,
+    or settings that fail validation or that `on_change` raised on) goes to `on_error`.
+    Changes are noticed through inotify where available, else by polling the mtime, and
+    saving the same settings again is not a change."""
+
+    def __init__(
+        self,
+        path: str,
+        settings: Settings,
+        on_change: Callable[[Settings], None],
+        on_error: Callable[[str], None],
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.settings = settings
+        self.on_change = on_change
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self._signature = _signature(self.path)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="settings-watcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def check(self) -> bool:
+        """Reload the file if it changed since the last check; returns whether it did."""
+        signature = _signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        previous, self._signature = self._signature, signature
+        try:
+            settings = load_settings(self.path)
+        except (FileNotFoundError, SystemExit):  # replaced between the stat and the read
+            self._signature = previous  # so the file that replaces it is read
+            return False
+        except (OSError, yaml.YAMLError, ValidationError, TypeError) as e:
+            self.on_error(f"Rejected the edit of {self.path}, keeping the current settings: {e}")
+            return True
+        if settings == self.settings:
+            return True
+        try:
+            self.on_change(settings)
+        except Exception as e:
+            self.on_error(f"Failed to apply the edit of {self.path}: {e}")
+            return True
+        self.settings = settings
+        logger.info(f"Reloaded {self.path}")
+        return True
+
+    def _run(self) -> None:
+        try:
+            inotify = _Inotify()
+        except (OSError, AttributeError) as e:  # not Linux, or no inotify in this libc
+            logger.info(f"Polling {self.path} for changes every {self.poll_interval}s: {e}")
+            while not self._stopped.wait(self.poll_interval):
+                self.check()
+            return
+        try:
+            self._watch(inotify)
+        finally:
+            inotify.close()
+
+    def _watch(self, inotify: _Inotify) -> None:
+        directory, name = os.path.split(self.path)
+        dir_wd = inotify.add_watch(directory, DIR_EVENTS)
+        file_wd = self._add_file_watch(inotify)
+        while not self._stopped.is_set():
+            if not select.select([inotify.fd], [], [], STOP_INTERVAL)[0]:
+                continue
+            events = inotify.read()
+            if not any(wd == file_wd or (wd == dir_wd and n == name) for wd, n in events):
+                continue
+            while select.select([inotify.fd], [], [], DEBOUNCE)[0]:  # until writes settle
+                inotify.read()
+            file_wd = self._add_file_watch(inotify)  # the file may be a new one now
+            self.check()
+
+    def _add_file_watch(self, inotify: _Inotify) -> int | None:
+        try:
+            return inotify.add_watch(self.path, FILE_EVENTS)
+        except OSError:  # being replaced, the directory watch sees it arrive
+            return None
+
+
+def _signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
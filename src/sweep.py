@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterator
+
+import numpy as np
+
+from src.backtest import PriceSeries, run_backtest
+from src.option_chain import StrikeSelection
+from src.schemas import Settings, TickerSettings
+
+logger = logging.getLogger()
+
+CHUNK_SIZE = 512  # configs per worker task
+COLUMNS = (
+    "ticker",
+    "call_option_margin",
+    "put_option_margin",
+    "target_dte",
+    "total_return",
+    "cagr",
+    "max_drawdown",
+    "assignments",
+    "premiums",
+)
+NO_DTE = -1  # `target_dte: null` in the integer column
+
+
+@dataclass(frozen=True)
+class SharedPrices:
+    """Handle to a price history in shared memory, cheap to pickle to workers. The block
+    holds a (3, n) float64 array of day numbers, opens and closes."""
+
+    name: str
+    length: int
+
+    @classmethod
+    def create(cls, prices: PriceSeries) -> tuple[SharedPrices, SharedMemory]:
+        n = len(prices.close)
+        shm = SharedMemory(create=True, size=3 * n * 8)
+        data = np.ndarray((3, n), dtype=np.float64, buffer=shm.buf)
+        data[0] = prices.dates.astype("datetime64[D]").astype(np.int64)
+        data[1] = prices.open if prices.open is not None else prices.close
+        data[2] = prices.close
+        del data
+        return cls(shm.name, n), shm
+
+    def attach(self) -> tuple[PriceSeries, SharedMemory]:
+        # pool workers share the parent's resource tracker, which unlinks the block once
+        shm = SharedMemory(self.name)
+        data = np.ndarray((3, self.length), dtype=np.float64, buffer=shm.buf)
+        prices = PriceSeries(
+            dates=data[0].astype(np.int64).astype("datetime64[D]"), open=data[1], close=data[2]
+        )
+        return prices, shm
+
+
+@dataclass
+class SweepTask:
+    ticker: str
+    prices: SharedPrices
+    target_dte: int | None
+    call_margins: np.ndarray
+    put_margins: np.ndarray
+    backtest_kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+def run_task(task: SweepTask) -> dict[str, np.ndarray]:
+    """Backtest one chunk of configs in a worker, reading prices from shared memory."""
+    prices, shm = task.prices.attach()
+    try:
+        result = run_backtest(
+            prices,
+            task.call_margins,
+            task.put_margins,
+            target_dte=task.target_dte,
+            **task.backtest_kwargs,
+        )
+        n = len(task.call_margins)
+        return {
+            "ticker": np.full(n, task.ticker),
+            "call_option_margin": result.call_margins,
+            "put_option_margin": result.put_margins,
+            "target_dte": np.full(n, NO_DTE if task.target_dte is None else task.target_dte),
+            "total_return": result.total_return,
+            "cagr": result.cagr,
+            "max_drawdown": result.max_drawdown,
+            "assignments": result.assignments,
+            "premiums": result.premiums,
+        }
+    finally:
+        del prices
+        shm.close()
+
+
+@dataclass
+class SweepSpace:
+    """Values to sweep. Grid search takes the product of all of them, random search samples
+    margins uniformly between the extremes of each list."""
+
+    tickers: list[str]
+    call_margins: list[float]
+    put_margins: list[float]
+    target_dtes: list[int | None]
+
+    def validate(self, settings: Settings) -> None:
+        """Check the extremes of every range against `TickerSettings`, so that any row of
+        the output is valid in `settings.yaml`."""
+        for ticker in self.tickers:
+            for cm in (min(self.call_margins), max(self.call_margins)):
+                for pm in (min(self.put_margins), max(self.put_margins)):
+                    for dte in self.target_dtes:
+                        TickerSettings(
+                            ticker=ticker,
+                            call_option_margin=cm,
+                            put_option_margin=pm,
+                            target_dte=dte,
+                            strike_selection=settings.strike_selection,
+                        )
+
+    def grid(self) -> Iterator[tuple[str, int | None, np.ndarray, np.ndarray]]:
+        calls, puts = np.meshgrid(self.call_margins, self.put_margins, indexing="ij")
+        for ticker in self.tickers:
+            for dte in self.target_dtes:
+                yield ticker, dte, calls.ravel(), puts.ravel()
+
+    def random(
+        self, n: int, seed: int | None = None
+    ) -> Iterator[tuple[str, int | None, np.ndarray, np.ndarray]]:
+        rng = np.random.default_rng(seed)
+        groups = [(t, d) for t in self.tickers for d in self.target_dtes]
+        counts = np.bincount(rng.integers(len(groups), size=n), minlength=len(groups))
+        for (ticker, dte), count in zip(groups, counts):
+            if count:
+                yield (
+                    ticker,
+                    dte,
+                    rng.uniform(min(self.call_margins), max(self.call_margins), count),
+                    rng.uniform(min(self.put_margins), max(self.put_margins), count),
+                )
+
+
+class ColumnarWriter:
+    """Streams result chunks to a `.partial` zip of per-chunk `.npy` arrays as they
+    complete, so a long sweep never holds every row in memory, then on `close` joins them
+    into an `.npz` of one array per column, a column at a time. Read it back with
+    `read_results` or `np.load`."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._partial = f"{path}.partial"
+        self._zip = zipfile.ZipFile(self._partial, "w", compression=zipfile.ZIP_DEFLATED)
+        self.chunks = 0
+        self.rows = 0
+
+    def append(self, columns: dict[str, np.ndarray]) -> None:
+        for name in COLUMNS:
+            buffer = io.BytesIO()
+            np.save(buffer, columns[name], allow_pickle=False)
+            self._zip.writestr(f"{self.chunks:06d}/{name}.npy", buffer.getvalue())
+        self.chunks += 1
+        self.rows += len(columns[COLUMNS[0]])
+
+    def close(self) -> None:
+        self._zip.close()
+        with (
+            zipfile.ZipFile(self._partial) as chunks,
+            zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED) as out,
+        ):
+            for name in COLUMNS:
+                column = [
+                    np.load(io.BytesIO(chunks.read(f"{i:06d}/{name}.npy")), allow_pickle=False)
+                    for i in range(self.chunks)
+                ]
+                if column:  # laid out like `np.savez`
+                    with out.open(f"{name}.npy", "w", force_zip64=True) as f:
+                        np.lib.format.write_array(f, np.concatenate(column), allow_pickle=False)
+        os.remove(self._partial)
+
+    def __enter__(self) -> ColumnarWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def read_results(path: str) -> dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+def pareto_frontier(total_return: np.ndarray, max_drawdown: np.ndarray) -> np.ndarray:
+    """Indices of rows no other row beats on both return and drawdown, by drawdown."""
+    order = np.lexsort((-total_return, max_drawdown))
+    best_so_far = np.maximum.accumulate(total_return[order])
+    keep = np.r_[True, total_return[order][1:] > best_so_far[:-1]]
+    return order[keep]
+
+
+def ticker_settings(
+    results: dict[str, np.ndarray], i: int, strike_selection: StrikeSelection = "above"
+) -> TickerSettings:
+    dte = int(results["target_dte"][i])
+    return TickerSettings(
+        ticker=str(results["ticker"][i]),
+        call_option_margin=round(float(results["call_option_margin"][i]), 4),
+        put_option_margin=round(float(results["put_option_margin"][i]), 4),
+        target_dte=None if dte == NO_DTE else dte,
+        strike_selection=strike_selection,
+    )
+
+
+def run_sweep(
+    prices: dict[str, PriceSeries],
+    tasks: Iterator[tuple[str, int | None, np.ndarray, np.ndarray]],
+    output: str,
+    max_workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    **backtest_kwargs: Any,
+) -> int:
+    """Fan the configs out over a process pool in chunks and stream results to `output`.
+    Each price history is copied into shared memory once, workers only get its name."""
+    blocks: dict[str, tuple[SharedPrices, SharedMemory]] = {}
+    try:
+        for ticker, series in prices.items():
+            blocks[ticker] = SharedPrices.create(series)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool, ColumnarWriter(output) as out:
+            futures = [
+                pool.submit(
+                    run_task,
+                    SweepTask(
+                        ticker,
+                        blocks[ticker][0],
+                        dte,
+                        calls[i : i + chunk_size],
+                        puts[i : i + chunk_size],
+                        backtest_kwargs,
+                    ),
+                )
+                for ticker, dte, calls, puts in tasks
+                for i in range(0, len(calls), chunk_size)
+            ]
+            for future in as_completed(futures):
+                out.append(future.result())
+                logger.debug(f"Sweep: {out.chunks}/{len(futures)} chunks, {out.rows} rows")
+            return out.rows
+    finally:
+        for _, shm in blocks.values():
+            shm.close()
+            shm.unlink()
@@ -3,30 +3,168 @@ from __future__ import annotations
 import asyncio
 import html
 import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from typing import TYPE_CHECKING
 
+import httpx
 import telegram
+from telegram.error import NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
 
+from src.metrics import METRICS
 from src.schemas import TelegramEnv
 
+if TYPE_CHECKING:
+    from src.cassette import TransportWrapper
+
 logger = logging.getLogger()
 
+COALESCE_WINDOW = 1.0  # a burst ends after this long without a new message
+MAX_COALESCE_DELAY = 5.0
+MAX_MESSAGE_LENGTH = 4096
+MIN_SEND_INTERVAL = 1.0  # Telegram allows about one message per second per chat
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+CODE_TAGS = len("<code></code>")
+
+
+def _coalesce(messages: list[tuple[str, bool]]) -> list[tuple[str, bool]]:
+    """Join consecutive messages into as few as fit Telegram's length limit. A joined
+    message is silent only if all of its parts are."""
+    batches: list[tuple[str, bool]] = []
+    for msg, silent in messages:
+        if batches:
+            text, batch_silent = batches[-1]
+            joined = f"{text}\n\n{msg}"
+            if len(html.escape(joined)) + CODE_TAGS <= MAX_MESSAGE_LENGTH:
+                batches[-1] = (joined, batch_silent and silent)
+                continue
+        batches.append((msg, silent))
+    return batches
+
 
 class TelegramBot:
-    def __init__(self, env: TelegramEnv) -> None:
-        self.bot = telegram.Bot(token=env.bot_token)
+    """Delivers messages from a background event loop over one long-lived bot session.
+    `send_message` only enqueues, so callers never wait on Telegram. Bursts of messages are
+    coalesced into one, and sends are spaced out and retried to respect rate limits.
+    `wrap_transport` wraps the HTTP transport of the session like `AsyncAlpacaClient`'s."""
+
+    def __init__(
+        self,
+        env: TelegramEnv,
+        coalesce_window: float = COALESCE_WINDOW,
+        min_send_interval: float = MIN_SEND_INTERVAL,
+        wrap_transport: TransportWrapper | None = None,
+    ) -> None:
+        request = None
+        if wrap_transport is not None:
+            transport = wrap_transport(httpx.AsyncHTTPTransport())
+            request = HTTPXRequest(httpx_kwargs={"transport": transport})
+        self.bot = telegram.Bot(token=env.bot_token, request=request)
         self.chat_id = env.chat_id
+        self.coalesce_window = coalesce_window
+        self.min_send_interval = min_send_interval
+        self.loop = asyncio.new_event_loop()
+        self._queue: asyncio.Queue[tuple[str, bool]] = asyncio.Queue()
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        self._last_sent = float("-inf")
+        self._thread = threading.Thread(target=self._run, name="telegram", daemon=True)
+        self._thread.start()
+
+    def connect(self) -> Future[None]:
+        """Open the bot session in the background, e.g. while startup does other work,
+        so the first message doesn't wait on the handshake."""
+        return asyncio.run_coroutine_threadsafe(self._initialize(), self.loop)
 
     def send_message(self, msg: str, silent: bool = False) -> None:
+        if self.loop.is_closed():
+            logger.error("[telegram] error: sender is closed, dropping message")
+            return
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, (msg, silent))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every queued message is delivered or given up on."""
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self.loop)
         try:
-            asyncio.run(self._send(msg, silent))
-        except Exception as e:
-            logger.error("[telegram] error: %s", e)
-
-    async def _send(self, msg: str, silent: bool) -> None:
-        async with self.bot:
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=f"<code>{html.escape(msg)}</code>",
-                parse_mode="HTML",
-                disable_notification=silent,
-            )
+            future.result(timeout)
+            return True
+        except FutureTimeoutError:
+            future.cancel()
+            return False
+
+    def close(self, timeout: float = 10) -> None:
+        if self.loop.is_closed():
+            return
+        if not self.flush(timeout):
+            logger.warning(f"[telegram] {self._queue.qsize()} messages left unsent")
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self._worker_task = self.loop.create_task(self._worker())
+        self.loop.run_forever()
+
+    async def _initialize(self) -> None:
+        async with self._init_lock:
+            if not self._initialized:
+                with METRICS.timer("telegram", "initialize"):
+                    await self.bot.initialize()
+                self._initialized = True
+
+    async def _shutdown(self) -> None:
+        self._worker_task.cancel()
+        if self._initialized:
+            await self.bot.shutdown()
+            self._initialized = False
+
+    async def _worker(self) -> None:
+        while True:
+            messages = [await self._queue.get()]
+            deadline = self.loop.time() + MAX_COALESCE_DELAY
+            while (timeout := min(self.coalesce_window, deadline - self.loop.time())) > 0:
+                try:
+                    messages.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            for text, silent in _coalesce(messages):
+                await self._deliver(text, silent)
+            for _ in messages:
+                self._queue.task_done()
+
+    async def _deliver(self, msg: str, silent: bool) -> None:
+        for attempt in range(MAX_RETRIES):
+            if (wait := self._last_sent + self.min_send_interval - self.loop.time()) > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self._initialize()
+                with METRICS.timer("telegram", "send_message"):
+                    await self.bot.send_message(
+                        chat_id=self.chat_id,
+                        text=f"<code>{html.escape(msg)}</code>",
+                        parse_mode="HTML",
+                        disable_notification=silent,
+                    )
+                self._last_sent = self.loop.time()
+                return
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                delay = (
+                    retry_after.total_seconds()
+                    if isinstance(retry_after, timedelta)
+                    else float(retry_after)
+                )
+            except NetworkError as e:  # includes timeouts
+                delay = BACKOFF_BASE * 2**attempt
+                logger.warning("[telegram] error: %s, retrying in %.1fs", e, delay)
+            except Exception as e:
+                logger.error("[telegram] error: %s", e)
+                return
+            await asyncio.sleep(delay)
+        logger.error("[telegram] error: giving up after %d attempts", MAX_RETRIES)
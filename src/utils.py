@@ -1,84 +1,266 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import threading
 import time
 from datetime import datetime, timezone
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from typing import Any, Callable
 
-from apscheduler.schedulers.base import STATE_STOPPED
-from apscheduler.schedulers.blocking import BlockingScheduler
 
-MAX_SCHEDULER_WAIT = 3600
+class _TTLEntry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.value: Any = None
+        self.fetched_at: float | None = None
+        self.generation = 0
+        self.refreshing = False
+        self.seeded = False
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
 
-
-class SafeBlockingScheduler(BlockingScheduler):
-    def _main_loop(self) -> None:  # type: ignore[override]
-        wait_seconds = MAX_SCHEDULER_WAIT
-        while self.state != STATE_STOPPED:  # type: ignore[attr-defined]
-            self._event.wait(wait_seconds)  # type: ignore[attr-defined]
-            self._event.clear()  # type: ignore[attr-defined]
-            wait_seconds = min(self._process_jobs() or MAX_SCHEDULER_WAIT, MAX_SCHEDULER_WAIT)
+    def age(self) -> float:
+        return float("inf") if self.fetched_at is None else time.monotonic() - self.fetched_at
 
 
 class cached_property_ttl:
-    """A property descriptor with time-based caching. Usage: @cached_property_ttl(ttl=60)."""
+    """A thread-safe property descriptor with time-based caching.
+    Usage: @cached_property_ttl(ttl=60, stale=0).
+
+    Only one caller per instance computes the value at a time, others wait for its result.
+    Within `stale` seconds past the TTL the expired value is returned while a background
+    thread refreshes it. Use `Owner.prop.invalidate(obj)`, `.refresh(obj)` and `.stats(obj)`
+    to drop, recompute and inspect the cache of an instance, `.seed(obj, value, age)` to
+    install a value from elsewhere (e.g. disk) and `.fresh(obj)` to never get a stale one."""
 
-    def __init__(self, ttl: float) -> None:
+    def __init__(self, ttl: float, stale: float = 0) -> None:
         self.ttl = ttl
+        self.stale = stale
         self.func: Callable[..., Any] = lambda _: None
+        self._lock = threading.Lock()
 
     def __call__(self, func: Callable[..., Any]) -> cached_property_ttl:
         self.func = func
         return self
 
     def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
         self.attr = f"_ttl_{name}"
 
     def __get__(self, obj: Any, objtype: type | None = None) -> Any:
         if obj is None:
             return self
-        cached = getattr(obj, self.attr, None)
-        if cached is not None and time.time() - cached[1] < self.ttl:
-            return cached[0]
-        result = self.func(obj)
-        setattr(obj, self.attr, (result, time.time()))
+        entry = self._entry(obj)
+        age = entry.age()
+        if age < self.ttl:
+            self._count(entry, "hits")
+            return entry.value
+        if age < self.ttl + self.stale or entry.seeded:
+            self._count(entry, "stale_hits")
+            self._revalidate(obj, entry)
+            return entry.value
+        with entry.lock:
+            if entry.age() < self.ttl:  # refreshed while we waited for the lock
+                self._count(entry, "hits")
+                return entry.value
+            self._count(entry, "misses")
+            return self._load(obj, entry)
+
+    def invalidate(self, obj: Any) -> None:
+        entry = self._entry(obj)
+        with self._lock:
+            entry.generation += 1  # results of refreshes already in flight are discarded
+            entry.fetched_at = None
+            entry.value = None
+            entry.seeded = False
+
+    def seed(self, obj: Any, value: Any, age: float) -> None:
+        """Cache `value` as if computed `age` seconds ago. Past the TTL it is still served,
+        as stale, while the first refresh runs; if that fails it is no longer served."""
+        entry = self._entry(obj)
+        with self._lock:
+            entry.value, entry.fetched_at = value, time.monotonic() - max(age, 0)
+            entry.seeded = age >= self.ttl
+
+    def peek(self, obj: Any) -> Any:
+        """The cached value, however old, or None; never computes it."""
+        return self._entry(obj).value
+
+    def fresh(self, obj: Any) -> Any:
+        """The cached value if within the TTL, else a blocking recompute."""
+        entry = self._entry(obj)
+        with entry.lock:
+            if entry.age() < self.ttl:
+                self._count(entry, "hits")
+                return entry.value
+            self._count(entry, "misses")
+            return self._load(obj, entry)
+
+    def revalidate(self, obj: Any) -> None:
+        """Refresh an expired value in the background."""
+        self._revalidate(obj, self._entry(obj))
+
+    def refresh(self, obj: Any) -> Any:
+        entry = self._entry(obj)
+        with entry.lock:
+            self._count(entry, "refreshes")
+            return self._load(obj, entry)
+
+    def stats(self, obj: Any) -> dict[str, int]:
+        entry = self._entry(obj)
+        with self._lock:
+            return dict(entry.stats)
+
+    def _count(self, entry: _TTLEntry, stat: str) -> None:
+        with self._lock:
+            entry.stats[stat] += 1
+
+    def _entry(self, obj: Any) -> _TTLEntry:
+        entry = obj.__dict__.get(self.attr)
+        if entry is None:
+            with self._lock:
+                entry = obj.__dict__.setdefault(self.attr, _TTLEntry())
+        return entry
+
+    def _load(self, obj: Any, entry: _TTLEntry) -> Any:
+        generation = entry.generation
+        try:
+            result = self.func(obj)
+        except Exception:
+            self._count(entry, "errors")
+            raise
+        with self._lock:
+            if entry.generation == generation:
+                entry.value, entry.fetched_at = result, time.monotonic()
+                entry.seeded = False
         return result
 
+    def _revalidate(self, obj: Any, entry: _TTLEntry) -> None:
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+
+        def refresh() -> None:
+            try:
+                with entry.lock:
+                    if entry.age() >= self.ttl:
+                        self._count(entry, "refreshes")
+                        self._load(obj, entry)
+            except Exception as e:
+                logging.getLogger().warning(f"Background refresh of `{self.name}` failed: {e}")
+                with self._lock:
+                    entry.seeded = False  # unconfirmed, so only served within `stale`
+            finally:
+                entry.refreshing = False
+
+        threading.Thread(target=refresh, name=f"refresh-{self.name}", daemon=True).start()
+
+
+def _next_month(timestamp: float) -> float:
+    """Timestamp of the first instant of the UTC month after `timestamp`."""
+    now = datetime.fromtimestamp(timestamp, timezone.utc)
+    year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+    return datetime(year, month, 1, tzinfo=timezone.utc).timestamp()
+
 
 class _MonthlyRotatingHandler(TimedRotatingFileHandler):
     def __init__(self, log_dir: str, **kwargs: Any) -> None:
         self.log_dir = log_dir
         super().__init__(self._current_log_path(), when="MIDNIGHT", **kwargs)
+        self.rolloverAt = _next_month(time.time())
 
     def _current_log_path(self) -> str:
         return os.path.join(self.log_dir, f"{datetime.now(timezone.utc).strftime('%Y-%m')}.log")
 
     def shouldRollover(self, record: logging.LogRecord) -> int:
-        return 1 if self._current_log_path() != self.baseFilename else 0
+        return 1 if record.created >= self.rolloverAt else 0
 
     def doRollover(self) -> None:
         if self.stream:
             self.stream.close()
             self.stream = None  # type: ignore[assignment]
         self.baseFilename = self._current_log_path()
+        self.rolloverAt = _next_month(time.time())
         self.stream = self._open()
 
 
-def setup_logger(log_dir: str = "logs", level: int = logging.INFO) -> logging.Logger:
+class _UtcFormatter(logging.Formatter):
+    converter = time.gmtime  # type: ignore[assignment]
+
+
+class JsonFormatter(_UtcFormatter):
+    """One JSON object per line. Messages that are themselves JSON objects, like the
+    bot's `json.dumps` reports, are embedded under `data` instead of as a string."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}Z",
+            "level": record.levelname,
+        }
+        message = record.getMessage()
+        payload = None
+        if message.startswith("{"):
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                pass
+        if isinstance(payload, dict):
+            entry["data"] = payload
+        else:
+            entry["message"] = message
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _LocalQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue never leaves the process, so keep `exc_info` for the formatter and only
+        # render the message here, before its args can change
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def _stop_listener() -> None:
+    """Flush queued records and close the log files."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_logger(
+    log_dir: str = "logs", level: int = logging.INFO, json_format: bool = False
+) -> logging.Logger:
+    """Log to monthly files under `log_dir` and to stderr. Records are handed to a
+    `QueueListener` thread, so callers never wait on file or console I/O."""
+    global _listener
     os.makedirs(log_dir, exist_ok=True)
 
     logger = logging.getLogger()
     logger.setLevel(level)
     logger.handlers.clear()
+    _stop_listener()
 
-    class UtcFormatter(logging.Formatter):
-        converter = time.gmtime  # type: ignore[assignment]
-
-    formatter = UtcFormatter(
-        fmt="%(asctime)sZ | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    formatter: logging.Formatter
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = _UtcFormatter(
+            fmt="%(asctime)sZ | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
 
     fh = _MonthlyRotatingHandler(log_dir, encoding="utf-8")
     fh.setLevel(level)
@@ -88,8 +270,12 @@ def setup_logger(log_dir: str = "logs", level: int = logging.INFO) -> logging.Lo
     sh.setLevel(level)
     sh.setFormatter(formatter)
 
-    logger.addHandler(fh)
-    logger.addHandler(sh)
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    logger.addHandler(_LocalQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, fh, sh, respect_handler_level=True)
+    _listener.start()
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
 
     for lib in ["telegram", "telegram.bot", "telegram.ext", "httpx", "httpcore"]:
         logging.getLogger(lib).setLevel(logging.WARNING)
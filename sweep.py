@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import zlib
+
+import yaml
+
+from src.backtest import PriceSeries, margin_range
+from src.schemas import load_settings
+from src.sweep import SweepSpace, pareto_frontier, read_results, run_sweep, ticker_settings
+
+
+def dte_list(value: str) -> list[int | None]:
+    """Comma-separated days to expiry, `none` for the weekly default."""
+    return [None if v.strip().lower() == "none" else int(v) for v in value.split(",")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Sweep option margins, days to expiry and tickers over backtests."
+    )
+    parser.add_argument("--settings", default="settings.yaml", help="base settings to tune")
+    parser.add_argument("--tickers", help="comma-separated, defaults to the settings' tickers")
+    parser.add_argument("--call-margins", type=margin_range, default=margin_range("0:0.2:21"))
+    parser.add_argument("--put-margins", type=margin_range, default=margin_range("0:0.2:21"))
+    parser.add_argument("--target-dte", type=dte_list, default=dte_list("none,14,30"))
+    parser.add_argument("--random", type=int, help="sample this many configs instead of a grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv-dir", help="`<TICKER>.csv` daily bars, synthetic if omitted")
+    parser.add_argument("--years", type=float, default=20, help="years of synthetic prices")
+    parser.add_argument("--volatility", type=float, default=0.25)
+    parser.add_argument("--rate", type=float, default=0.04)
+    parser.add_argument("--cash", type=float, default=100_000.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="sweep.npz")
+    return parser.parse_args()
+
+
+def load_prices(tickers: list[str], csv_dir: str | None, years: float) -> dict[str, PriceSeries]:
+    if csv_dir:
+        return {t: PriceSeries.from_csv(os.path.join(csv_dir, f"{t}.csv")) for t in tickers}
+    # stable per-ticker seeds, so reruns compare like with like
+    return {t: PriceSeries.synthetic(years, seed=zlib.crc32(t.encode())) for t in tickers}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    settings = load_settings(args.settings)
+    tickers = args.tickers.split(",") if args.tickers else settings.symbols
+    space = SweepSpace(
+        tickers=tickers,
+        call_margins=args.call_margins.tolist(),
+        put_margins=args.put_margins.tolist(),
+        target_dtes=args.target_dte,
+    )
+    space.validate(settings)
+
+    start = time.perf_counter()
+    rows = run_sweep(
+        load_prices(tickers, args.csv_dir, args.years),
+        space.random(args.random, args.seed) if args.random else space.grid(),
+        args.output,
+        max_workers=args.workers,
+        volatility=args.volatility,
+        rate=args.rate,
+        initial_cash=args.cash,
+        selection=settings.strike_selection,
+    )
+    print(f"{rows} configs in {time.perf_counter() - start:.2f}s -> {args.output}")
+
+    results = read_results(args.output)
+    print("\nPareto frontier (return vs. max drawdown):")
+    print(f"{'return':>9} {'cagr':>7} {'max dd':>7}  settings.yaml `tickers` entry")
+    for i in pareto_frontier(results["total_return"], results["max_drawdown"]):
+        entry = ticker_settings(results, i, settings.strike_selection)
+        row = entry.model_dump(exclude_defaults=True)
+        print(
+            f"{results['total_return'][i]:+9.1%} {results['cagr'][i]:+7.2%} "
+            f"{results['max_drawdown'][i]:7.1%}  "
+            f"- {yaml.safe_dump(row, default_flow_style=True, sort_keys=False).strip()}"
+        )
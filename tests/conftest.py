@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+TIMING_HEADROOM = 3  # factor on the budgets that are also checked without --timing
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--timing",
+        action="store_true",
+        help="also run the `timing` tests, which assert on wall-clock budgets",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers", "timing: asserts on wall-clock time, so only run with --timing on quiet machines"
+    )
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption("--timing"):
+        return
+    skip = pytest.mark.skip(reason="wall-clock budget, run with --timing")
+    for item in items:
+        if "timing" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def timing_headroom(request: pytest.FixtureRequest) -> float:
+    """Factor on a wall-clock budget: 1 with --timing, else `TIMING_HEADROOM`, so that the
+    default run still catches gross regressions on a slow or busy machine."""
+    return 1 if request.config.getoption("--timing") else TIMING_HEADROOM
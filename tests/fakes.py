@@ -0,0 +1,411 @@
+"""Local stand-ins for Alpaca endpoints, so tests run offline."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from websockets.asyncio.server import ServerConnection, serve
+
+from src.pricing import DAYS_PER_YEAR, black_scholes
+
+
+def order_payload(order_id: str | None = None, **overrides: Any) -> dict[str, Any]:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": order_id or str(uuid.uuid4()),
+        "client_order_id": str(uuid.uuid4()),
+        "created_at": now,
+        "updated_at": now,
+        "submitted_at": now,
+        "symbol": "AAPL250926C00210000",
+        "asset_class": "us_option",
+        "qty": "1",
+        "filled_qty": "0",
+        "order_class": "simple",
+        "type": "market",
+        "side": "sell",
+        "time_in_force": "day",
+        "status": "new",
+        "extended_hours": False,
+        **overrides,
+    }
+
+
+class FakeTradingStreamServer:
+    """Speaks the auth/listen handshake of Alpaca's trade-updates websocket and pushes
+    whatever updates the test asks for to every listening client."""
+
+    def __init__(self, authorize: bool = True) -> None:
+        self.authorize = authorize
+        self.connections: set[ServerConnection] = set()
+        self.listening = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-stream", daemon=True)
+        self.port = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/stream"
+
+    def __enter__(self) -> FakeTradingStreamServer:
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+    def push(self, event: str, order: dict[str, Any]) -> None:
+        message = json.dumps(
+            {
+                "stream": "trade_updates",
+                "data": {
+                    "event": event,
+                    "order": order,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                },
+            }
+        )
+        asyncio.run_coroutine_threadsafe(self._broadcast(message), self._loop).result(5)
+
+    def disconnect_all(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(5)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self) -> None:
+        self._stop = asyncio.Event()
+        async with serve(self._handle, "127.0.0.1", 0) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self._started.set()
+            await self._stop.wait()
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg.get("action") == "authenticate":
+                status = "authorized" if self.authorize else "unauthorized"
+                await ws.send(
+                    json.dumps(
+                        {
+                            "stream": "authorization",
+                            "data": {"action": "authenticate", "status": status},
+                        }
+                    )
+                )
+            elif msg.get("action") == "listen":
+                self.connections.add(ws)
+                await ws.send(
+                    json.dumps({"stream": "listening", "data": {"streams": ["trade_updates"]}})
+                )
+                self.listening.set()
+        self.connections.discard(ws)
+
+    async def _broadcast(self, message: str) -> None:
+        for ws in list(self.connections):
+            await ws.send(message)
+
+    async def _close_all(self) -> None:
+        self.listening.clear()
+        for ws in list(self.connections):
+            await ws.close()
+
+
+def position_payload(symbol: str, qty: float, price: float) -> dict[str, Any]:
+    is_option = len(symbol) > 15 and symbol[-9] in "CP"
+    return {
+        "asset_id": str(uuid.uuid4()),
+        "symbol": symbol,
+        "exchange": "" if is_option else "NASDAQ",
+        "asset_class": "us_option" if is_option else "us_equity",
+        "avg_entry_price": str(price),
+        "qty": str(abs(qty)),
+        "side": "long" if qty > 0 else "short",
+        "cost_basis": str(abs(qty) * price),
+        "current_price": str(price),
+    }
+
+
+class FakeAlpacaServer:
+    """In-memory stand-in for the trading and market data REST APIs on one local port, with
+    an optional per-request latency. Listed contracts are weekly Friday expirations with
+    strikes every dollar within 20% of the underlying price, quoted a cent either side of
+    their Black-Scholes price at `volatility` and with open interest falling off away from
+    the money; orders fill on first poll, or never without `fill_orders`. The market is open
+    09:30-16:00 on weekdays except `holidays`, closing at 13:00 on `early_closes`. `fail`
+    makes upcoming requests fail."""
+
+    def __init__(
+        self,
+        prices: dict[str, float],
+        positions: list[dict[str, Any]] | None = None,
+        cash: float = 100000.0,
+        latency: float = 0.0,
+        weeks: int = 8,
+        volatility: float = 0.3,
+        holidays: set[date] | None = None,
+        early_closes: set[date] | None = None,
+        fill_orders: bool = True,
+    ) -> None:
+        self.prices = prices
+        self.positions = positions or []
+        self.cash = cash
+        self.latency = latency
+        self.weeks = weeks
+        self.volatility = volatility
+        self.holidays = holidays or set()
+        self.early_closes = early_closes or set()
+        self.fill_orders = fill_orders
+        self.orders: dict[str, dict[str, Any]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.in_flight = self.peak_in_flight = 0  # requests being handled at once
+        self._failures: dict[str, list[tuple[int, bool]]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> FakeAlpacaServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, path_prefix: str = "") -> int:
+        with self._lock:
+            return sum(1 for _, path in self.requests if path.startswith(path_prefix))
+
+    def fail(self, path: str, *statuses: int, processed: bool = False) -> None:
+        """Answer the next requests to `path` with `statuses`, one each, after handling them
+        as usual if `processed` (like a response lost on the way back)."""
+        with self._lock:
+            self._failures.setdefault(path, []).extend((s, processed) for s in statuses)
+
+    def reset_requests(self) -> None:
+        with self._lock:
+            self.requests.clear()
+
+    def calendar(self, start: date, end: date) -> list[dict[str, str]]:
+        days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+        return [
+            {
+                "date": day.isoformat(),
+                "open": "09:30",
+                "close": "13:00" if day in self.early_closes else "16:00",
+            }
+            for day in days
+            if day.weekday() < 5 and day not in self.holidays
+        ]
+
+    def contracts(self, params: dict[str, str]) -> list[dict[str, Any]]:
+        today = date.today()
+        friday = today + timedelta(days=(4 - today.weekday()) % 7)
+        expirations = [friday + timedelta(weeks=w) for w in range(self.weeks)]
+        if "expiration_date" in params:
+            expirations = [e for e in expirations if e.isoformat() == params["expiration_date"]]
+        if "expiration_date_gte" in params:
+            expirations = [e for e in expirations if e.isoformat() >= params["expiration_date_gte"]]
+        if "expiration_date_lte" in params:
+            expirations = [e for e in expirations if e.isoformat() <= params["expiration_date_lte"]]
+        types = [params["type"]] if "type" in params else ["call", "put"]
+        contracts = []
+        for ticker in params.get("underlying_symbols", "").split(","):
+            price = self.prices.get(ticker)
+            if price is None:
+                continue
+            for expiration in expirations:
+                for option_type in types:
+                    for strike in range(int(price * 0.8), int(price * 1.2) + 1):
+                        contract = self._contract(ticker, expiration, option_type, strike)
+                        moneyness = (strike / price - 1) / 0.05
+                        contract["open_interest"] = str(int(1000 * math.exp(-(moneyness**2))))
+                        contracts.append(contract)
+        return contracts
+
+    @staticmethod
+    def _contract(ticker: str, expiration: date, option_type: str, strike: int) -> dict[str, Any]:
+        symbol = f"{ticker}{expiration:%y%m%d}{option_type[0].upper()}{strike * 1000:08d}"
+        return {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_OID, symbol)),
+            "symbol": symbol,
+            "name": symbol,
+            "status": "active",
+            "tradable": True,
+            "expiration_date": expiration.isoformat(),
+            "root_symbol": ticker,
+            "underlying_symbol": ticker,
+            "underlying_asset_id": str(uuid.uuid5(uuid.NAMESPACE_OID, ticker)),
+            "type": option_type,
+            "style": "american",
+            "strike_price": str(strike),
+            "size": "100",
+        }
+
+    def snapshot(self, symbol: str) -> dict[str, Any] | None:
+        # OCC symbol: underlying, YYMMDD, C/P, strike * 1000 in 8 digits
+        price = self.prices.get(symbol[:-15])
+        if price is None:
+            return None
+        expiration = datetime.strptime(symbol[-15:-9], "%y%m%d").date()
+        mid = float(
+            black_scholes(
+                price,
+                int(symbol[-8:]) / 1000,
+                max((expiration - date.today()).days, 1) / DAYS_PER_YEAR,
+                self.volatility,
+                0.04,
+                symbol[-9] == "C",
+            )
+        )
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "latestQuote": {
+                "t": now,
+                "bp": round(max(mid - 0.01, 0), 2),
+                "bs": 10,
+                "bx": "C",
+                "ap": round(mid + 0.01, 2),
+                "as": 10,
+                "ax": "C",
+                "c": "A",
+            },
+            "impliedVolatility": self.volatility,
+        }
+
+    def route(self, method: str, path: str, params: dict[str, str], body: Any) -> Any:
+        if path == "/v2/account":
+            equity = self.cash + sum(
+                float(p["qty"]) * self.prices.get(p["symbol"], 0) for p in self.positions
+            )
+            return {
+                "id": str(uuid.UUID(int=1)),
+                "account_number": "PA0000000",
+                "status": "ACTIVE",
+                "currency": "USD",
+                "cash": str(self.cash),
+                "equity": str(equity),
+            }
+        if path == "/v2/positions":
+            return self.positions
+        if path == "/v2/calendar":
+            start, end = date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+            return self.calendar(start, end)
+        if path == "/v2/stocks/trades/latest":
+            now = datetime.now(timezone.utc).isoformat()
+            return {
+                "trades": {
+                    s: {"t": now, "p": self.prices[s], "s": 100, "x": "V", "i": 1, "z": "C"}
+                    for s in params["symbols"].split(",")
+                    if s in self.prices
+                }
+            }
+        if path == "/v1beta1/options/snapshots":
+            snapshots = {s: self.snapshot(s) for s in params["symbols"].split(",")}
+            return {
+                "snapshots": {s: q for s, q in snapshots.items() if q is not None},
+                "next_page_token": None,
+            }
+        if path == "/v2/options/contracts":
+            contracts = self.contracts(params)
+            start = int(params.get("page_token") or 0)
+            limit = int(params.get("limit") or 100)
+            end = start + limit
+            return {
+                "option_contracts": contracts[start:end],
+                "next_page_token": str(end) if end < len(contracts) else None,
+            }
+        if path == "/v2/orders" and method == "POST":
+            client_order_id = body.get("client_order_id") or str(uuid.uuid4())
+            if any(o["client_order_id"] == client_order_id for o in self.orders.values()):
+                return 422, {"code": 40010001, "message": "client_order_id must be unique"}
+            order = order_payload(
+                symbol=body["symbol"],
+                qty=str(body["qty"]),
+                side=body["side"],
+                status="accepted",
+                client_order_id=client_order_id,
+            )
+            self.orders[order["id"]] = order
+            return order
+        if path == "/v2/orders:by_client_order_id":
+            return next(
+                (
+                    o
+                    for o in self.orders.values()
+                    if o["client_order_id"] == params["client_order_id"]
+                ),
+                None,
+            )
+        if path.startswith("/v2/orders/"):
+            if (order := self.orders.get(path.rsplit("/", 1)[1])) is None:
+                return None
+            if self.fill_orders:
+                order.update(status="filled", filled_qty=order["qty"], filled_avg_price="1.00")
+            return order
+        return None
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def _respond(self, method: str) -> None:
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with server._lock:
+                    server.requests.append((method, url.path))
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.in_flight -= 1
+                    failures = server._failures.get(url.path)
+                    injected, processed = failures.pop(0) if failures else (None, True)
+                    payload = server.route(method, url.path, params, body) if processed else None
+                status = 200
+                if isinstance(payload, tuple):
+                    status, payload = payload
+                elif payload is None:
+                    status, payload = 404, {"code": 404}
+                if injected is not None:
+                    status, payload = injected, {"code": injected, "message": "injected failure"}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._respond("GET")
+
+            def do_POST(self) -> None:
+                self._respond("POST")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
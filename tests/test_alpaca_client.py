@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-from datetime import date
+import json
+import threading
+import time
+from datetime import date, timedelta
 from unittest.mock import MagicMock, PropertyMock, patch
 
+import numpy as np
 import pytest
-from alpaca.trading.enums import OrderSide, PositionSide
+from alpaca.trading.enums import ContractType, OrderSide
 
+from src.chain_quotes import ChainQuoteLoader, LiquidityFilter
+from src.expirations import ExpirationCalendar, expiration_horizon
+from src.option_chain import OptionChainIndex
+from src.portfolio import PositionRecord, Positions
+from src.pricing import black_scholes, norm_cdf
 from src.schemas import AlpacaEnv, Settings
+from tests.fakes import FakeAlpacaServer, position_payload
+from tests.test_expirations import _contracts_response, _fridays
+from tests.test_option_chain import _chain_response
 
 SETTINGS_KWARGS = {
     "ticker": "AAPL",
@@ -16,6 +28,11 @@ SETTINGS_KWARGS = {
     "check_value_schedule": "0 10-16 * * 1-5",
 }
 ENV = AlpacaEnv(api_key="fake", api_secret="fake")
+UNLIMITED = {"requests_per_minute": 10**6, "burst": 10**4}  # tests aren't held to the quota
+
+
+def holdings(**qty: float) -> Positions:
+    return Positions(PositionRecord(symbol, q) for symbol, q in qty.items())
 
 
 def make_client(settings_overrides=None):
@@ -27,16 +44,14 @@ def make_client(settings_overrides=None):
         client.settings = s
         client.client = MagicMock()
         client.data_client = MagicMock()
+        client.expiration_calendar = ExpirationCalendar(client.client)
+        client.option_chains = OptionChainIndex(client.client)
+        client.chain_quotes = ChainQuoteLoader(client.data_client, client.option_chains)
+        client.fill_tracker = None
     return client
 
 
 class TestGetExpirationDate:
-    @staticmethod
-    def _contracts(has_contracts=True):
-        mock = MagicMock()
-        mock.option_contracts = [MagicMock()] if has_contracts else []
-        return mock
-
     @pytest.mark.parametrize(
         "today, expected",
         [
@@ -51,7 +66,9 @@ class TestGetExpirationDate:
     )
     def test_expiration_date(self, today, expected):
         client = make_client()
-        client.client.get_option_contracts.return_value = self._contracts()
+        client.client.get_option_contracts.return_value = _contracts_response(
+            _fridays(date(2025, 9, 22))
+        )
         with patch("src.alpaca_client.date") as mock_date:
             mock_date.today.return_value = today
             mock_date.side_effect = lambda *a, **kw: date(*a, **kw)
@@ -60,13 +77,10 @@ class TestGetExpirationDate:
     def test_falls_back_on_holiday(self):
         client = make_client()
         thursday = date(2026, 4, 2)
-
-        def fake_get_contracts(req):
-            mock = MagicMock()
-            mock.option_contracts = [MagicMock()] if req.expiration_date == thursday else []
-            return mock
-
-        client.client.get_option_contracts.side_effect = fake_get_contracts
+        expirations = [thursday] + _fridays(date(2026, 4, 6))
+        client.client.get_option_contracts.return_value = _contracts_response(
+            expirations, ticker="SOXL"
+        )
         with patch("src.alpaca_client.date") as mock_date:
             mock_date.today.return_value = date(2026, 3, 31)  # Tuesday
             mock_date.side_effect = lambda *a, **kw: date(*a, **kw)
@@ -74,13 +88,45 @@ class TestGetExpirationDate:
 
     def test_no_contracts_raises(self):
         client = make_client()
-        client.client.get_option_contracts.return_value = self._contracts(has_contracts=False)
+        client.client.get_option_contracts.return_value = _contracts_response([])
         with patch("src.alpaca_client.date") as mock_date:
             mock_date.today.return_value = date(2026, 3, 31)
             mock_date.side_effect = lambda *a, **kw: date(*a, **kw)
             with pytest.raises(RuntimeError, match="No option expiration dates found"):
                 client.get_expiration_date("SOXL")
 
+    def test_only_later_expirations_raises(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _contracts_response(
+            [date(2026, 4, 10)], ticker="SOXL"
+        )
+        with patch("src.alpaca_client.date") as mock_date:
+            mock_date.today.return_value = date(2026, 3, 31)
+            mock_date.side_effect = lambda *a, **kw: date(*a, **kw)
+            with pytest.raises(RuntimeError, match="No option expiration dates found"):
+                client.get_expiration_date("SOXL")
+
+    @pytest.mark.parametrize(
+        "target_dte, expected",
+        [
+            (0, date(2025, 9, 26)),
+            (7, date(2025, 9, 26)),  # 9/29 target, 9/26 and 10/3 tie -> earlier
+            (14, date(2025, 10, 3)),
+            (30, date(2025, 10, 24)),
+            (90, date(2025, 12, 19)),  # past the default horizon
+        ],
+    )
+    def test_target_dte(self, target_dte, expected):
+        client = make_client()
+        client.expiration_calendar.horizon_days = expiration_horizon([target_dte])
+        client.client.get_option_contracts.return_value = _contracts_response(
+            _fridays(date(2025, 9, 22), weeks=20)
+        )
+        with patch("src.alpaca_client.date") as mock_date:
+            mock_date.today.return_value = date(2025, 9, 22)
+            mock_date.side_effect = lambda *a, **kw: date(*a, **kw)
+            assert client.get_expiration_date("AAPL", target_dte) == expected
+
 
 class TestStrikePriceCalculation:
     def test_call_strike_price(self):
@@ -111,7 +157,7 @@ class TestSellCoveredCalls:
         from src.alpaca_client import AlpacaClient
 
         client = make_client()
-        positions = {"AAPL": {"qty": "50", "price": "200.0"}}
+        positions = holdings(AAPL=50)
         with patch.object(
             AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
         ):
@@ -122,7 +168,7 @@ class TestSellCoveredCalls:
         from src.alpaca_client import AlpacaClient
 
         client = make_client()
-        positions = {"AAPL": {"qty": "200", "price": "200.0"}}
+        positions = holdings(AAPL=200)
 
         mock_contract = MagicMock()
         mock_contract.symbol = "AAPL250926C00210000"
@@ -141,7 +187,7 @@ class TestSellCoveredPuts:
         from src.alpaca_client import AlpacaClient
 
         client = make_client()
-        positions = {"USD": {"qty": "1000", "price": "1.00"}}
+        positions = holdings(USD=1000)
         with patch.object(
             AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
         ):
@@ -152,7 +198,7 @@ class TestSellCoveredPuts:
         from src.alpaca_client import AlpacaClient
 
         client = make_client()
-        positions = {"USD": {"qty": "50000", "price": "1.00"}}
+        positions = holdings(USD=50000)
 
         mock_contract = MagicMock()
         mock_contract.symbol = "AAPL250926P00190000"
@@ -166,32 +212,6 @@ class TestSellCoveredPuts:
         client.submit_sell_order.assert_called_once_with("AAPL250926P00190000", 2)
 
 
-class TestSignedQty:
-    def test_short_is_negative(self):
-        from src.alpaca_client import _signed_qty
-
-        p = MagicMock()
-        p.qty = "20"
-        p.side = PositionSide.SHORT
-        assert _signed_qty(p) == "-20"
-
-    def test_long_is_positive(self):
-        from src.alpaca_client import _signed_qty
-
-        p = MagicMock()
-        p.qty = "100"
-        p.side = PositionSide.LONG
-        assert _signed_qty(p) == "100"
-
-    def test_short_already_negative(self):
-        from src.alpaca_client import _signed_qty
-
-        p = MagicMock()
-        p.qty = "-20"
-        p.side = PositionSide.SHORT
-        assert _signed_qty(p) == "-20"
-
-
 class TestTradeOptions:
     def _filled_order(self, symbol: str, side: OrderSide) -> MagicMock:
         order = MagicMock()
@@ -208,17 +228,17 @@ class TestTradeOptions:
         client = make_client()
         client.have_option_contracts = MagicMock(return_value=False)
         client.get_expiration_date = MagicMock(return_value=date(2025, 9, 26))
-        client.get_ticker_price = MagicMock(return_value=200.0)
+        client.snapshot = MagicMock(prices={"AAPL": 200.0, "SPY": 200.0})
         client.sell_covered_calls = MagicMock(return_value=MagicMock())
         client.wait_for_fill = MagicMock(
             return_value=self._filled_order("AAPL250926C00210000", OrderSide.SELL)
         )
-        positions = {"AAPL": {"qty": "200", "price": "200.0"}}
+        positions = holdings(AAPL=200)
 
         with patch.object(
             AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
         ):
-            trade = client.trade_options()
+            trade = client.trade_options(client.settings.tickers[0])
 
         assert trade is not None
         assert trade["type"] == "call"
@@ -230,18 +250,458 @@ class TestTradeOptions:
         client = make_client()
         client.have_option_contracts = MagicMock(return_value=False)
         client.get_expiration_date = MagicMock(return_value=date(2025, 9, 26))
-        client.get_ticker_price = MagicMock(return_value=200.0)
+        client.snapshot = MagicMock(prices={"AAPL": 200.0, "SPY": 200.0})
         client.sell_covered_puts = MagicMock(return_value=MagicMock())
         client.wait_for_fill = MagicMock(
             return_value=self._filled_order("AAPL250926P00190000", OrderSide.SELL)
         )
-        positions = {"AAPL": {"qty": "0", "price": "200.0"}, "USD": {"qty": "50000"}}
+        positions = holdings(AAPL=0, USD=50000)
 
         with patch.object(
             AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
         ):
-            trade = client.trade_options()
+            trade = client.trade_options(client.settings.tickers[0])
 
         assert trade is not None
         assert trade["type"] == "put"
         assert trade["side"] == "sell"
+
+
+class TestTickerPrices:
+    def test_single_batched_request(self):
+        client = make_client()
+        client.data_client.get_stock_latest_trade.return_value = {
+            "AAPL": MagicMock(price=200.0),
+            "SPY": MagicMock(price=500.0),
+        }
+        assert client.get_ticker_prices(["AAPL", "SPY"]) == {"AAPL": 200.0, "SPY": 500.0}
+        client.data_client.get_stock_latest_trade.assert_called_once()
+
+    def test_missing_price_raises(self):
+        client = make_client()
+        client.data_client.get_stock_latest_trade.return_value = {"AAPL": MagicMock(price=200.0)}
+        with pytest.raises(RuntimeError, match="`SPY`"):
+            client.get_ticker_prices(["AAPL", "SPY"])
+
+
+class TestApplySettings:
+    def _client(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = make_client({"tickers": ["AAPL", "SPY"]})
+        client.get_ticker_prices = MagicMock()
+        AlpacaClient.snapshot.seed(client, MagicMock(), 0)
+        return client
+
+    def test_removed_ticker_keeps_the_snapshot(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = self._client()
+        snapshot = AlpacaClient.snapshot.peek(client)
+        client.apply_settings(Settings(**{**SETTINGS_KWARGS, "tickers": ["AAPL"]}))
+        assert client.settings.symbols == ["AAPL"]
+        assert AlpacaClient.snapshot.peek(client) is snapshot
+        client.get_ticker_prices.assert_not_called()
+
+    def test_added_ticker_is_validated_and_fetched(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = self._client()
+        settings = Settings(**{**SETTINGS_KWARGS, "tickers": ["AAPL", "SPY", "QQQ"]})
+        client.apply_settings(settings)
+        client.get_ticker_prices.assert_called_once_with(["QQQ"])
+        assert client.settings is settings
+        assert AlpacaClient.snapshot.peek(client) is None
+
+    def test_further_target_dte_widens_the_calendar(self):
+        client = self._client()
+        client.apply_settings(Settings(**{**SETTINGS_KWARGS, "target_dte": 90}))
+        assert client.expiration_calendar.horizon_days == 125
+
+    def test_ticker_without_price_is_rejected(self):
+        client = self._client()
+        original = client.settings
+        client.get_ticker_prices.side_effect = RuntimeError("Ticker price is unavailable")
+        with pytest.raises(RuntimeError):
+            client.apply_settings(Settings(**{**SETTINGS_KWARGS, "tickers": ["NOPE"]}))
+        assert client.settings is original
+
+
+class TestCashAllocations:
+    def test_cash_split_between_put_tickers(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = make_client({"tickers": ["AAPL", "SPY", "MSFT"]})
+        client.have_option_contracts = MagicMock(side_effect=lambda t: t == "MSFT")
+        positions = holdings(USD=90000, AAPL=200, SPY=0, MSFT=0)
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            assert client.cash_allocations() == {"SPY": 90000.0}
+
+    def test_no_put_tickers(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = make_client()
+        client.have_option_contracts = MagicMock(return_value=False)
+        positions = holdings(USD=90000, AAPL=200)
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            assert client.cash_allocations() == {}
+
+    def test_allocated_cash_limits_puts(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = make_client()
+        positions = holdings(USD=50000)
+        mock_contract = MagicMock()
+        mock_contract.symbol = "AAPL250926P00190000"
+        client.get_option_contract = MagicMock(return_value=mock_contract)
+        client.submit_sell_order = MagicMock()
+
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            client.sell_covered_puts("AAPL", date(2025, 9, 26), 190.0, cash=25000.0)
+        client.submit_sell_order.assert_called_once_with("AAPL250926P00190000", 1)
+
+
+class TestPerTickerMargins:
+    def test_uses_ticker_margin(self):
+        from src.alpaca_client import AlpacaClient
+
+        client = make_client(
+            {"tickers": [{"ticker": "SPY", "put_option_margin": 0.1}, "AAPL"]}
+        )
+        client.have_option_contracts = MagicMock(return_value=False)
+        client.get_expiration_date = MagicMock(return_value=date(2025, 9, 26))
+        client.snapshot = MagicMock(prices={"AAPL": 200.0, "SPY": 200.0})
+        client.sell_covered_puts = MagicMock(return_value=None)
+        positions = holdings(USD=50000)
+
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            client.trade_options(client.settings.tickers[0], cash=25000.0)
+            client.trade_options(client.settings.tickers[1], cash=25000.0)
+
+        strikes = [c.args[2] for c in client.sell_covered_puts.call_args_list]
+        assert strikes == pytest.approx([180.0, 190.0])
+        assert all(c.args[3] == 25000.0 for c in client.sell_covered_puts.call_args_list)
+
+
+class TestGetOptionContract:
+    def test_selects_from_cached_chain(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _chain_response([200, 210, 205])
+        expiration = date(2025, 9, 26)
+        call = client.get_option_contract("AAPL", expiration, 206.0, ContractType.CALL)
+        put = client.get_option_contract("AAPL", expiration, 206.0, ContractType.CALL, "below")
+        assert (call.strike_price, put.strike_price) == (210.0, 205.0)
+        client.client.get_option_contracts.assert_called_once()
+
+    def test_no_strike_raises(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _chain_response([200, 210])
+        with pytest.raises(RuntimeError, match="No option contracts found"):
+            client.get_option_contract("AAPL", date(2025, 9, 26), 250.0, ContractType.CALL)
+
+
+def snapshot(bid: float, ask: float) -> MagicMock:
+    quote = MagicMock(bid_price=bid, ask_price=ask)
+    return MagicMock(latest_quote=quote, implied_volatility=None, greeks=None)
+
+
+class TestLiquidityFilter:
+    def test_skips_illiquid_strikes(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _chain_response([200, 205, 210])
+        client.data_client.get_option_snapshot.return_value = {
+            "AAPL250926C00200000": snapshot(4.0, 4.2),
+            "AAPL250926C00205000": snapshot(0.05, 0.5),  # wide
+            "AAPL250926C00210000": snapshot(1.0, 1.1),
+        }
+        liquidity = LiquidityFilter(max_spread=0.2)
+        contract = client.get_option_contract(
+            "AAPL", date(2025, 9, 26), 201.0, ContractType.CALL, "above", liquidity
+        )
+        assert contract.strike_price == 210.0
+        # the cached snapshots serve the next selection
+        client.get_option_contract(
+            "AAPL", date(2025, 9, 26), 201.0, ContractType.CALL, "below", liquidity
+        )
+        client.data_client.get_option_snapshot.assert_called_once()
+
+    def test_no_liquid_strike_raises(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _chain_response([200, 210])
+        client.data_client.get_option_snapshot.return_value = {}
+        with pytest.raises(RuntimeError, match="No liquid option contracts found"):
+            client.get_option_contract(
+                "AAPL",
+                date(2025, 9, 26),
+                201.0,
+                ContractType.CALL,
+                liquidity=LiquidityFilter(min_bid=0.1),
+            )
+
+    def test_inactive_filter_makes_no_request(self):
+        client = make_client()
+        client.client.get_option_contracts.return_value = _chain_response([200, 210])
+        client.get_option_contract(
+            "AAPL", date(2025, 9, 26), 201.0, ContractType.CALL, liquidity=LiquidityFilter()
+        )
+        client.data_client.get_option_snapshot.assert_not_called()
+
+
+class TestDeltaTargeting:
+    STRIKES = list(range(170, 235, 5))
+    VOLATILITY = 0.3
+
+    def _client(self, option_type: str, quoted: bool = True):
+        client = make_client()
+        expiration = date.today() + timedelta(days=14)
+        client.client.get_option_contracts.return_value = _chain_response(
+            self.STRIKES, option_type=option_type, expiration=expiration
+        )
+        client.snapshot = MagicMock(prices={"AAPL": 200.0})
+        strikes, call = np.array(self.STRIKES, float), option_type == "C"
+        prices = black_scholes(200.0, strikes, 14 / 365, self.VOLATILITY, 0.04, call)
+        response = client.client.get_option_contracts.return_value
+        symbols = [c.symbol for c in response.option_contracts]
+        snapshots = {s: snapshot(p - 0.02, p + 0.02) for s, p in zip(symbols, prices)}
+        client.data_client.get_option_snapshot.return_value = snapshots if quoted else {}
+        client.submit_sell_order = MagicMock()
+        return client, expiration
+
+    def _true_delta(self, strike: float, call: bool) -> float:
+        vol_sqrt_t = self.VOLATILITY * np.sqrt(14 / 365)
+        d1 = (np.log(200.0 / strike) + 0.04 * 14 / 365) / vol_sqrt_t + vol_sqrt_t / 2
+        return float(norm_cdf(np.array(d1))) - (0 if call else 1)
+
+    def test_call_strike_closest_to_target_delta(self):
+        from src.alpaca_client import AlpacaClient
+
+        client, expiration = self._client("C")
+        positions = holdings(AAPL=200)
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            client.sell_covered_calls("AAPL", expiration, 225.0, target_delta=0.2)
+        symbol = client.submit_sell_order.call_args.args[0]
+        strike = int(symbol[-8:]) / 1000
+        distances = {k: abs(self._true_delta(k, True) - 0.2) for k in self.STRIKES}
+        assert strike == min(distances, key=distances.get)
+        assert strike != 225.0
+
+    def test_put_quantity_uses_delta_strike(self):
+        from src.alpaca_client import AlpacaClient
+
+        client, expiration = self._client("P")
+        positions = holdings(USD=40000)
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            client.sell_covered_puts("AAPL", expiration, 100.0, target_delta=0.2)
+        symbol, qty = client.submit_sell_order.call_args.args
+        strike = int(symbol[-8:]) / 1000
+        assert abs(self._true_delta(strike, False)) == pytest.approx(0.2, abs=0.1)
+        assert qty == int(40000 / strike / 100)
+
+    def test_falls_back_to_margin_strike_without_quotes(self):
+        from src.alpaca_client import AlpacaClient
+
+        client, expiration = self._client("C", quoted=False)
+        positions = holdings(AAPL=200)
+        with patch.object(
+            AlpacaClient, "positions", new_callable=PropertyMock, return_value=positions
+        ):
+            client.sell_covered_calls("AAPL", expiration, 211.0, target_delta=0.2)
+        assert client.submit_sell_order.call_args.args[0].endswith("C00215000")
+
+
+class TestRestCallBudget:
+    """Counts the HTTP requests a real client makes against a local fake of the API."""
+
+    @staticmethod
+    def _client(server, tmp_path, **overrides):
+        from src.alpaca_client import AlpacaClient
+
+        env = AlpacaEnv(
+            api_key="fake", api_secret="fake", trading_url=server.url, data_url=server.url
+        )
+        settings = Settings(
+            **{
+                **SETTINGS_KWARGS,
+                "tickers": ["AAPL", "SPY"],
+                "stream_fills": False,
+                "cache_dir": str(tmp_path),
+                "rate_limit": UNLIMITED,
+                **overrides,
+            }
+        )
+        return AlpacaClient(env, settings)
+
+    @staticmethod
+    def _run_cycle(client, server) -> int:
+        from src.bot import OptionsBot
+
+        bot = OptionsBot.__new__(OptionsBot)
+        bot.settings = client.settings
+        bot.alpaca_client = client
+        bot.telegram_bot = MagicMock()
+        server.reset_requests()
+        bot.trade_options()
+        bot.telegram_bot.send_message.assert_not_called()  # no errors
+        return server.count()
+
+    def test_cycle_within_documented_bound(self, tmp_path):
+        from src.alpaca_client import max_rest_calls_per_cycle
+
+        positions = [position_payload("AAPL", 200, 200.0)]
+        with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as server:
+            client = self._client(server, tmp_path)
+            try:
+                cold_calls = self._run_cycle(client, server)
+                assert cold_calls <= max_rest_calls_per_cycle(2, cold=True)
+                # snapshot, calendar/chain/order/fill per ticker, refreshed snapshot
+                assert cold_calls == 3 + 2 * (1 + 1 + 2) + 3
+
+                client.refresh_snapshot()
+                warm_calls = self._run_cycle(client, server)
+                assert warm_calls <= max_rest_calls_per_cycle(2)
+                assert warm_calls == 3 + 2 * (1 + 1) + 3
+            finally:
+                client.close()
+
+    def test_unfilled_orders_are_polled_until_the_timeout(self, tmp_path):
+        from src.alpaca_client import FILL_POLL_INTERVAL, FILL_TIMEOUT, max_rest_calls_per_cycle
+
+        class ThreadClock:
+            """`time` of the client whose sleeps only advance the sleeping thread's clock."""
+
+            def __init__(self) -> None:
+                self.local = threading.local()
+
+            def time(self) -> float:
+                return time.time() + getattr(self.local, "slept", 0.0)
+
+            def sleep(self, seconds: float) -> None:
+                self.local.slept = getattr(self.local, "slept", 0.0) + seconds
+
+        positions = [position_payload("AAPL", 200, 200.0)]
+        with FakeAlpacaServer(
+            {"AAPL": 200.0, "SPY": 500.0}, positions, fill_orders=False
+        ) as server:
+            client = self._client(server, tmp_path)
+            try:
+                with patch("src.alpaca_client.time", ThreadClock()):
+                    calls = self._run_cycle(client, server)
+            finally:
+                client.close()
+        polls = FILL_TIMEOUT // FILL_POLL_INTERVAL + 1  # at 0, 2, ..., 60 seconds
+        assert server.count("/v2/orders/") == 2 * polls
+        # snapshot, calendar/chain/order/polls per ticker, no refresh without a trade
+        assert calls == 3 + 2 * (2 + 1 + polls)
+        assert calls <= max_rest_calls_per_cycle(2, cold=True)
+
+    def test_delta_targeting_adds_snapshots_requests(self, tmp_path):
+        positions = [position_payload("AAPL", 200, 200.0)]
+        with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as server:
+            client = self._client(server, tmp_path, target_delta=0.2)
+            try:
+                # a snapshots request per 100 contracts: 81 in the AAPL chain, 201 in SPY's
+                assert self._run_cycle(client, server) == 3 + 2 * (1 + 1 + 2) + 3 + (1 + 3)
+                assert server.count("/v1beta1/options/snapshots") == 1 + 3
+            finally:
+                client.close()
+
+    def test_raw_data_sells_the_same_contracts(self, tmp_path):
+        positions = [position_payload("AAPL", 200, 200.0)]
+        sold = {}
+        for raw_data in (False, True):
+            with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as server:
+                client = self._client(
+                    server, tmp_path / str(raw_data), target_delta=0.2, raw_data=raw_data
+                )
+                try:
+                    self._run_cycle(client, server)
+                finally:
+                    client.close()
+                sold[raw_data] = sorted(o["symbol"] for o in server.orders.values())
+        assert len(sold[True]) == 2
+        assert sold[True] == sold[False]
+
+    def test_warm_start_skips_calendar_and_chain_queries(self, tmp_path):
+        from src.alpaca_client import AlpacaClient
+
+        positions = [position_payload("AAPL", 200, 200.0)]
+        with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as server:
+            client = self._client(server, tmp_path)
+            try:
+                self._run_cycle(client, server)
+                client.save_state()
+            finally:
+                client.close()
+            with open(client.state_path) as f:
+                state = json.load(f)
+            state["snapshot"]["fetched_at"] -= 3600  # restarted an hour later
+            with open(client.state_path, "w") as f:
+                json.dump(state, f)
+
+            server.reset_requests()
+            client = self._client(server, tmp_path)
+            try:
+                restored = AlpacaClient.snapshot.peek(client)
+                assert restored is not None and restored.prices == {"AAPL": 200.0, "SPY": 500.0}
+                AlpacaClient.snapshot.fresh(client)  # waits for the background refresh
+                # ticker validation and the background refresh, no calendar or chain queries
+                assert server.count() == 1 + 3
+                # order submission and fill per ticker, refreshed snapshot
+                assert self._run_cycle(client, server) == 2 * 2 + 3
+                assert server.count("/v2/options/contracts") == 0
+            finally:
+                client.close()
+
+    def test_unusable_state_is_ignored(self, tmp_path):
+        from src.alpaca_client import MAX_STATE_AGE, AlpacaClient
+
+        with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}) as server:
+            client = self._client(server, tmp_path)
+            try:
+                client.snapshot  # noqa: B018
+                client.save_state()
+                with open(client.state_path) as f:
+                    state = json.load(f)
+                state["snapshot"]["fetched_at"] -= MAX_STATE_AGE
+                with open(client.state_path, "w") as f:
+                    json.dump(state, f)
+                assert not client.restore_state()
+
+                state["snapshot"]["fetched_at"] += MAX_STATE_AGE
+                del state["snapshot"]["prices"]["SPY"]  # a ticker added since
+                with open(client.state_path, "w") as f:
+                    json.dump(state, f)
+                assert not client.restore_state()
+
+                with open(client.state_path, "w") as f:
+                    f.write("{")
+                assert not client.restore_state()
+                assert AlpacaClient.snapshot.stats(client)["stale_hits"] == 0
+            finally:
+                client.close()
+
+    def test_no_trade_cycle_is_one_snapshot(self, tmp_path):
+        positions = [
+            position_payload("AAPL250926C00210000", -1, 2.5),
+            position_payload("SPY250926P00450000", -1, 3.5),
+        ]
+        with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as server:
+            client = self._client(server, tmp_path)
+            try:
+                assert self._run_cycle(client, server) == 3 + 2  # calendars warmed once a day
+                client.refresh_snapshot()
+                assert self._run_cycle(client, server) == 3
+            finally:
+                client.close()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from alpaca.common.exceptions import APIError
+from alpaca.data.requests import OptionSnapshotRequest, StockLatestTradeRequest
+from alpaca.trading.enums import ContractType, OrderSide, TimeInForce
+from alpaca.trading.models import TradeAccount
+from alpaca.trading.requests import GetOptionContractsRequest, MarketOrderRequest
+
+from src.async_client import AsyncAlpacaClient, BlockingAlpacaClient, _query_params
+from src.metrics import METRICS
+from src.rate_limit import RetryPolicy, TokenBucket, request_deadline
+from tests.fakes import FakeAlpacaServer, position_payload
+
+
+@pytest.fixture
+def server():
+    positions = [position_payload("AAPL", 100, 200.0)]
+    with FakeAlpacaServer({"AAPL": 200.0, "SPY": 500.0}, positions) as s:
+        yield s
+
+
+@pytest.fixture
+def client(server):
+    client = BlockingAlpacaClient(
+        AsyncAlpacaClient("fake", "fake", trading_url=server.url, data_url=server.url)
+    )
+    yield client
+    client.close()
+
+
+def test_query_params():
+    assert _query_params(
+        {"underlying_symbols": ["AAPL", "SPY"], "type": ContractType.PUT, "limit": 5}
+    ) == {"underlying_symbols": "AAPL,SPY", "type": "put", "limit": "5"}
+
+
+def test_default_urls():
+    paper, live = AsyncAlpacaClient("k", "s"), AsyncAlpacaClient("k", "s", paper=False)
+    assert f"{paper.trading_url}/v2" == "https://paper-api.alpaca.markets/v2"
+    assert f"{live.trading_url}/v2" == "https://api.alpaca.markets/v2"
+    assert f"{paper.data_url}/v2" == "https://data.alpaca.markets/v2"
+
+
+class TestBlockingAlpacaClient:
+    def test_returns_alpaca_models(self, client):
+        assert isinstance(client.get_account(), TradeAccount)
+        assert [p.symbol for p in client.get_all_positions()] == ["AAPL"]
+        trades = client.get_stock_latest_trade(
+            StockLatestTradeRequest(symbol_or_symbols=["AAPL", "SPY"])
+        )
+        assert {s: t.price for s, t in trades.items()} == {"AAPL": 200.0, "SPY": 500.0}
+
+    def test_option_contracts(self, client):
+        response = client.get_option_contracts(
+            GetOptionContractsRequest(underlying_symbols=["AAPL"], type=ContractType.PUT, limit=5)
+        )
+        assert len(response.option_contracts) == 5
+        assert {c.type for c in response.option_contracts} == {ContractType.PUT}
+        assert response.next_page_token
+
+    def test_option_snapshots_in_batches(self, client, server):
+        symbols = [c["symbol"] for c in server.contracts({"underlying_symbols": "AAPL"})][:250]
+        snapshots = client.get_option_snapshot(
+            OptionSnapshotRequest(symbol_or_symbols=symbols + ["SPY261023C00999000"])
+        )
+        assert sorted(snapshots) == sorted(symbols + ["SPY261023C00999000"])
+        quotes = [s.latest_quote for s in snapshots.values()]
+        assert all(q.ask_price > q.bid_price for q in quotes)
+        assert server.count("/v1beta1/options/snapshots") == 3
+
+    def test_order_roundtrip(self, client):
+        order = client.submit_order(
+            MarketOrderRequest(
+                symbol="AAPL261023C00210000",
+                qty=1,
+                side=OrderSide.SELL,
+                time_in_force=TimeInForce.DAY,
+            )
+        )
+        assert float(client.get_order_by_id(order.id).filled_qty) == 1
+
+    def test_api_error(self, client):
+        with pytest.raises(APIError):
+            client.get_order_by_id("does-not-exist")
+
+    def test_calls_are_instrumented(self, client):
+        before = METRICS.snapshot()["calls"].get("alpaca.get_order_by_id", {"errors": 0})
+        with pytest.raises(APIError):
+            client.get_order_by_id("does-not-exist")
+        after = METRICS.snapshot()["calls"]["alpaca.get_order_by_id"]
+        assert after["errors"] == before["errors"] + 1
+
+    def test_rejects_non_coroutine_attributes(self, client):
+        with pytest.raises(AttributeError):
+            client.trading_url  # noqa: B018
+
+    def test_shared_across_threads(self, client, server):
+        server.latency = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get_account()))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 5
+        assert server.peak_in_flight > 1  # overlapped, not serialized
+
+
+class TestRetries:
+    @pytest.fixture
+    def client(self, server):
+        client = BlockingAlpacaClient(
+            AsyncAlpacaClient(
+                "fake",
+                "fake",
+                trading_url=server.url,
+                data_url=server.url,
+                retry=RetryPolicy(max_retries=3, backoff=0.01),
+            )
+        )
+        yield client
+        client.close()
+
+    def _sell(self, client):
+        return client.submit_order(
+            MarketOrderRequest(
+                symbol="AAPL261023C00210000",
+                qty=1,
+                side=OrderSide.SELL,
+                time_in_force=TimeInForce.DAY,
+            )
+        )
+
+    def test_transient_errors_are_retried(self, client, server):
+        server.fail("/v2/account", 503, 429)
+        assert isinstance(client.get_account(), TradeAccount)
+        assert server.count("/v2/account") == 3
+
+    def test_gives_up_after_max_retries(self, client, server):
+        server.fail("/v2/account", 503, 503, 503, 503)
+        with pytest.raises(APIError):
+            client.get_account()
+        assert server.count("/v2/account") == 4
+
+    def test_client_errors_are_not_retried(self, client, server):
+        with pytest.raises(APIError):
+            client.get_order_by_id("does-not-exist")
+        assert server.count("/v2/orders/") == 1
+
+    def test_no_retries_past_the_deadline(self, client, server):
+        server.fail("/v2/account", 503)
+        with patch("src.rate_limit.RetryPolicy.delay", return_value=5.0):
+            with request_deadline(1), pytest.raises(APIError):
+                client.get_account()
+        assert server.count("/v2/account") == 1
+
+    def test_rate_limited_order_is_resubmitted(self, client, server):
+        server.fail("/v2/orders", 429)
+        order = self._sell(client)
+        assert list(server.orders) == [str(order.id)]
+
+    def test_lost_order_response_is_not_resubmitted(self, client, server):
+        # accepted, but the response failed: the retry finds the order by its client id
+        server.fail("/v2/orders", 502, processed=True)
+        order = self._sell(client)
+        assert list(server.orders) == [str(order.id)]
+        assert server.count("/v2/orders") == 2  # the submission and the lookup
+        assert server.count("/v2/orders:by_client_order_id") == 1
+
+    def test_unprocessed_order_is_resubmitted_once(self, client, server):
+        server.fail("/v2/orders", 503)
+        order = self._sell(client)
+        assert list(server.orders) == [str(order.id)]
+        assert server.requests.count(("POST", "/v2/orders")) == 2
+
+    def test_shared_limiter(self, server):
+        limiter = TokenBucket(rate=20, capacity=1)
+        clients = [
+            BlockingAlpacaClient(
+                AsyncAlpacaClient("fake", "fake", trading_url=server.url, limiter=limiter)
+            )
+            for _ in range(2)
+        ]
+        try:
+            start = time.monotonic()
+            threads = [
+                threading.Thread(target=lambda c=c: [c.get_account() for _ in range(2)])
+                for c in clients
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert time.monotonic() - start >= 3 / 20  # 4 requests, 1 at once, 20 a second
+        finally:
+            for c in clients:
+                c.close()
+
+
+def test_raw_data_bulk_endpoints(server):
+    client = BlockingAlpacaClient(
+        AsyncAlpacaClient(
+            "fake", "fake", trading_url=server.url, data_url=server.url, raw_data=True
+        )
+    )
+    try:
+        assert isinstance(client.get_account(), TradeAccount)
+        assert [p["symbol"] for p in client.get_all_positions()] == ["AAPL"]
+        response = client.get_option_contracts(
+            GetOptionContractsRequest(underlying_symbols=["AAPL"], type=ContractType.PUT, limit=5)
+        )
+        assert len(response["option_contracts"]) == 5
+        symbol = response["option_contracts"][0]["symbol"]
+        snapshots = client.get_option_snapshot(OptionSnapshotRequest(symbol_or_symbols=[symbol]))
+        assert snapshots[symbol]["latestQuote"]["ap"] > snapshots[symbol]["latestQuote"]["bp"]
+    finally:
+        client.close()
+
+
+def test_gather_overlaps_requests(server):
+    server.latency = 0.2
+    aclient = AsyncAlpacaClient("fake", "fake", trading_url=server.url, data_url=server.url)
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                aclient.get_account(),
+                aclient.get_all_positions(),
+                aclient.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols="SPY")),
+            )
+        finally:
+            await aclient.aclose()
+
+    asyncio.run(main())
+    assert server.count() == 3
+    assert server.peak_in_flight > 1
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pytest
+
+from src.backtest import (
+    ExpiryCycles,
+    PriceSeries,
+    listed_strike,
+    margin_grid,
+    margin_range,
+    run_backtest,
+)
+
+
+def weekly_prices(*weeks: tuple[float, float]) -> PriceSeries:
+    """Five bars per week, opening every day at the week's entry price and closing at its
+    expiry price."""
+    dates = np.busday_offset(np.datetime64("2024-01-01"), np.arange(5 * len(weeks)))
+    entry, expiry = np.array(weeks, dtype=float).T
+    return PriceSeries(dates=dates, close=np.repeat(expiry, 5), open=np.repeat(entry, 5))
+
+
+class TestListedStrike:
+    @pytest.mark.parametrize(
+        "selection, expected", [("above", 103.0), ("below", 102.0), ("nearest", 102.0)]
+    )
+    def test_snaps_like_option_chain(self, selection, expected):
+        assert listed_strike(np.array(102.4), 1.0, selection) == expected
+
+
+class TestExpiryCycles:
+    def test_weekly_groups_monday_to_friday(self):
+        dates = np.array(
+            ["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-10", "2024-01-12"],
+            dtype="datetime64[D]",
+        )
+        cycles = ExpiryCycles.from_prices(PriceSeries(dates=dates, close=np.arange(1.0, 6.0)))
+        assert cycles.entry.tolist() == [1.0, 3.0]
+        assert cycles.expiry.tolist() == [2.0, 5.0]
+        assert cycles.expiry_dates.astype(str).tolist() == ["2024-01-05", "2024-01-12"]
+
+    def test_target_dte_picks_nearest_friday(self):
+        dates = np.busday_offset(np.datetime64("2024-01-01"), np.arange(40))  # from a Monday
+        cycles = ExpiryCycles.from_prices(
+            PriceSeries(dates=dates, close=np.arange(40.0)), target_dte=14
+        )
+        # Mon 01-01 + 14 = Mon 01-15, closest Friday 01-12; next from Mon 01-15 -> 01-26
+        assert cycles.entry_dates.astype(str).tolist()[:2] == ["2024-01-01", "2024-01-15"]
+        assert cycles.expiry_dates.astype(str).tolist()[:2] == ["2024-01-12", "2024-01-26"]
+        assert cycles.expiry_dates[-1] <= dates[-1]
+
+
+class TestRunBacktest:
+    def test_flat_prices_collect_put_premiums(self):
+        flat = (100, 100)
+        result = run_backtest(weekly_prices(flat, flat, flat), [0.05], [0.05], initial_cash=10_000)
+        assert result.assignments[0] == 0
+        assert result.premiums[0] > 0
+        assert result.final_equity[0] == pytest.approx(10_000 + result.premiums[0])
+
+    def test_wheel_assigns_then_calls_away(self):
+        # put at 95 assigned in week one, call at 95 called away in week two
+        result = run_backtest(
+            weekly_prices((100, 90), (90, 100), (100, 100)),
+            [0.05],
+            [0.05],
+            initial_cash=10_000,
+            volatility=1e-6,
+            rate=0,
+        )
+        assert result.assignments[0] == 2
+        # premiums are ~0 at zero volatility
+        assert result.equity[:, 0].tolist() == pytest.approx([9_500, 10_000, 10_000], abs=1)
+
+    def test_configs_are_independent(self):
+        prices = PriceSeries.synthetic(years=2, seed=1)
+        calls, puts = margin_grid(np.array([0.02, 0.1]), np.array([0.03, 0.08]))
+        batched = run_backtest(prices, calls, puts)
+        for i in range(len(calls)):
+            single = run_backtest(prices, calls[i : i + 1], puts[i : i + 1])
+            np.testing.assert_allclose(batched.equity[:, i], single.equity[:, 0])
+
+    def test_rejects_misaligned_margins(self):
+        with pytest.raises(ValueError):
+            run_backtest(weekly_prices((100, 100)), [0.05, 0.1], [0.05])
+
+    def test_twenty_years_by_thousand_configs(self):
+        prices = PriceSeries.synthetic(years=20)
+        calls, puts = margin_grid(np.linspace(0, 0.2, 40), np.linspace(0, 0.2, 25))
+        result = run_backtest(prices, calls, puts)
+        assert result.equity.shape == (len(result.expiry_dates), 1000)
+        assert np.isfinite(result.cagr).all()
+
+    @pytest.mark.timing
+    def test_twenty_years_by_thousand_configs_in_seconds(self):
+        prices = PriceSeries.synthetic(years=20)
+        calls, puts = margin_grid(np.linspace(0, 0.2, 40), np.linspace(0, 0.2, 25))
+        start = time.perf_counter()
+        run_backtest(prices, calls, puts)
+        assert time.perf_counter() - start < 5
+
+
+def test_margin_range():
+    assert margin_range("0.05").tolist() == [0.05]
+    np.testing.assert_allclose(margin_range("0:0.2:5"), [0, 0.05, 0.1, 0.15, 0.2])
+    with pytest.raises(argparse.ArgumentTypeError):
+        margin_range("0:0.2")
+
+
+def test_from_csv(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("date,open,close\n2024-01-03,101,102\n2024-01-02,99,100\n")
+    prices = PriceSeries.from_csv(str(path))
+    assert prices.dates.astype(str).tolist() == ["2024-01-02", "2024-01-03"]
+    assert prices.open.tolist() == [99.0, 101.0]
+    assert prices.close.tolist() == [100.0, 102.0]
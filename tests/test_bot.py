@@ -2,17 +2,32 @@ from __future__ import annotations
 
 import json
 import logging
-from unittest.mock import MagicMock
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from apscheduler.events import EVENT_JOB_MISSED
 
 from src.bot import OptionsBot
+from src.metrics import METRICS
+from src.portfolio import PositionRecord, Positions
+from src.rate_limit import time_left
+from src.schemas import Settings, TickerSettings
 
 
-def make_bot(currency: str = "USD", positions: dict | None = None):
+def make_bot(currency: str = "USD", positions: list | None = None, tickers: list | None = None):
     bot = OptionsBot.__new__(OptionsBot)
+    bot.settings = Settings(
+        tickers=tickers or ["AAPL"],
+        call_option_margin=0.05,
+        put_option_margin=0.05,
+        trade_options_schedule="59 9 * * 1-5",
+        check_value_schedule="0 10-16 * * 1-5",
+    )
     bot.telegram_bot = MagicMock()
     bot.alpaca_client = MagicMock()
-    bot.alpaca_client.account.currency = currency
-    bot.alpaca_client.positions = positions or {}
+    bot.alpaca_client.snapshot.currency = currency
+    bot.alpaca_client.snapshot.holdings = Positions(positions or [])
     return bot
 
 
@@ -52,12 +67,12 @@ class TestReportTrade:
 
 
 class TestReportPositions:
-    def _positions(self) -> dict:
-        return {
-            "USD": {"qty": "148677.06", "price": "1.00"},
-            "SOXL": {"qty": "0", "price": "76.59"},
-            "SOXL260417P00073000": {"qty": "-20", "price": "2.62"},
-        }
+    def _positions(self) -> list:
+        return [
+            PositionRecord("USD", 148677.06, 1.0, "cash"),
+            PositionRecord("SOXL", 0, 76.59),
+            PositionRecord("SOXL260417P00073000", -20, 2.62, "us_option"),
+        ]
 
     def test_telegram_message_is_pretty_multiline(self):
         bot = make_bot(positions=self._positions())
@@ -72,11 +87,16 @@ class TestReportPositions:
         )
 
     def test_log_is_json(self, caplog):
-        positions = self._positions()
-        bot = make_bot(positions=positions)
+        bot = make_bot(positions=self._positions())
         with caplog.at_level(logging.INFO):
             bot.report_positions(telegram=False)
-        assert json.loads(caplog.records[-1].message) == {"positions": positions}
+        assert json.loads(caplog.records[-1].message) == {
+            "positions": {
+                "USD": {"qty": "148677.06", "price": "1"},
+                "SOXL": {"qty": "0", "price": "76.59"},
+                "SOXL260417P00073000": {"qty": "-20", "price": "2.62"},
+            }
+        }
 
     def test_no_telegram_when_disabled(self):
         bot = make_bot(positions=self._positions())
@@ -86,8 +106,237 @@ class TestReportPositions:
     def test_non_usd_currency_treated_as_cash(self):
         bot = make_bot(
             currency="EUR",
-            positions={"EUR": {"qty": "1000.00", "price": "1.00"}},
+            positions=[PositionRecord("EUR", 1000, 1.0, "cash")],
         )
         bot.report_positions(telegram=True)
         msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
         assert "EUR: $1,000.00," in msg
+
+
+class TestStartup:
+    def test_telegram_connects_while_tickers_are_validated(self):
+        calls = MagicMock()
+        with (
+            patch("src.bot.TelegramBot", return_value=calls.telegram),
+            patch("src.bot.AlpacaClient", side_effect=lambda *a, **kw: calls.alpaca_client()),
+        ):
+            settings = make_bot().settings.model_copy(update={"journal_path": None})
+            OptionsBot(settings, MagicMock(), MagicMock())
+        assert [name for name, *_ in calls.mock_calls] == [
+            "telegram.connect",
+            "alpaca_client",
+            "telegram.send_message",
+        ]
+
+    def test_close_saves_state(self):
+        bot = make_bot()
+        bot.close()
+        bot.alpaca_client.save_state.assert_called_once()
+
+
+class TestJournal:
+    def test_reports_are_journaled(self):
+        bot = make_bot(positions=[PositionRecord("USD", 1000, 1.0, "cash")])
+        bot.journal = MagicMock()
+        bot.alpaca_client.portfolio_value = 1000.0
+        trade = TestReportTrade()._trade("sell")
+        bot.report_trade(trade)
+        bot.report_positions()
+        bot.report_value()
+        bot.journal.record_trade.assert_called_once_with(trade)
+        bot.journal.record_positions.assert_called_once_with(
+            {"USD": {"qty": "1000", "price": "1"}}
+        )
+        bot.journal.record_value.assert_called_once_with(1000.0)
+
+
+class TestTradeOptions:
+    def test_runs_every_ticker_and_reports_once(self):
+        bot = make_bot(tickers=["AAPL", "SPY", "MSFT"])
+        bot.alpaca_client.cash_allocations.return_value = {"SPY": 1000.0}
+        bot.alpaca_client.trade_options.side_effect = lambda t, cash: (
+            None if t.ticker == "MSFT" else {"symbol": t.ticker, "cash": cash}
+        )
+        bot.report_trade = MagicMock()
+        bot.report_positions = MagicMock()
+        bot.report_value = MagicMock()
+
+        bot.trade_options()
+
+        traded = sorted(c.args[0]["symbol"] for c in bot.report_trade.call_args_list)
+        assert traded == ["AAPL", "SPY"]
+        bot.alpaca_client.cash_allocations.assert_called_once()
+        bot.alpaca_client.refresh_snapshot.assert_called_once()
+        bot.report_positions.assert_called_once()
+        bot.report_value.assert_called_once()
+
+    def test_cycles_run_concurrently(self):
+        import threading
+
+        barrier = threading.Barrier(3, timeout=5)
+        bot = make_bot(tickers=["AAPL", "SPY", "MSFT"])
+        bot.alpaca_client.cash_allocations.return_value = {}
+        bot.alpaca_client.trade_options.side_effect = lambda t, cash: barrier.wait() and None
+        bot.trade_options()  # would time out on the barrier if run sequentially
+        assert bot.alpaca_client.trade_options.call_count == 3
+
+    def test_ticker_failure_does_not_abort_others(self):
+        bot = make_bot(tickers=["AAPL", "SPY"])
+        bot.alpaca_client.cash_allocations.return_value = {}
+
+        def trade(t, cash):
+            if t.ticker == "AAPL":
+                raise RuntimeError("boom")
+            return {"symbol": t.ticker}
+
+        bot.alpaca_client.trade_options.side_effect = trade
+        bot.report_trade = MagicMock()
+        bot.report_positions = MagicMock()
+        bot.report_value = MagicMock()
+
+        bot.trade_options()
+
+        bot.report_trade.assert_called_once()
+        msg = bot.telegram_bot.send_message.call_args_list[0].kwargs["msg"]
+        assert "AAPL" in msg and "boom" in msg
+
+
+class TestJobMetrics:
+    def test_failed_job_is_counted(self):
+        bot = make_bot()
+        bot.trade_options = MagicMock(side_effect=RuntimeError("boom"))
+        before = METRICS.snapshot()["calls"].get("job.trade_options", {"calls": 0, "errors": 0})
+        bot.run_trade_options()
+        after = METRICS.snapshot()["calls"]["job.trade_options"]
+        assert after["calls"] == before["calls"] + 1
+        assert after["errors"] == before["errors"] + 1
+
+
+class TestJobLatencyBudget:
+    def _bot(self, budget: float):
+        bot = make_bot()
+        bot.settings.scheduler.check_value.latency_budget = budget
+        bot.report_value = MagicMock(side_effect=lambda telegram: time.sleep(0.05))
+        return bot
+
+    def test_slow_job_is_reported(self):
+        bot = self._bot(budget=0.01)
+        bot.run_check_value()
+        msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
+        assert msg.startswith("⚠️ check_value took 0.") and "over its 0.01s budget" in msg
+
+    def test_job_within_budget_is_quiet(self):
+        bot = self._bot(budget=5)
+        bot.run_check_value()
+        bot.telegram_bot.send_message.assert_not_called()
+
+    def test_trade_cycles_retry_within_the_budget(self):
+        bot = make_bot(tickers=["AAPL", "SPY"])
+        bot.alpaca_client.cash_allocations.return_value = {}
+        time_lefts = []
+        bot.alpaca_client.trade_options.side_effect = lambda *args: time_lefts.append(time_left())
+        bot.run_trade_options()
+        assert len(time_lefts) == 2
+        assert all(110 < t <= 120 for t in time_lefts)
+
+    def test_skipped_run_is_reported(self):
+        bot = make_bot()
+        bot._on_job_skipped(MagicMock(code=EVENT_JOB_MISSED, job_id="check_value"))
+        msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
+        assert msg == "⚠️ Skipped a run of check_value: missed its start time"
+
+
+class TestApplySettings:
+    def _bot(self):
+        bot = make_bot()
+        bot.scheduler = MagicMock()
+        return bot
+
+    def _edit(self, bot, **changes):
+        return bot.settings.model_copy(update=changes)
+
+    def test_reschedules_changed_jobs(self):
+        bot = self._bot()
+        bot.apply_settings(self._edit(bot, check_value_schedule="*/5 10-16 * * 1-5"))
+        [call] = bot.scheduler.reschedule_job.call_args_list
+        assert call.args == ("check_value",)
+        assert "minute='*/5'" in str(call.kwargs["trigger"])
+        bot.scheduler.modify_job.assert_not_called()
+        assert bot.settings.check_value_schedule == "*/5 10-16 * * 1-5"
+
+    def test_new_timezone_reschedules_every_job(self):
+        bot = self._bot()
+        bot.apply_settings(self._edit(bot, timezone="Europe/Berlin"))
+        jobs = [c.args[0] for c in bot.scheduler.reschedule_job.call_args_list]
+        assert jobs == ["trade_options", "check_value"]
+
+    def test_job_options_are_modified(self):
+        bot = self._bot()
+        scheduler = bot.settings.scheduler.model_copy(deep=True)
+        scheduler.trade_options.misfire_grace_time = 30
+        bot.apply_settings(self._edit(bot, scheduler=scheduler))
+        bot.scheduler.modify_job.assert_called_once_with(
+            "trade_options",
+            name="trade_options",
+            executor="trade_options",
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=30,
+        )
+
+    def test_max_instances_of_per_job_pools_are_deferred(self):
+        bot = self._bot()
+        scheduler = bot.settings.scheduler.model_copy(deep=True)
+        scheduler.trade_options.max_instances = 3
+        scheduler.trade_options.misfire_grace_time = 30
+        bot.apply_settings(self._edit(bot, scheduler=scheduler))
+        assert bot.settings.scheduler.trade_options.max_instances == 1
+        assert bot.scheduler.modify_job.call_args.kwargs["max_instances"] == 1
+        msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
+        assert msg == (
+            "🔧 settings reloaded, applied scheduler; "
+            "restart to apply scheduler.trade_options.max_instances"
+        )
+
+    def test_max_instances_of_the_shared_pool_are_applied(self):
+        bot = self._bot()
+        bot.settings = self._edit(
+            bot, scheduler=bot.settings.scheduler.model_copy(update={"executors": "shared"})
+        )
+        scheduler = bot.settings.scheduler.model_copy(deep=True)
+        scheduler.check_value.max_instances = 2
+        bot.apply_settings(self._edit(bot, scheduler=scheduler))
+        assert bot.scheduler.modify_job.call_args.kwargs["max_instances"] == 2
+
+    def test_tickers_swapped_in_place(self):
+        bot = self._bot()
+        tickers = [t.model_copy(update={"call_option_margin": 0.1}) for t in bot.settings.tickers]
+        settings = self._edit(bot, tickers=tickers)
+        bot.apply_settings(settings)
+        bot.alpaca_client.apply_settings.assert_called_once_with(bot.settings)
+        assert bot.settings.tickers[0].call_option_margin == 0.1
+        bot.scheduler.reschedule_job.assert_not_called()
+        msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
+        assert msg == "🔧 settings reloaded, applied tickers"
+
+    def test_restart_settings_are_deferred(self):
+        bot = self._bot()
+        scheduler = bot.settings.scheduler.model_copy(update={"executors": "shared"})
+        bot.apply_settings(self._edit(bot, raw_data=False, max_workers=2, scheduler=scheduler))
+        assert (bot.settings.raw_data, bot.settings.max_workers) == (True, 2)
+        assert bot.settings.scheduler.executors == "per_job"
+        msg = bot.telegram_bot.send_message.call_args.kwargs["msg"]
+        assert msg == (
+            "🔧 settings reloaded, applied max_workers; "
+            "restart to apply raw_data, scheduler.executors"
+        )
+
+    def test_unknown_ticker_changes_nothing(self):
+        bot = self._bot()
+        original = bot.settings
+        nope = {**bot.settings.tickers[0].model_dump(), "ticker": "NOPE"}
+        bot.alpaca_client.apply_settings.side_effect = RuntimeError("no price for `NOPE`")
+        with pytest.raises(RuntimeError):
+            bot.apply_settings(self._edit(bot, tickers=[TickerSettings(**nope)]))
+        assert bot.settings is original
+        bot.scheduler.reschedule_job.assert_not_called()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from alpaca.data.requests import StockLatestTradeRequest
+from alpaca.trading.enums import OrderSide, TimeInForce
+from alpaca.trading.requests import MarketOrderRequest
+
+from src.async_client import AsyncAlpacaClient, BlockingAlpacaClient
+from src.cassette import (
+    INSTANT,
+    REAL_TIME,
+    Cassette,
+    CassetteMiss,
+    CassetteRecorder,
+    Interaction,
+    parse_speed,
+    request_key,
+)
+from src.metrics import METRICS
+from src.schemas import TelegramEnv
+from src.telegram_bot import TelegramBot
+from tests.fakes import FakeAlpacaServer, position_payload
+
+
+def session(client: BlockingAlpacaClient) -> list:
+    order = client.submit_order(
+        MarketOrderRequest(
+            symbol="AAPL261023C00210000", qty=1, side=OrderSide.SELL, time_in_force=TimeInForce.DAY
+        )
+    )
+    trades = client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=["AAPL"]))
+    return [
+        float(client.get_account().cash),
+        [p.symbol for p in client.get_all_positions()],
+        trades["AAPL"].price,
+        str(order.id),
+        client.get_order_by_id(order.id).status,
+    ]
+
+
+def interaction(url: str, content: dict, duration: float = 0.0) -> Interaction:
+    return Interaction(
+        at=0.0,
+        duration=duration,
+        method="POST",
+        url=url,
+        body="",
+        status=200,
+        headers={"content-type": "application/json"},
+        content=json.dumps(content).encode(),
+    )
+
+
+def write_cassette(path, *interactions: Interaction) -> None:
+    recorder = CassetteRecorder(str(path))
+    for i in interactions:
+        recorder.add(i)
+    recorder.close()
+
+
+def post(url: str, body: dict) -> httpx.Request:
+    return httpx.Request("POST", url, json=body)
+
+
+class TestRecordAndReplay:
+    def test_alpaca_session_replays_offline(self, tmp_path):
+        path = str(tmp_path / "session.jsonl.gz")
+        recorder = CassetteRecorder(path)
+        with FakeAlpacaServer({"AAPL": 200.0}, [position_payload("AAPL", 100, 200.0)]) as server:
+            client = BlockingAlpacaClient(
+                AsyncAlpacaClient(
+                    "key",
+                    "secret",
+                    trading_url=server.url,
+                    data_url=server.url,
+                    wrap_transport=recorder.transport,
+                )
+            )
+            recorded = session(client)
+            client.close()
+        recorder.close()
+        assert recorder.recorded == 5
+        with open(path, "rb") as f:
+            assert b"secret" not in f.read()
+
+        cassette = Cassette.load(path)
+        replayer = cassette.replayer(INSTANT)
+        client = BlockingAlpacaClient(  # the live API's URLs, the server is gone
+            AsyncAlpacaClient("key", "secret", wrap_transport=replayer.transport)
+        )
+        try:
+            assert session(client) == recorded
+        finally:
+            client.close()
+        assert (replayer.served, replayer.remaining) == (5, 0)
+
+    def test_telegram_replay(self, tmp_path):
+        path = tmp_path / "telegram.jsonl.gz"
+        api = "https://api.telegram.org/bot<token>"
+        me = {"id": 1, "is_bot": True, "first_name": "bot", "username": "options_bot"}
+        message = {"message_id": 7, "date": 0, "chat": {"id": 123, "type": "private"}}
+        write_cassette(
+            path,
+            interaction(f"{api}/getMe", {"ok": True, "result": me}),
+            interaction(f"{api}/sendMessage", {"ok": True, "result": message}),
+        )
+        replayer = Cassette.load(str(path)).replayer(INSTANT)
+        METRICS.reset()
+        bot = TelegramBot(
+            TelegramEnv(bot_token="123:abc", chat_id="123"),
+            coalesce_window=0,
+            wrap_transport=replayer.transport,
+        )
+        bot.send_message("hello")
+        assert bot.flush(timeout=5)
+        bot.close(timeout=5)
+        assert (replayer.served, replayer.remaining) == (2, 0)
+        assert METRICS.snapshot()["calls"]["telegram.send_message"]["errors"] == 0
+
+    def test_miss_raises(self, tmp_path):
+        path = tmp_path / "empty.jsonl.gz"
+        write_cassette(path)
+        replayer = Cassette.load(str(path)).replayer(INSTANT)
+        with pytest.raises(CassetteMiss, match="POST https://example.com/v2/orders"):
+            replayer.next(post("https://example.com/v2/orders", {"qty": "1"}))
+
+
+class TestRequestKey:
+    def test_drops_the_telegram_token(self):
+        _, url, _ = request_key(post("https://api.telegram.org/bot123:abc/sendMessage", {}))
+        assert url == "https://api.telegram.org/bot<token>/sendMessage"
+
+    def test_ignores_client_order_ids(self):
+        first = post("https://x/v2/orders", {"qty": "1", "client_order_id": "a"})
+        second = post("https://x/v2/orders", {"client_order_id": "b", "qty": "1"})
+        assert request_key(first) == request_key(second)
+        assert request_key(first) != request_key(post("https://x/v2/orders", {"qty": "2"}))
+        lookup = httpx.Request("GET", "https://x/v2/orders:by_client_order_id?client_order_id=a")
+        assert request_key(lookup)[1] == "https://x/v2/orders:by_client_order_id"
+
+
+class TestReplayer:
+    def test_same_request_first_then_other_dates(self, tmp_path):
+        path = tmp_path / "c.jsonl.gz"
+        url = "https://x/v2/calendar"
+        write_cassette(
+            path,
+            interaction(f"{url}?start=2025-09-01&end=2025-09-30", {"n": 1}),
+            interaction(f"{url}?start=2025-10-01&end=2025-10-31", {"n": 2}),
+        )
+        replayer = Cassette.load(str(path)).replayer(INSTANT)
+        served = [
+            replayer.next(httpx.Request("POST", f"https://y/v2/calendar?start={start}&end={end}"))
+            for start, end in [("2025-10-01", "2025-10-31"), ("2026-01-01", "2026-01-31")]
+        ]
+        assert [json.loads(i.content)["n"] for i in served] == [2, 1]
+        with pytest.raises(CassetteMiss):
+            replayer.next(httpx.Request("POST", f"{url}?start=2025-09-01&end=2025-09-30"))
+
+    def test_other_queries_miss(self, tmp_path):
+        path = tmp_path / "c.jsonl.gz"
+        url = "https://x/v2/stocks/trades/latest"
+        write_cassette(path, interaction(f"{url}?symbols=SPY", {"n": 1}))
+        replayer = Cassette.load(str(path)).replayer(INSTANT)
+        with pytest.raises(CassetteMiss, match="symbols=AAPL"):
+            replayer.next(httpx.Request("POST", f"{url}?symbols=AAPL"))
+        assert replayer.remaining == 1
+
+    @pytest.mark.parametrize("speed, delays", [(REAL_TIME, [0.2]), (4.0, [0.05]), (INSTANT, [])])
+    def test_timing(self, tmp_path, speed, delays):
+        path = tmp_path / "c.jsonl.gz"
+        write_cassette(path, interaction("https://x/v2/account", {}, duration=0.2))
+        transport = Cassette.load(str(path)).replayer(speed).transport(httpx.AsyncHTTPTransport())
+        request = httpx.Request("POST", "https://x/v2/account")
+        with patch("src.cassette.asyncio.sleep", AsyncMock()) as sleep:
+            asyncio.run(transport.handle_async_request(request))
+        assert [c.args[0] for c in sleep.await_args_list] == pytest.approx(delays)
+
+    @pytest.mark.parametrize("speed, delays", [(REAL_TIME, [0.1, 0.9]), (10.0, [0.01, 0.01])])
+    def test_gaps_between_requests_are_kept(self, tmp_path, speed, delays):
+        path = tmp_path / "c.jsonl.gz"
+        first = interaction("https://x/v2/account", {}, duration=0.1)
+        second = interaction("https://x/v2/positions", {}, duration=0.1)
+        first.at, second.at = 5.0, 6.0  # the second request came 0.9s after the first answer
+        write_cassette(path, first, second)
+        replayer = Cassette.load(str(path)).replayer(speed)
+        with patch("src.cassette.time") as clock:
+            clock.monotonic.return_value = 100.0
+            served = [replayer.next(httpx.Request("POST", "https://x/v2/account"))]
+            observed = [replayer.delay(served[0])]
+            clock.monotonic.return_value = 100.2  # the replay asks sooner than the session
+            served.append(replayer.next(httpx.Request("POST", "https://x/v2/positions")))
+            observed.append(replayer.delay(served[1]))
+        assert observed == pytest.approx(delays)
+
+    def test_parse_speed(self):
+        assert [parse_speed(s) for s in ["real", "instant", "10"]] == [REAL_TIME, INSTANT, 10.0]
+        with pytest.raises(ValueError):
+            parse_speed("0")
+
+
+def test_truncated_cassette_keeps_complete_lines(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    write_cassette(path, *(interaction(f"https://x/v2/orders/{i}", {"i": i}) for i in range(3)))
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 12)  # a session killed mid-write
+    cassette = Cassette.load(str(path))
+    assert 0 < len(cassette.interactions) <= 3
+    assert all(json.loads(i.content) == {"i": n} for n, i in enumerate(cassette.interactions))
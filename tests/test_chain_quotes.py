@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+from alpaca.trading.enums import ContractType
+
+from src.chain_quotes import ChainQuoteLoader, ChainQuotes, LiquidityFilter
+from src.option_chain import OptionChain, OptionChainIndex
+from tests.test_option_chain import EXPIRATION, _chain_response, _contract
+
+
+def _snapshot(bid: float, ask: float, delta: float | None = None) -> MagicMock:
+    return MagicMock(
+        latest_quote=MagicMock(bid_price=bid, ask_price=ask),
+        implied_volatility=0.3,
+        greeks=MagicMock(delta=delta) if delta is not None else None,
+    )
+
+
+def _chain(strikes, open_interest) -> OptionChain:
+    contracts = [_contract(s) for s in strikes]
+    for contract, oi in zip(contracts, open_interest):
+        contract.open_interest = oi
+    return OptionChain.from_contracts(contracts)
+
+
+class TestChainQuotes:
+    def setup_method(self):
+        chain = _chain([200, 205, 210, 215], ["500", "50", None, "900"])
+        snapshots = {
+            chain.symbols[0]: _snapshot(4.0, 4.2, delta=0.45),
+            chain.symbols[1]: _snapshot(2.0, 3.0),
+            chain.symbols[3]: _snapshot(0.0, 0.05),
+        }
+        self.quotes = ChainQuotes.from_snapshots(chain, snapshots)
+
+    def test_aligned_with_strikes(self):
+        np.testing.assert_array_equal(self.quotes.bid, [4.0, 2.0, np.nan, 0.0])
+        np.testing.assert_array_equal(self.quotes.open_interest, [500, 50, 0, 900])
+        np.testing.assert_array_equal(self.quotes.delta, [0.45, np.nan, np.nan, np.nan])
+        np.testing.assert_allclose(self.quotes.mid, [4.1, 2.5, np.nan, np.nan])
+
+    def test_raw_snapshots(self):
+        chain = _chain([200, 205], ["500", None])
+        snapshots = {
+            chain.symbols[0]: {
+                "latestQuote": {"bp": 4.0, "ap": 4.2},
+                "impliedVolatility": 0.3,
+                "greeks": {"delta": 0.45},
+            },
+            chain.symbols[1]: {"latestQuote": {"bp": 2.0, "ap": 3.0}},
+        }
+        quotes = ChainQuotes.from_snapshots(chain, snapshots)
+        np.testing.assert_array_equal(quotes.bid, [4.0, 2.0])
+        np.testing.assert_array_equal(quotes.iv, [0.3, np.nan])
+        np.testing.assert_array_equal(quotes.delta, [0.45, np.nan])
+
+    def test_liquidity_filter(self):
+        def mask(**bounds):
+            return LiquidityFilter(**bounds).mask(self.quotes).tolist()
+
+        assert not LiquidityFilter().active
+        assert mask() == [True, True, True, True]
+        assert mask(min_bid=0.5) == [True, True, False, False]
+        assert mask(max_spread=0.1) == [True, False, False, False]
+        assert mask(min_open_interest=100) == [True, False, False, True]
+        assert mask(min_bid=0.5, min_open_interest=100) == [True, False, False, False]
+
+
+class TestChainQuoteLoader:
+    def _loader(self, ttl: float = 60):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _chain_response([200, 210])
+        client.get_option_snapshot.side_effect = lambda request: {
+            symbol: _snapshot(1.0, 1.1) for symbol in request.symbol_or_symbols
+        }
+        return client, ChainQuoteLoader(client, OptionChainIndex(client), ttl=ttl)
+
+    def test_one_batched_request_per_chain(self):
+        client, loader = self._loader()
+        quotes = loader.quotes("AAPL", EXPIRATION, ContractType.CALL)
+        assert loader.quotes("AAPL", EXPIRATION, ContractType.CALL) is quotes
+        client.get_option_snapshot.assert_called_once()
+        request = client.get_option_snapshot.call_args.args[0]
+        assert request.symbol_or_symbols == ["AAPL250926C00200000", "AAPL250926C00210000"]
+
+    def test_expires_after_ttl(self):
+        client, loader = self._loader(ttl=0.05)
+        loader.quotes("AAPL", EXPIRATION, ContractType.CALL)
+        time.sleep(0.1)
+        loader.quotes("AAPL", EXPIRATION, ContractType.CALL)
+        assert client.get_option_snapshot.call_count == 2
+        assert client.get_option_contracts.call_count == 1  # the chain itself is kept
+
+    def test_empty_chain_makes_no_request(self):
+        client, loader = self._loader()
+        client.get_option_contracts.return_value = _chain_response([])
+        assert len(loader.quotes("AAPL", EXPIRATION, ContractType.PUT).bid) == 0
+        client.get_option_snapshot.assert_not_called()
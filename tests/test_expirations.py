@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+from src.expirations import HORIZON_DAYS, ExpirationCalendar, expiration_horizon
+
+
+def _contracts_response(expirations, next_page_token=None, ticker: str = "AAPL"):
+    mock = MagicMock()
+    mock.option_contracts = [
+        MagicMock(symbol=f"{ticker}{d:%y%m%d}C00200000", expiration_date=d) for d in expirations
+    ]
+    mock.next_page_token = next_page_token
+    return mock
+
+
+def _fridays(start: date, weeks: int = 8) -> list[date]:
+    friday = start + timedelta(days=(4 - start.weekday()) % 7)
+    return [friday + timedelta(weeks=w) for w in range(weeks)]
+
+
+class TestExpirationCalendar:
+    def test_fetched_once_per_day(self):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _contracts_response(
+            _fridays(date(2025, 9, 22))
+        )
+        calendar = ExpirationCalendar(client)
+        for _ in range(3):
+            calendar.on_or_before("AAPL", date(2025, 9, 26), date(2025, 9, 22))
+        calendar.on_or_before("AAPL", date(2025, 9, 26), date(2025, 9, 23))
+        assert client.get_option_contracts.call_count == 2
+
+    def test_follows_pagination(self):
+        client = MagicMock()
+        client.get_option_contracts.side_effect = [
+            _contracts_response([date(2025, 10, 3), date(2025, 9, 26)], next_page_token="p2"),
+            _contracts_response([date(2025, 9, 24), date(2025, 10, 3)]),
+        ]
+        calendar = ExpirationCalendar(client)
+        assert calendar.expirations("AAPL", date(2025, 9, 22)) == [
+            date(2025, 9, 24),
+            date(2025, 9, 26),
+            date(2025, 10, 3),
+        ]
+        assert client.get_option_contracts.call_args.args[0].page_token == "p2"
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _contracts_response(
+            _fridays(date(2025, 9, 22))
+        )
+        ExpirationCalendar(client, cache_dir=str(tmp_path)).expirations("AAPL", date(2025, 9, 22))
+
+        fresh_client = MagicMock()
+        calendar = ExpirationCalendar(fresh_client, cache_dir=str(tmp_path))
+        assert calendar.on_or_before("AAPL", date(2025, 9, 26), date(2025, 9, 22)) == date(
+            2025, 9, 26
+        )
+        fresh_client.get_option_contracts.assert_not_called()
+
+    def test_unreadable_cache_is_ignored(self, tmp_path):
+        (tmp_path / "expirations.json").write_text("not json")
+        calendar = ExpirationCalendar(MagicMock(), cache_dir=str(tmp_path))
+        assert calendar._index == {}
+
+    def test_wider_horizon_refetches(self, tmp_path):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _contracts_response(
+            _fridays(date(2025, 9, 22))
+        )
+        today = date(2025, 9, 22)
+        ExpirationCalendar(client, cache_dir=str(tmp_path)).expirations("AAPL", today)
+        calendar = ExpirationCalendar(client, cache_dir=str(tmp_path), horizon_days=125)
+        calendar.expirations("AAPL", today)
+        calendar.expirations("AAPL", today)
+        assert client.get_option_contracts.call_count == 2
+        request = client.get_option_contracts.call_args.args[0]
+        assert request.expiration_date_lte == today + timedelta(days=125)
+
+        calendar.horizon_days = HORIZON_DAYS  # narrower: what was fetched still covers it
+        calendar.expirations("AAPL", today)
+        assert client.get_option_contracts.call_count == 2
+
+
+def test_expiration_horizon():
+    assert expiration_horizon([None]) == HORIZON_DAYS
+    assert expiration_horizon([None, 7]) == HORIZON_DAYS
+    assert expiration_horizon([30, 90, None]) == 125
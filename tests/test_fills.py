@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from alpaca.trading.enums import OrderStatus
+
+from src.fills import FillTracker
+from tests.fakes import FakeTradingStreamServer, order_payload
+
+
+@pytest.fixture
+def server():
+    with FakeTradingStreamServer() as server:
+        yield server
+
+
+@pytest.fixture
+def tracker(server):
+    tracker = FillTracker("key", "secret", url_override=server.url)
+    assert tracker.start(wait=5)
+    assert server.listening.wait(5)
+    yield tracker
+    tracker.stop()
+
+
+def push_later(server, event, order, delay=0.1):
+    threading.Timer(delay, server.push, args=(event, order)).start()
+
+
+class TestFillTracker:
+    def test_resolves_on_fill(self, server, tracker):
+        order = order_payload(status="filled", filled_avg_price="1.23")
+        push_later(server, "fill", order)
+        filled = tracker.wait(order["id"], timeout=5)
+        assert filled is not None  # a timeout returns None
+        assert filled.status == OrderStatus.FILLED
+        assert str(filled.id) == order["id"]
+
+    @pytest.mark.parametrize(
+        "event, status",
+        [
+            ("partial_fill", "partially_filled"),
+            ("canceled", "canceled"),
+            ("expired", "expired"),
+            ("rejected", "rejected"),
+        ],
+    )
+    def test_resolves_on_terminal_events(self, server, tracker, event, status):
+        order = order_payload(status=status)
+        push_later(server, event, order)
+        resolved = tracker.wait(order["id"], timeout=5)
+        assert resolved is not None and resolved.status == OrderStatus(status)
+
+    def test_update_before_tracking_is_kept(self, server, tracker):
+        order = order_payload(status="filled")
+        server.push("fill", order)
+        deadline = time.monotonic() + 5
+        while order["id"] not in tracker._unclaimed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert tracker.wait(order["id"], timeout=1).status == OrderStatus.FILLED
+
+    def test_ignores_other_orders_and_events(self, server, tracker):
+        order = order_payload()
+        push_later(server, "new", order)
+        push_later(server, "fill", order_payload(status="filled"))
+        assert tracker.wait(order["id"], timeout=1.5) is None
+        assert tracker._futures == {}
+
+    def test_stream_drop_returns_early(self, server, tracker):
+        order = order_payload()
+        threading.Timer(0.1, server.disconnect_all).start()
+        start = time.monotonic()
+        assert tracker.wait(order["id"], timeout=10) is None
+        assert time.monotonic() - start < 5
+
+    def test_not_connected_when_unauthorized(self):
+        with FakeTradingStreamServer(authorize=False) as server:
+            tracker = FillTracker("key", "secret", url_override=server.url)
+            assert not tracker.start(wait=0.5)
+            assert tracker.wait("some-order", timeout=5) is None
+            tracker.stop()
+
+
+class TestWaitForFill:
+    def _client(self, tracker):
+        from tests.test_alpaca_client import make_client
+
+        client = make_client()
+        client.fill_tracker = tracker
+        return client
+
+    def test_uses_stream_without_polling(self, server, tracker):
+        client = self._client(tracker)
+        order = order_payload(status="filled", filled_avg_price="1.23")
+        push_later(server, "fill", order)
+        filled = client.wait_for_fill(MagicMock(id=order["id"]), timeout=5)
+        assert filled is not None and filled.status == OrderStatus.FILLED
+        client.client.get_order_by_id.assert_not_called()
+
+    def test_canceled_order_returns_none(self, server, tracker):
+        client = self._client(tracker)
+        order = order_payload(status="canceled")
+        push_later(server, "canceled", order)
+        assert client.wait_for_fill(MagicMock(id=order["id"]), timeout=5) is None
+        client.client.get_order_by_id.assert_not_called()
+
+    def test_falls_back_to_polling_when_stream_down(self):
+        tracker = MagicMock(connected=False)
+        client = self._client(tracker)
+        client.client.get_order_by_id.return_value = MagicMock(status=OrderStatus.FILLED)
+        assert client.wait_for_fill(MagicMock(id="abc"), timeout=5) is not None
+        tracker.wait.assert_not_called()
+        client.client.get_order_by_id.assert_called_once_with("abc")
+
+    def test_falls_back_to_polling_when_stream_drops(self):
+        tracker = MagicMock(connected=True)
+        tracker.wait.return_value = None
+        client = self._client(tracker)
+        client.client.get_order_by_id.return_value = MagicMock(status=OrderStatus.FILLED)
+        assert client.wait_for_fill(MagicMock(id="abc"), timeout=5) is not None
+        client.client.get_order_by_id.assert_called_once_with("abc")
+
+    @pytest.mark.parametrize("status, filled", [("filled", True), ("new", False)])
+    def test_polls_once_after_the_stream_times_out(self, status, filled):
+        tracker = MagicMock(connected=True)
+        client = self._client(tracker)
+        client.client.get_order_by_id.return_value = MagicMock(status=OrderStatus(status))
+        with patch("src.alpaca_client.time") as clock:
+            clock.time.return_value = 0.0
+            # the stream wait takes the whole timeout and sees no update
+            tracker.wait.side_effect = lambda *_: setattr(clock.time, "return_value", 5.0)
+            result = client.wait_for_fill(MagicMock(id="abc"), timeout=5)
+        assert (result is not None) == filled
+        client.client.get_order_by_id.assert_called_once_with("abc")
+        clock.sleep.assert_not_called()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from src.journal import Journal, parse_log_lines
+
+DAY = 86400.0
+START = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _trade(symbol: str, side: str, qty: int, price: float) -> dict:
+    return {
+        "type": "put" if "P" in symbol[-9:] else "call",
+        "side": side,
+        "symbol": symbol,
+        "qty": qty,
+        "filled_avg_price": price,
+        "status": "filled",
+    }
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"), flush_interval=0.01)
+    yield journal
+    journal.close()
+
+
+class TestWrites:
+    def test_wal_mode(self, journal):
+        assert journal._query("PRAGMA journal_mode") == [("wal",)]
+
+    def test_batched_writes_are_flushed(self, journal):
+        for i in range(1000):
+            journal.record_value(100_000.0 + i, at=START + i)
+        journal.flush()
+        assert journal._query("SELECT COUNT(*), MAX(value) FROM portfolio_values") == [
+            (1000, 100_999.0)
+        ]
+
+    def test_close_flushes_pending_writes(self, tmp_path):
+        path = str(tmp_path / "journal.db")
+        journal = Journal(path, flush_interval=60)
+        journal.record_value(1.0, at=START)
+        journal.close()
+        reopened = Journal(path)
+        assert reopened.value_history() == [("2025-01-01", 1.0)]
+        reopened.close()
+
+    def test_duplicates_are_ignored(self, journal):
+        trade = _trade("AAPL250926C00210000", "sell", 2, 1.5)
+        journal.record_trade(trade, at=START)
+        journal.record_trade(trade, at=START)
+        journal.flush()
+        assert journal._query("SELECT underlying, qty, price FROM trades") == [
+            ("AAPL", 2.0, 1.5)
+        ]
+
+
+class TestQueries:
+    def test_premium(self, journal):
+        journal.record_trade(_trade("AAPL250926C00210000", "sell", 2, 1.5), at=START)
+        journal.record_trade(_trade("AAPL250926C00210000", "buy", 2, 0.5), at=START + DAY)
+        journal.record_trade(_trade("SPY250228P00500000", "sell", 1, 3.0), at=START + 40 * DAY)
+        journal.flush()
+        assert journal.premium() == [("total", 500.0)]
+        assert journal.premium(by="month") == [("2025-01", 200.0), ("2025-02", 300.0)]
+        assert journal.premium(by="underlying") == [("AAPL", 200.0), ("SPY", 300.0)]
+        assert journal.premium(since=START + DAY, until=START + 2 * DAY) == [("total", -100.0)]
+
+    def test_value_history_takes_last_value_of_period(self, journal):
+        for i, value in enumerate([100.0, 110.0, 105.0]):
+            journal.record_value(value, at=START + i * 3600)
+        journal.record_value(120.0, at=START + DAY)
+        journal.flush()
+        assert journal.value_history() == [("2025-01-01", 105.0), ("2025-01-02", 120.0)]
+        assert journal.value_history(every="month") == [("2025-01", 120.0)]
+
+    def test_assignments(self, journal):
+        put, call = "AAPL250117P00190000", "AAPL250124C00210000"
+        journal.record_positions({"USD": {"qty": "19000"}, put: {"qty": "-1"}}, START)
+        journal.record_positions({"USD": {"qty": "0"}, "AAPL": {"qty": "100"}}, START + DAY)
+        journal.record_positions({"AAPL": {"qty": "100"}, call: {"qty": "-1"}}, START + 2 * DAY)
+        journal.record_positions({"AAPL": {"qty": "100"}}, START + 9 * DAY)  # expired worthless
+        journal.flush()
+        assignments = journal.assignments()
+        assert [(a.time, a.option, a.underlying, a.shares) for a in assignments] == [
+            (START + DAY, put, "AAPL", 100.0)
+        ]
+
+    @pytest.mark.timing
+    def test_queries_over_years_take_milliseconds(self, journal):
+        hours = 5 * 365 * 24
+        for i in range(hours):
+            journal.record_value(100_000.0 + i, at=START + i * 3600)
+            if i % 24 == 0:
+                symbol = f"AAPL{250101 + i // 24 % 28:06d}P00190000"
+                journal.record_trade(_trade(symbol, "sell", 1, 1.0), at=START + i * 3600)
+        journal.flush()
+
+        def best_of(query, repeat: int = 5) -> float:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        since, until = START + 365 * DAY, START + 366 * DAY
+        assert best_of(lambda: journal.premium(since, until)) < 0.005  # index range scan
+        assert best_of(lambda: journal.premium(by="month")) < 0.05
+        assert best_of(lambda: journal.value_history(every="month")) < 0.1
+
+
+class TestImport:
+    TEXT_LOG = [
+        "2025-09-26 13:59:00Z | INFO | Selling 2 AAPL250926C00210000",
+        "2025-09-26 13:59:01Z | INFO | "
+        + json.dumps({"trade": _trade("AAPL250926C00210000", "sell", 2, 1.5)}),
+        "2025-09-26 13:59:02Z | INFO | "
+        + json.dumps({"positions": {"AAPL250926C00210000": {"qty": "-2", "price": "1.5"}}}),
+        '2025-09-26 13:59:03Z | INFO | {"portfolio_value": 100000.0}',
+        "2025-09-26 13:59:04Z | ERROR | {not json",
+    ]
+    JSON_LOG = [
+        json.dumps(
+            {"time": "2025-10-01T14:00:00.123Z", "data": {"portfolio_value": 101000.0}}
+        ),
+        json.dumps({"time": "2025-10-01T14:00:01.000Z", "level": "INFO", "message": "hello"}),
+    ]
+
+    def test_parse_log_lines(self):
+        parsed = list(parse_log_lines(self.TEXT_LOG + self.JSON_LOG))
+        assert [next(iter(event)) for _, event in parsed] == [
+            "trade",
+            "positions",
+            "portfolio_value",
+            "portfolio_value",
+        ]
+        assert parsed[0][0] == datetime(2025, 9, 26, 13, 59, 1, tzinfo=timezone.utc).timestamp()
+        assert parsed[-1][0] == pytest.approx(
+            datetime(2025, 10, 1, 14, 0, tzinfo=timezone.utc).timestamp() + 0.123
+        )
+
+    def test_import_is_idempotent(self, journal, tmp_path):
+        log_dir = tmp_path / "logs"
+        log_dir.mkdir()
+        (log_dir / "2025-09.log").write_text("\n".join(self.TEXT_LOG) + "\n")
+        (log_dir / "2025-10.log").write_text("\n".join(self.JSON_LOG) + "\n")
+        (log_dir / "metrics.jsonl").write_text('{"time": 0}\n')
+        counts = journal.import_logs(str(log_dir))
+        assert counts == {"trade": 1, "positions": 1, "portfolio_value": 2}
+        journal.import_logs(str(log_dir))
+        assert journal.premium() == [("total", 300.0)]
+        assert journal.value_history(every="month") == [
+            ("2025-09", 100000.0),
+            ("2025-10", 101000.0),
+        ]
+
+    @pytest.mark.parametrize("log_format", ["text", "json"])
+    def test_import_after_live_journaling(self, journal, tmp_path, log_format):
+        trade = _trade("AAPL250926C00210000", "sell", 2, 1.5)
+        at = datetime(2025, 9, 26, 13, 59, 1, 420_000, tzinfo=timezone.utc)
+        with patch("src.journal.time.time", return_value=at.timestamp()):
+            journal.record_trade(trade)
+            journal.record_value(100000.0)
+        journal.flush()
+        if log_format == "text":
+            stamp = f"{at:%Y-%m-%d %H:%M:%S}Z | INFO | "
+            lines = [stamp + json.dumps({"trade": trade}), stamp + '{"portfolio_value": 100000.0}']
+        else:
+            stamp = f"{at:%Y-%m-%dT%H:%M:%S}.420Z"
+            lines = [
+                json.dumps({"time": stamp, "data": {"trade": trade}}),
+                json.dumps({"time": stamp, "data": {"portfolio_value": 100000.0}}),
+            ]
+        log_dir = tmp_path / "logs"
+        log_dir.mkdir()
+        (log_dir / "2025-09.log").write_text("\n".join(lines) + "\n")
+        journal.import_logs(str(log_dir))
+        assert journal.premium() == [("total", 300.0)]
+        assert journal._query("SELECT COUNT(*) FROM portfolio_values") == [(1,)]
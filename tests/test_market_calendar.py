@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from alpaca.common.exceptions import APIError
+from alpaca.trading.models import Calendar
+
+from src.market_calendar import (
+    MARKET_TZ,
+    SessionSchedule,
+    SessionTime,
+    TradingCalendar,
+    parse_session_schedule,
+)
+
+THANKSGIVING = date(2026, 11, 26)
+BLACK_FRIDAY = date(2026, 11, 27)  # closes at 13:00
+
+
+def _calendar(month: date, holidays=(), early_closes=()) -> list[Calendar]:
+    days = [month.replace(day=d) for d in range(1, 31)]
+    return [
+        Calendar(
+            date=day.isoformat(),
+            open="09:30",
+            close="13:00" if day in early_closes else "16:00",
+        )
+        for day in days
+        if day.weekday() < 5 and day not in holidays
+    ]
+
+
+def _ts(day: date, hour: int, minute: int = 0) -> float:
+    return MARKET_TZ.localize(datetime(day.year, day.month, day.day, hour, minute)).timestamp()
+
+
+class TestParseSessionSchedule:
+    @pytest.mark.parametrize(
+        "spec, expected",
+        [
+            ("open+29m", SessionSchedule(SessionTime("open", 29 * 60))),
+            ("close - 10m", SessionSchedule(SessionTime("close", -600))),
+            ("close", SessionSchedule(SessionTime("close"))),
+            ("every 1h", SessionSchedule(SessionTime("open"), 3600)),
+            (
+                "every 30m from open+15m until close-15m",
+                SessionSchedule(SessionTime("open", 900), 1800, SessionTime("close", -900)),
+            ),
+        ],
+    )
+    def test_valid(self, spec, expected):
+        assert parse_session_schedule(spec) == expected
+
+    def test_cron_is_not_a_session_schedule(self):
+        assert parse_session_schedule("59 9 * * 1-5") is None
+
+    @pytest.mark.parametrize(
+        "spec", ["open+29", "open-5m", "close+1h", "every", "every 0m", "every 1h at open"]
+    )
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_session_schedule(spec)
+
+
+class TestSessionSchedule:
+    def test_every_hour_while_open(self):
+        schedule = parse_session_schedule("every 1h from open+30m")
+        times = schedule.fire_times(_ts(THANKSGIVING, 9, 30), _ts(THANKSGIVING, 16))
+        assert times == [_ts(THANKSGIVING, h) for h in range(10, 17)]
+
+    def test_early_close_drops_later_runs(self):
+        open_, close = _ts(BLACK_FRIDAY, 9, 30), _ts(BLACK_FRIDAY, 13)
+        assert parse_session_schedule("every 1h from open+30m").fire_times(open_, close) == [
+            _ts(BLACK_FRIDAY, h) for h in range(10, 14)
+        ]
+        assert parse_session_schedule("close-10m").fire_times(open_, close) == [
+            _ts(BLACK_FRIDAY, 12, 50)
+        ]
+        assert parse_session_schedule("open+6h").fire_times(open_, close) == []
+
+
+class TestTradingCalendar:
+    def test_fetched_once_per_month(self):
+        client = MagicMock()
+        client.get_calendar.return_value = _calendar(
+            date(2026, 11, 1), holidays={THANKSGIVING}, early_closes={BLACK_FRIDAY}
+        )
+        calendar = TradingCalendar(client)
+        assert calendar.next_session(_ts(THANKSGIVING, 8)) == (
+            _ts(BLACK_FRIDAY, 9, 30),
+            _ts(BLACK_FRIDAY, 13),
+        )
+        assert calendar.next_session(_ts(date(2026, 11, 25), 12)) == (
+            _ts(date(2026, 11, 25), 9, 30),
+            _ts(date(2026, 11, 25), 16),
+        )
+        assert client.get_calendar.call_count == 1
+        request = client.get_calendar.call_args.args[0]
+        assert (request.start, request.end) == (date(2026, 11, 1), date(2026, 11, 30))
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        client = MagicMock()
+        client.get_calendar.return_value = _calendar(
+            date(2099, 11, 1), holidays={date(2099, 11, 2)}
+        )
+        TradingCalendar(client, cache_dir=str(tmp_path)).next_session(_ts(date(2099, 11, 1), 0))
+
+        fresh_client = MagicMock()
+        calendar = TradingCalendar(fresh_client, cache_dir=str(tmp_path))
+        session = calendar.next_session(_ts(date(2099, 11, 1), 0))
+        assert session[0] == _ts(date(2099, 11, 3), 9, 30)
+        fresh_client.get_calendar.assert_not_called()
+
+    def test_failed_fetch_assumes_regular_sessions(self, tmp_path):
+        client = MagicMock()
+        client.get_calendar.side_effect = APIError("unavailable")
+        calendar = TradingCalendar(client, cache_dir=str(tmp_path))
+        assert calendar.next_session(_ts(THANKSGIVING, 8)) == (
+            _ts(THANKSGIVING, 9, 30),
+            _ts(THANKSGIVING, 16),
+        )
+        assert not (tmp_path / "calendar.json").exists()
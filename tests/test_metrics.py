@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import urllib.request
+
+import pytest
+
+from src.metrics import METRICS, MetricsRegistry, MetricsServer, instrumented
+from src.utils import cached_property_ttl
+
+
+class Cached:
+    @cached_property_ttl(ttl=60)
+    def value(self) -> int:
+        return 1
+
+
+class TestMetricsRegistry:
+    def setup_method(self):
+        self.registry = MetricsRegistry()
+
+    def test_timer_counts_calls_and_errors(self):
+        with self.registry.timer("alpaca", "get_account"):
+            pass
+        with pytest.raises(ValueError):
+            with self.registry.timer("alpaca", "get_account"):
+                raise ValueError
+        stats = self.registry.snapshot()["calls"]["alpaca.get_account"]
+        assert (stats["calls"], stats["errors"]) == (2, 1)
+
+    def test_histogram_buckets(self):
+        for seconds in (0.001, 0.02, 0.02, 100):
+            self.registry.observe("job", "trade_options", seconds)
+        lines = self.registry.render().splitlines()
+        bucket = 'options_bot_call_duration_seconds_bucket{kind="job",name="trade_options",le='
+        assert f'{bucket}"0.005"}} 1' in lines
+        assert f'{bucket}"0.025"}} 3' in lines
+        assert f'{bucket}"60.0"}} 3' in lines
+        assert f'{bucket}"+Inf"}} 4' in lines
+        assert 'options_bot_call_duration_seconds_count{kind="job",name="trade_options"} 4' in lines
+        assert 'options_bot_calls_total{kind="job",name="trade_options"} 4' in lines
+
+    def test_cache_hit_rate(self):
+        obj = Cached()
+        self.registry.watch_cache("value", lambda: Cached.value.stats(obj))
+        for _ in range(4):
+            obj.value  # noqa: B018
+        assert self.registry.snapshot()["caches"]["value"]["hit_rate"] == 0.75
+        assert 'options_bot_cache_events_total{cache="value",event="hits"} 3' in (
+            self.registry.render()
+        )
+
+    def test_dump_json(self, tmp_path):
+        path = str(tmp_path / "logs" / "metrics.jsonl")
+        self.registry.observe("telegram", "send_message", 0.1)
+        self.registry.dump_json(path)
+        self.registry.dump_json(path)
+        lines = [json.loads(line) for line in open(path)]
+        assert len(lines) == 2
+        assert lines[0]["calls"]["telegram.send_message"]["calls"] == 1
+
+    @pytest.mark.timing
+    def test_overhead_is_negligible(self):
+        n = 10_000
+        start = time.perf_counter()
+        for _ in range(n):
+            with self.registry.timer("alpaca", "get_account"):
+                pass
+        assert (time.perf_counter() - start) / n < 20e-6
+
+
+def test_instrumented_sync_and_async():
+    @instrumented("test")
+    def sync_call() -> int:
+        return 1
+
+    @instrumented("test", name="renamed")
+    async def async_call() -> int:
+        return 2
+
+    before = METRICS.snapshot()["calls"]
+    assert sync_call() == 1
+    assert asyncio.run(async_call()) == 2
+    assert asyncio.iscoroutinefunction(async_call)
+    after = METRICS.snapshot()["calls"]
+    for name in ("test.sync_call", "test.renamed"):
+        assert after[name]["calls"] - before.get(name, {"calls": 0})["calls"] == 1
+
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.observe("alpaca", "get_account", 0.05)
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode()
+        assert 'options_bot_calls_total{kind="alpaca",name="get_account"} 1' in body
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other")
+    finally:
+        server.stop()
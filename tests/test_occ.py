@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.occ import OccSymbol, occ_underlying, parse_occ, parse_occ_many
+
+SYMBOLS = [
+    "AAPL250926C00210000",
+    "A250926P00120000",
+    "SOXL260417P00073000",
+    "AAPL1250926C00210000",  # adjusted after a corporate action
+    "XYZ991231P12345678",
+    "AAPL",
+    "USD",
+    "",
+    "250926C00210000",
+    "AAPL250926X00210000",
+    "AAPL250230C00210000",  # February 30th
+    "TOOLONG250926C00210000",
+    "aapl250926C00210000",
+    "BRK.B250926C00210000",
+]
+
+
+class TestParseOcc:
+    def test_fields(self):
+        assert parse_occ("AAPL250926C00210000") == OccSymbol("AAPL", date(2025, 9, 26), True, 210.0)
+        assert parse_occ("XYZ991231P12345678") == OccSymbol(
+            "XYZ", date(2099, 12, 31), False, 12345.678
+        )
+
+    @pytest.mark.parametrize(
+        "symbol, expected",
+        [
+            ("AAPL250926C00210000", "AAPL"),
+            ("A250926P00120000", "A"),
+            ("SOXL260417P00073000", "SOXL"),
+            ("AAPL", None),
+            ("AAPL250926X00210000", None),
+            ("250926C00210000", None),
+            ("AAPL250230C00210000", None),
+        ],
+    )
+    def test_underlying(self, symbol, expected):
+        assert occ_underlying(symbol) == expected
+
+    def test_memoized(self):
+        parse_occ.cache_clear()
+        for _ in range(3):
+            parse_occ("AAPL250926C00210000")
+        assert parse_occ.cache_info().hits == 2
+
+
+class TestParseOccMany:
+    def test_matches_parse_occ(self):
+        parsed = parse_occ_many(SYMBOLS)
+        assert len(parsed) == len(SYMBOLS)
+        for i, symbol in enumerate(SYMBOLS):
+            expected = parse_occ(symbol)
+            assert parsed.valid[i] == (expected is not None), symbol
+            if expected is None:
+                assert parsed.underlying[i] == "" and np.isnan(parsed.strike[i])
+                continue
+            assert parsed.underlying[i] == expected.underlying
+            assert parsed.expiration[i] == np.datetime64(expected.expiration)
+            assert parsed.is_call[i] == expected.is_call
+            assert parsed.strike[i] == expected.strike
+
+    def test_of_matches_the_exact_underlying(self):
+        parsed = parse_occ_many(SYMBOLS)
+        assert np.flatnonzero(parsed.of("A")).tolist() == [1]
+        assert np.flatnonzero(parsed.of("AAPL")).tolist() == [0]
+
+    def test_empty(self):
+        parsed = parse_occ_many([])
+        assert len(parsed) == 0
+        assert parsed.expiration.dtype == np.dtype("datetime64[D]")
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from alpaca.trading.enums import ContractType
+from alpaca.trading.models import OptionContract
+
+from src.option_chain import ContractRecord, OptionChain, OptionChainIndex, iter_option_contracts
+from tests.fakes import FakeAlpacaServer
+
+EXPIRATION = date(2025, 9, 26)
+
+
+def _contract(strike: float, option_type: str = "C", expiration: date = EXPIRATION) -> MagicMock:
+    symbol = f"AAPL{expiration:%y%m%d}{option_type}{int(strike * 1000):08d}"
+    return MagicMock(symbol=symbol, strike_price=float(strike), expiration_date=expiration)
+
+
+def _chain_response(strikes, next_page_token=None, **kwargs):
+    mock = MagicMock()
+    mock.option_contracts = [_contract(s, **kwargs) for s in strikes]
+    mock.next_page_token = next_page_token
+    return mock
+
+
+class TestOptionChain:
+    def setup_method(self):
+        self.chain = OptionChain.from_contracts([_contract(s) for s in (210, 190, 200, 205)])
+
+    def test_sorted_by_strike(self):
+        assert list(self.chain.strikes) == [190.0, 200.0, 205.0, 210.0]
+        assert self.chain.symbols[0] == "AAPL250926C00190000"
+
+    @pytest.mark.parametrize(
+        "price, selection, expected",
+        [
+            (200.0, "above", 200.0),
+            (201.0, "above", 205.0),
+            (211.0, "above", None),
+            (200.0, "below", 200.0),
+            (204.0, "below", 200.0),
+            (189.0, "below", None),
+            (203.0, "nearest", 205.0),
+            (202.0, "nearest", 200.0),
+            (100.0, "nearest", 190.0),
+            (300.0, "nearest", 210.0),
+        ],
+    )
+    def test_index(self, price, selection, expected):
+        i = self.chain.index(price, selection)
+        assert (self.chain.strikes[i] if i is not None else None) == expected
+
+    @pytest.mark.parametrize(
+        "selection, expected", [("above", 210.0), ("below", 190.0), ("nearest", 210.0)]
+    )
+    def test_index_among_eligible(self, selection, expected):
+        i = self.chain.index(202.0, selection, eligible=[True, False, False, True])
+        assert self.chain.strikes[i] == expected
+        assert self.chain.index(202.0, selection, eligible=[False] * 4) is None
+
+    def test_keeps_only_the_underlying(self):
+        adjusted = MagicMock(symbol="AAPL1250926C00200000", strike_price=200.0)
+        chain = OptionChain.from_contracts([_contract(210), adjusted, _contract(190)], "AAPL")
+        assert chain.symbols == ["AAPL250926C00190000", "AAPL250926C00210000"]
+
+    def test_empty_chain(self):
+        chain = OptionChain.from_contracts([])
+        assert chain.index(100.0, "above") is None
+        assert chain.index(100.0, "below") is None
+        assert chain.index(100.0, "nearest") is None
+
+
+class TestOptionChainIndex:
+    def test_pages_through_full_chain_once(self):
+        client = MagicMock()
+        client.get_option_contracts.side_effect = [
+            _chain_response([220, 230], next_page_token="p2"),
+            _chain_response([200, 210]),
+        ]
+        index = OptionChainIndex(client)
+        for price in (195.0, 205.0, 225.0):
+            index.select("AAPL", EXPIRATION, ContractType.CALL, price)
+        contract = index.select("AAPL", EXPIRATION, ContractType.CALL, 211.0)
+        assert contract.strike_price == 220.0
+        assert client.get_option_contracts.call_count == 2
+        request = client.get_option_contracts.call_args.args[0]
+        assert request.page_token == "p2"
+        assert request.strike_price_gte is None
+
+    def test_keyed_by_type(self):
+        client = MagicMock()
+        client.get_option_contracts.side_effect = lambda req: _chain_response(
+            [200, 210], option_type="C" if req.type == ContractType.CALL else "P"
+        )
+        index = OptionChainIndex(client)
+        call = index.select("AAPL", EXPIRATION, ContractType.CALL, 205.0)
+        put = index.select("AAPL", EXPIRATION, ContractType.PUT, 205.0, "below")
+        assert call.symbol == "AAPL250926C00210000"
+        assert put.symbol == "AAPL250926P00200000"
+        assert client.get_option_contracts.call_count == 2
+
+    def test_rolls_to_new_expiration(self):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _chain_response([200, 210])
+        index = OptionChainIndex(client)
+        index.chain("AAPL", EXPIRATION, ContractType.CALL)
+        index.chain("SPY", EXPIRATION, ContractType.CALL)
+        index.chain("AAPL", date(2025, 10, 3), ContractType.CALL)
+        assert set(index._chains) == {
+            ("SPY", EXPIRATION, ContractType.CALL),
+            ("AAPL", date(2025, 10, 3), ContractType.CALL),
+        }
+
+    def test_invalidate(self):
+        client = MagicMock()
+        client.get_option_contracts.return_value = _chain_response([200, 210])
+        index = OptionChainIndex(client)
+        index.chain("AAPL", EXPIRATION, ContractType.CALL)
+        index.invalidate("AAPL")
+        index.chain("AAPL", EXPIRATION, ContractType.CALL)
+        assert client.get_option_contracts.call_count == 2
+
+
+class TestContractRecord:
+    def test_raw_pages(self):
+        contracts = FakeAlpacaServer._contract("AAPL", EXPIRATION, "call", 200), {
+            **FakeAlpacaServer._contract("AAPL", EXPIRATION, "call", 210),
+            "open_interest": "42",
+        }
+        client = MagicMock()
+        client.get_option_contracts.side_effect = [
+            {"option_contracts": [contracts[1]], "next_page_token": "p2"},
+            {"option_contracts": [contracts[0]], "next_page_token": None},
+        ]
+        records = list(iter_option_contracts(client, underlying_symbols=["AAPL"]))
+        assert all(isinstance(r, ContractRecord) for r in records)
+        chain = OptionChain.from_contracts(records)
+        assert chain.symbols == ["AAPL250926C00200000", "AAPL250926C00210000"]
+        assert (chain.contracts[1].expiration_date, chain.contracts[1].open_interest) == (
+            EXPIRATION,
+            "42",
+        )
+
+    def test_models_restored_as_records(self):
+        client = MagicMock()
+        client.get_option_contracts.return_value = MagicMock(
+            option_contracts=[
+                OptionContract(**FakeAlpacaServer._contract("AAPL", EXPIRATION, "call", strike))
+                for strike in (200, 210)
+            ],
+            next_page_token=None,
+        )
+        index = OptionChainIndex(client)
+        index.chain("AAPL", EXPIRATION, ContractType.CALL)
+        restored = OptionChainIndex(MagicMock())
+        assert restored.restore(index.to_list(), EXPIRATION) == 1
+        contract = restored.select("AAPL", EXPIRATION, ContractType.CALL, 205.0)
+        assert isinstance(contract, ContractRecord)
+        assert (contract.symbol, contract.strike_price) == ("AAPL250926C00210000", 210.0)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from alpaca.trading.enums import AssetClass, PositionSide
+from alpaca.trading.models import Position, TradeAccount
+
+from src.occ import occ_underlying
+from src.portfolio import PortfolioSnapshot, PositionRecord
+from tests.fakes import position_payload
+
+
+def make_position(symbol: str, qty: str, side=PositionSide.LONG, price: str = "1.0"):
+    asset_class = AssetClass.US_OPTION if occ_underlying(symbol) else AssetClass.US_EQUITY
+    return MagicMock(
+        symbol=symbol, qty=qty, side=side, current_price=price, asset_class=asset_class
+    )
+
+
+def make_snapshot(positions=(), prices=None, cash: str = "50000", currency: str = "USD"):
+    account = MagicMock(spec=TradeAccount, currency=currency, cash=cash, equity="100000")
+    return PortfolioSnapshot(
+        account=account, positions=list(positions), prices=prices or {"AAPL": 200.0}
+    )
+
+
+class TestPortfolioSnapshot:
+    def test_fetch_makes_three_concurrent_calls(self):
+        in_flight, peak = 0, 0
+
+        def call(result):
+            async def side_effect(*args):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return result
+
+            return side_effect
+
+        client = AsyncMock()
+        client.get_account.side_effect = call(MagicMock(spec=TradeAccount))
+        client.get_all_positions.side_effect = call([])
+        client.get_stock_latest_trade.side_effect = call(
+            {"AAPL": MagicMock(price=200.0), "SPY": MagicMock(price=500.0)}
+        )
+        snapshot = asyncio.run(PortfolioSnapshot.fetch(client, ["AAPL", "SPY"]))
+        assert snapshot.prices == {"AAPL": 200.0, "SPY": 500.0}
+        assert len(client.method_calls) == 3
+        assert peak == 3
+
+    def test_options_indexed_by_underlying(self):
+        snapshot = make_snapshot(
+            [
+                PositionRecord("AAPL", 100, 201.5),
+                PositionRecord("A250926P00120000", -1, 1.0, "us_option"),
+            ]
+        )
+        assert snapshot.has_options("A")
+        assert not snapshot.has_options("AAPL")  # prefix of the ticker is not a match
+        assert [p.symbol for p in snapshot.holdings.options("A")] == ["A250926P00120000"]
+
+    def test_holdings(self):
+        snapshot = make_snapshot(
+            [
+                PositionRecord("AAPL", 100, 201.5),
+                PositionRecord("AAPL250926C00210000", -1, 2.5, "us_option"),
+            ],
+            prices={"AAPL": 200.0, "SPY": 500.25},
+        )
+        holdings = snapshot.holdings
+        assert holdings.qty("USD") == 50000.0
+        assert holdings.qty("AAPL") == 100.0
+        assert holdings.qty("SPY") == 0.0
+        assert holdings.qty("MSFT") == 0.0
+        assert holdings.to_dict() == {
+            "USD": {"qty": "50000", "price": "1"},
+            "AAPL": {"qty": "100", "price": "201.5"},
+            "SPY": {"qty": "0", "price": "500.25"},
+            "AAPL250926C00210000": {"qty": "-1", "price": "2.5"},
+        }
+
+    def test_raw_positions_match_models(self):
+        payloads = [
+            position_payload("AAPL", 100, 201.5),
+            position_payload("AAPL250926C00210000", -1, 2.5),
+        ]
+        models = [PositionRecord.from_model(Position(**p)) for p in payloads]
+        records = [PositionRecord.from_raw(p) for p in payloads]
+        assert [r.to_dict() for r in records] == [m.to_dict() for m in models]
+        assert [(r.qty, r.underlying) for r in records] == [(100.0, None), (-1.0, "AAPL")]
+
+    def test_dict_roundtrip_restores_records(self):
+        snapshot = make_snapshot(
+            [PositionRecord.from_model(Position(**position_payload("AAPL", 100, 201.5)))]
+        )
+        snapshot.account = TradeAccount(
+            id="00000000-0000-0000-0000-000000000001",
+            account_number="PA0000000",
+            status="ACTIVE",
+            cash="50000",
+        )
+        restored = PortfolioSnapshot.from_dict(snapshot.to_dict())
+        assert isinstance(restored.positions[0], PositionRecord)
+        assert restored.holdings.to_dict() == snapshot.holdings.to_dict()
+
+
+class TestPositionRecord:
+    @pytest.mark.parametrize(
+        "qty, side, expected",
+        [
+            ("20", PositionSide.SHORT, -20.0),
+            ("-20", PositionSide.SHORT, -20.0),  # already negative
+            ("100", PositionSide.LONG, 100.0),
+        ],
+    )
+    def test_short_is_negative(self, qty, side, expected):
+        assert PositionRecord.from_model(make_position("AAPL", qty, side)).qty == expected
+
+    def test_missing_price(self):
+        record = PositionRecord.from_model(make_position("AAPL", "100", price=None))
+        assert record.price is None
+        assert PositionRecord.from_raw(record.to_dict()).price is None
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import timeit
+
+import numpy as np
+import pytest
+
+from src.pricing import black_scholes, delta_index, greeks, implied_volatility
+
+SPOT, RATE, YEARS = 100.0, 0.04, 14 / 365
+STRIKES = np.linspace(50, 150, 301)
+
+
+def smile(strikes: np.ndarray) -> np.ndarray:
+    return 0.2 + 0.3 * np.abs(np.log(strikes / SPOT))
+
+
+class TestBlackScholes:
+    def test_reference_value(self):
+        call = black_scholes(np.array(100.0), np.array(100.0), np.array(1.0), 0.2, 0.05, True)
+        assert call == pytest.approx(10.4506, abs=1e-3)
+
+    def test_put_call_parity(self):
+        spot, strike, years = np.array(100.0), np.linspace(80, 120, 9), np.array(0.1)
+        call = black_scholes(spot, strike, years, 0.3, 0.04, call=True)
+        put = black_scholes(spot, strike, years, 0.3, 0.04, call=False)
+        np.testing.assert_allclose(call - put, spot - strike * np.exp(-0.04 * years), atol=1e-5)
+
+    def test_mixed_types(self):
+        call = STRIKES > SPOT
+        mixed = black_scholes(SPOT, STRIKES, YEARS, 0.3, RATE, call)
+        np.testing.assert_allclose(
+            mixed[call], black_scholes(SPOT, STRIKES, YEARS, 0.3, RATE, True)[call]
+        )
+        np.testing.assert_allclose(
+            mixed[~call], black_scholes(SPOT, STRIKES, YEARS, 0.3, RATE, False)[~call]
+        )
+
+
+class TestImpliedVolatility:
+    @pytest.mark.parametrize("call", [True, False])
+    def test_roundtrip(self, call):
+        vol = smile(STRIKES)
+        price = black_scholes(SPOT, STRIKES, YEARS, vol, RATE, call)
+        iv = implied_volatility(price, SPOT, STRIKES, YEARS, RATE, call)
+        solved = ~np.isnan(iv)
+        assert solved.sum() > 50
+        np.testing.assert_allclose(iv[solved], vol[solved], atol=1e-5)
+
+    def test_out_of_bounds_prices_are_nan(self):
+        strikes = np.array([90.0, 100.0, 110.0, 120.0, 100.0])
+        prices = np.array([9.0, 120.0, 0.001, np.nan, 3.0])  # under intrinsic, over spot, ...
+        iv = implied_volatility(prices, SPOT, strikes, YEARS, RATE, True)
+        assert np.isnan(iv[:4]).all()
+        assert 0 < iv[4] < 1
+
+    def test_expired_is_nan(self):
+        assert np.isnan(implied_volatility(np.array([1.0]), SPOT, np.array([100.0]), 0, RATE, True))
+
+
+class TestGreeks:
+    def test_finite_differences(self):
+        strikes, vol = np.array([90.0, 100.0, 110.0]), np.array([0.25, 0.3, 0.35])
+        call = np.array([False, True, True])
+        price = black_scholes(SPOT, strikes, YEARS, vol, RATE, call)
+        result = greeks(price, SPOT, strikes, YEARS, RATE, call)
+
+        def bs(spot=SPOT, years=YEARS, v=vol):
+            return black_scholes(spot, strikes, years, v, RATE, call)
+
+        h = 0.01
+        np.testing.assert_allclose(result.iv, vol, atol=1e-6)
+        delta = (bs(SPOT + h) - bs(SPOT - h)) / (2 * h)
+        np.testing.assert_allclose(result.delta, delta, atol=1e-4)
+        np.testing.assert_allclose(
+            result.gamma, (bs(SPOT + h) - 2 * bs() + bs(SPOT - h)) / h**2, rtol=1e-2
+        )
+        np.testing.assert_allclose(result.vega, bs(v=vol + 0.005) - bs(v=vol - 0.005), rtol=1e-3)
+        dt = 1e-4
+        theta = (bs(years=YEARS - dt) - bs(years=YEARS + dt)) / (2 * dt * 365)
+        np.testing.assert_allclose(result.theta, theta, rtol=1e-3)
+
+    def test_delta_index(self):
+        assert delta_index(np.array([0.6, 0.35, 0.22, 0.1, np.nan]), 0.2) == 2
+        assert delta_index(np.array([-0.5, -0.25, -0.1]), 0.2) == 1
+        assert delta_index(np.full(3, np.nan), 0.2) is None
+
+    @pytest.mark.timing
+    def test_scores_a_chain_well_under_a_millisecond(self):
+        call = STRIKES > SPOT
+        price = black_scholes(SPOT, STRIKES, YEARS, smile(STRIKES), RATE, call)
+        best = min(
+            timeit.repeat(
+                lambda: greeks(price, SPOT, STRIKES, YEARS, RATE, call), number=20, repeat=10
+            )
+        )
+        assert best / 20 < 1e-3
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.rate_limit import RetryPolicy, TokenBucket, request_deadline, shared_bucket, time_left
+
+
+class TestTokenBucket:
+    def test_never_exceeds_the_quota_in_a_minute(self):
+        with patch("src.rate_limit.time.monotonic", return_value=0.0):
+            bucket = TokenBucket.per_minute(190, 20)
+            waits = [bucket.reserve() for _ in range(400)]
+        assert waits[:20] == [0.0] * 20
+        in_first_minute = sum(1 for w in waits if w < 60)
+        assert 185 < in_first_minute <= 190  # just under the quota, never over
+        assert waits == sorted(waits)
+
+    def test_refills_over_time(self):
+        with patch("src.rate_limit.time.monotonic", return_value=0.0):
+            bucket = TokenBucket(rate=10, capacity=2)
+            assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.1)]
+        with patch("src.rate_limit.time.monotonic", return_value=1.0):
+            assert bucket.reserve() == 0.0
+
+    def test_shared_by_api_key(self):
+        assert shared_bucket("key-a", 190, 20) is shared_bucket("key-a", 190, 20)
+        assert shared_bucket("key-a", 190, 20) is not shared_bucket("key-b", 190, 20)
+
+    def test_acquire_waits_for_its_slot(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+
+        async def acquire_all():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+            return loop.time() - start
+
+        assert asyncio.run(acquire_all()) == pytest.approx(0.05, abs=0.03)
+
+
+class TestRetryPolicy:
+    def test_jittered_exponential_backoff(self):
+        policy = RetryPolicy(backoff=0.5, max_backoff=3.0)
+        for attempt, cap in [(0, 0.5), (1, 1.0), (2, 2.0), (5, 3.0)]:
+            delays = [policy.delay(attempt) for _ in range(200)]
+            assert all(0 <= d <= cap for d in delays)
+            assert max(delays) > cap / 2  # spread over the whole range
+
+
+class TestRequestDeadline:
+    def test_scoped_to_the_context(self):
+        assert time_left() == float("inf")
+        with request_deadline(10):
+            assert 9 < time_left() <= 10
+            with request_deadline(None):
+                assert time_left() == float("inf")
+            results = []
+            thread = threading.Thread(target=lambda: results.append(time_left()))
+            thread.start()
+            thread.join()
+            assert results == [float("inf")]  # plain threads don't inherit it
+        assert time_left() == float("inf")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.triggers.cron import CronTrigger
+
+from src.async_client import AsyncAlpacaClient, BlockingAlpacaClient
+from src.market_calendar import MARKET_TZ, TradingCalendar
+from src.schemas import SchedulerSettings
+from src.scheduler import (
+    MAX_SCHEDULER_WAIT,
+    SafeBlockingScheduler,
+    SessionTrigger,
+    job_executors,
+    job_options,
+    job_trigger,
+)
+from tests.fakes import FakeAlpacaServer
+
+JOBS = ["trade_options", "check_value"]
+
+
+class RecordingScheduler(SafeBlockingScheduler):
+    """Records the waits of the main loop, with `_process_jobs` returning `next_waits`."""
+
+    def __init__(self, next_waits: list[float | None]) -> None:
+        super().__init__()
+        self.next_waits = next_waits
+        self.waits: list[float] = []
+
+    def _process_jobs(self):  # type: ignore[override]
+        if not self.next_waits:
+            self.shutdown(wait=False)
+            return None
+        return self.next_waits.pop(0)
+
+    def wakeup(self):
+        pass
+
+
+class RecordingEvent(threading.Event):
+    def __init__(self, waits: list[float]) -> None:
+        super().__init__()
+        self.waits = waits
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return True
+
+
+class TestMainLoop:
+    def test_due_job_is_not_deferred_by_the_cap(self):
+        scheduler = RecordingScheduler([0, 2 * MAX_SCHEDULER_WAIT, None, 5.0])
+        scheduler._event = RecordingEvent(scheduler.waits)
+        scheduler.start()
+        assert scheduler.waits == [
+            MAX_SCHEDULER_WAIT,
+            0,
+            MAX_SCHEDULER_WAIT,
+            MAX_SCHEDULER_WAIT,
+            5.0,
+        ]
+
+
+class TestExecutors:
+    def test_per_job_pools(self):
+        settings = SchedulerSettings()
+        settings.check_value.max_instances = 2
+        executors = job_executors(settings, JOBS)
+        assert set(executors) == {"default", "trade_options", "check_value"}
+        assert all(isinstance(e, ThreadPoolExecutor) for e in executors.values())
+        assert job_options(settings, "check_value") == {
+            "id": "check_value",
+            "name": "check_value",
+            "executor": "check_value",
+            "max_instances": 2,
+            "coalesce": True,
+            "misfire_grace_time": 60,
+        }
+
+    def test_shared_pool(self):
+        settings = SchedulerSettings(executors="shared")
+        assert set(job_executors(settings, JOBS)) == {"default"}
+        assert job_options(settings, "trade_options")["executor"] == "default"
+
+    def test_blocked_trade_does_not_delay_value_check(self):
+        settings = SchedulerSettings()
+        scheduler = SafeBlockingScheduler(executors=job_executors(settings, JOBS))
+        release, checked = threading.Event(), threading.Event()
+        now = datetime.now()
+        scheduler.add_job(
+            release.wait,
+            "date",
+            run_date=now,
+            args=[5],
+            **job_options(settings, "trade_options"),
+        )
+        scheduler.add_job(
+            checked.set,
+            "date",
+            run_date=now + timedelta(seconds=0.1),
+            **job_options(settings, "check_value"),
+        )
+        thread = threading.Thread(target=scheduler.start, daemon=True)
+        thread.start()
+        try:
+            assert checked.wait(2)  # while trade_options still holds its executor
+        finally:
+            release.set()
+            scheduler.shutdown()
+            thread.join(5)
+
+
+@pytest.fixture
+def trading_calendar():
+    # Thanksgiving 2026 is closed, and the market closes at 13:00 the day after
+    with FakeAlpacaServer(
+        {}, holidays={date(2026, 11, 26)}, early_closes={date(2026, 11, 27)}
+    ) as server:
+        client = BlockingAlpacaClient(
+            AsyncAlpacaClient("fake", "fake", trading_url=server.url, data_url=server.url)
+        )
+        yield TradingCalendar(client), server
+        client.close()
+
+
+def _fire_times(trigger, start: datetime, end: datetime) -> list[datetime]:
+    times, fire_time = [], trigger.get_next_fire_time(None, start)
+    while fire_time is not None and fire_time < end:
+        times.append(fire_time)
+        fire_time = trigger.get_next_fire_time(fire_time, fire_time)
+    return times
+
+
+class TestSessionTrigger:
+    def test_skips_holiday_and_early_close(self, trading_calendar):
+        calendar, server = trading_calendar
+        trigger = SessionTrigger("every 1h from open+30m", calendar, MARKET_TZ)
+        times = _fire_times(
+            trigger,
+            MARKET_TZ.localize(datetime(2026, 11, 25, 12, 30)),
+            MARKET_TZ.localize(datetime(2026, 12, 1)),
+        )
+        assert [t.strftime("%a %H:%M") for t in times] == [
+            *(f"Wed {h}:00" for h in range(13, 17)),
+            *(f"Fri {h}:00" for h in range(10, 14)),
+            *(f"Mon {h}:00" for h in range(10, 17)),
+        ]
+        # November, and December for the run after Monday's close
+        assert server.requests == [("GET", "/v2/calendar")] * 2
+
+    def test_no_requests_once_the_month_is_cached(self, trading_calendar):
+        calendar, server = trading_calendar
+        trigger = SessionTrigger("open+29m", calendar, MARKET_TZ)
+        times = _fire_times(
+            trigger,
+            MARKET_TZ.localize(datetime(2026, 11, 1)),
+            MARKET_TZ.localize(datetime(2026, 11, 30)),
+        )
+        assert len(times) == 19  # 20 weekdays less Thanksgiving
+        assert all(t.strftime("%H:%M") == "09:59" for t in times)
+        assert len(server.requests) == 1
+
+    def test_job_trigger(self):
+        calendar = TradingCalendar(None)
+        assert isinstance(job_trigger("close-10m", MARKET_TZ, calendar), SessionTrigger)
+        assert isinstance(job_trigger("59 9 * * 1-5", MARKET_TZ, calendar), CronTrigger)
@@ -56,6 +56,14 @@ class TestSettings:
         with pytest.raises(ValidationError, match="Invalid cron pattern"):
             Settings(**{**VALID_SETTINGS, "trade_options_schedule": "not a cron"})
 
+    def test_session_schedule_valid(self):
+        s = Settings(**{**VALID_SETTINGS, "check_value_schedule": "every 1h from open+30m"})
+        assert s.check_value_schedule == "every 1h from open+30m"
+
+    def test_session_schedule_invalid(self):
+        with pytest.raises(ValidationError, match="Invalid session schedule"):
+            Settings(**{**VALID_SETTINGS, "trade_options_schedule": "open-5m"})
+
     def test_margin_bounds(self):
         Settings(**{**VALID_SETTINGS, "call_option_margin": 0.99})
         Settings(**{**VALID_SETTINGS, "call_option_margin": -0.99})
@@ -66,6 +74,34 @@ class TestSettings:
         with pytest.raises(ValidationError):
             Settings(**{**VALID_SETTINGS, "put_option_margin": -1.0})
 
+    def test_single_ticker_expands_to_tickers(self):
+        s = Settings(**VALID_SETTINGS)
+        assert [t.ticker for t in s.tickers] == ["AAPL"]
+        assert s.tickers[0].call_option_margin == 0.05
+
+    def test_tickers_inherit_margins(self):
+        data = {k: v for k, v in VALID_SETTINGS.items() if k != "ticker"}
+        s = Settings(**data, tickers=["SPY", {"ticker": "QQQ", "put_option_margin": 0.1}])
+        assert s.symbols == ["SPY", "QQQ"]
+        assert s.tickers[1].call_option_margin == 0.05
+        assert s.tickers[1].put_option_margin == 0.1
+
+    def test_tickers_without_default_margins(self):
+        s = Settings(
+            tickers=[{"ticker": "SPY", "call_option_margin": 0.02, "put_option_margin": 0.03}],
+            trade_options_schedule="59 9 * * 1-5",
+            check_value_schedule="0 10-16 * * 1-5",
+        )
+        assert s.tickers[0].put_option_margin == 0.03
+
+    def test_ticker_margin_out_of_range(self):
+        with pytest.raises(ValidationError):
+            Settings(**{**VALID_SETTINGS, "tickers": [{"ticker": "SPY", "call_option_margin": 1}]})
+
+    def test_duplicate_tickers(self):
+        with pytest.raises(ValidationError, match="Duplicate tickers"):
+            Settings(**{**VALID_SETTINGS, "tickers": ["SPY", "SPY"]})
+
     def test_missing_ticker(self):
         data = {**VALID_SETTINGS}
         del data["ticker"]
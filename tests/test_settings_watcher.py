@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from src.schemas import load_settings
+from src.settings_watcher import SettingsWatcher
+
+SETTINGS = {
+    "ticker": "AAPL",
+    "call_option_margin": 0.05,
+    "put_option_margin": 0.05,
+    "trade_options_schedule": "59 9 * * 1-5",
+    "check_value_schedule": "0 10-16 * * 1-5",
+}
+
+
+def write(path, text: str) -> None:
+    """Write in place and move the mtime on, as edits seconds apart would."""
+    with open(path, "w") as f:
+        f.write(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.changes: list = []
+        self.errors: list[str] = []
+        self.event = threading.Event()
+
+    def on_change(self, settings) -> None:
+        self.changes.append(settings)
+        self.event.set()
+
+    def on_error(self, msg: str) -> None:
+        self.errors.append(msg)
+        self.event.set()
+
+    def wait(self, timeout: float = 1.0) -> float:
+        start = time.monotonic()
+        assert self.event.wait(timeout), "no reload within a second"
+        self.event.clear()
+        return time.monotonic() - start
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text(yaml.safe_dump(SETTINGS))
+    return path
+
+
+def make_watcher(path, recorder: Recorder, **kwargs) -> SettingsWatcher:
+    return SettingsWatcher(
+        str(path), load_settings(str(path)), recorder.on_change, recorder.on_error, **kwargs
+    )
+
+
+class TestCheck:
+    def test_valid_edit(self, path):
+        recorder = Recorder()
+        watcher = make_watcher(path, recorder)
+        assert not watcher.check()
+        write(path, yaml.safe_dump({**SETTINGS, "call_option_margin": 0.08}))
+        assert watcher.check()
+        assert recorder.changes[0].tickers[0].call_option_margin == 0.08
+        assert watcher.settings is recorder.changes[0]
+
+    def test_same_settings_are_not_a_change(self, path):
+        recorder = Recorder()
+        watcher = make_watcher(path, recorder)
+        write(path, "# reformatted\n" + yaml.safe_dump(SETTINGS, default_flow_style=True))
+        assert watcher.check()
+        assert recorder.changes == [] and recorder.errors == []
+
+    @pytest.mark.parametrize(
+        "text", ["ticker: [unclosed", "- a list", yaml.safe_dump({**SETTINGS, "max_workers": 0})]
+    )
+    def test_invalid_edit_is_rejected(self, path, text):
+        recorder = Recorder()
+        watcher = make_watcher(path, recorder)
+        original = watcher.settings
+        write(path, text)
+        watcher.check()
+        assert recorder.changes == []
+        assert "keeping the current settings" in recorder.errors[0]
+        assert watcher.settings is original
+
+    def test_file_gone_while_being_replaced_is_read_again(self, path):
+        recorder = Recorder()
+        watcher = make_watcher(path, recorder)
+        write(path, yaml.safe_dump({**SETTINGS, "call_option_margin": 0.08}))
+        with patch(
+            "src.settings_watcher.load_settings",
+            side_effect=[SystemExit(f"{path} not found"), load_settings(str(path))],
+        ):
+            assert not watcher.check()
+            assert recorder.errors == [] and recorder.changes == []
+            assert watcher.check()
+        assert recorder.changes[0].tickers[0].call_option_margin == 0.08
+
+    def test_failure_to_apply_is_an_error(self, path):
+        def on_change(settings):
+            raise RuntimeError("no price")
+
+        recorder = Recorder()
+        recorder.on_change = on_change
+        watcher = make_watcher(path, recorder)
+        write(path, yaml.safe_dump({**SETTINGS, "ticker": "NOPE"}))
+        watcher.check()
+        assert recorder.errors == [f"Failed to apply the edit of {path}: no price"]
+        assert watcher.settings.symbols == ["AAPL"]
+
+
+class TestWatching:
+    def _edits_are_picked_up(self, path, watcher: SettingsWatcher, recorder: Recorder):
+        watcher.start()
+        try:
+            time.sleep(0.05)  # let the watches be set up
+            write(path, yaml.safe_dump({**SETTINGS, "check_value_schedule": "every 1h"}))
+            assert recorder.wait() < 1.0
+            assert recorder.changes[-1].check_value_schedule == "every 1h"
+
+            replacement = path.parent / "settings.yaml.tmp"  # as editors save
+            write(replacement, yaml.safe_dump({**SETTINGS, "put_option_margin": 0.1}))
+            os.replace(replacement, path)
+            assert recorder.wait() < 1.0
+            assert recorder.changes[-1].tickers[0].put_option_margin == 0.1
+
+            write(path, "ticker: [unclosed")
+            recorder.wait()
+            assert len(recorder.errors) == 1
+        finally:
+            watcher.stop()
+
+    def test_inotify(self, path):
+        recorder = Recorder()
+        self._edits_are_picked_up(path, make_watcher(path, recorder), recorder)
+
+    def test_polling_without_inotify(self, path):
+        recorder = Recorder()
+        watcher = make_watcher(path, recorder, poll_interval=0.05)
+        with patch("src.settings_watcher._Inotify", side_effect=OSError("unsupported")):
+            self._edits_are_picked_up(path, watcher, recorder)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_import import (
+    DUMMY_ENV,
+    ROOT,
+    check_config_args,
+    measure,
+    parse_importtime,
+    total_ms,
+)
+
+# about 3x what these take on a developer laptop, so only real regressions trip them
+CHECK_CONFIG_BUDGET_MS = 900
+BOT_IMPORT_BUDGET_MS = 3000
+SDK_PACKAGES = {"alpaca", "telegram", "pandas", "numpy", "httpx", "websockets"}
+
+
+def _sdk_packages(times) -> set[str]:
+    return {t.module.split(".")[0] for t in times} & SDK_PACKAGES
+
+
+@pytest.fixture
+def settings_path(tmp_path) -> str:
+    path = str(tmp_path / "settings.yaml")
+    shutil.copy(os.path.join(ROOT, "settings.example.yaml"), path)
+    return path
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       451 |      48256 |   pydantic.version\n"
+        "import time:      1312 |      49568 | pydantic\n"
+    )
+    times = parse_importtime(stderr)
+    assert [(t.module, t.depth) for t in times] == [("pydantic.version", 1), ("pydantic", 0)]
+    assert total_ms(times) == pytest.approx(1.763)
+
+
+def test_check_config_skips_the_sdks(settings_path):
+    assert _sdk_packages(measure(check_config_args(settings_path), repeat=1)) == set()
+
+
+def test_check_config_budget(settings_path, timing_headroom):
+    budget = CHECK_CONFIG_BUDGET_MS * timing_headroom
+    assert total_ms(measure(check_config_args(settings_path))) < budget
+
+
+def test_check_config_rejects_invalid_settings(settings_path):
+    with open(settings_path, "a") as f:
+        f.write("max_workers: 0\n")
+    result = subprocess.run(
+        [sys.executable, *check_config_args(settings_path)],
+        cwd=ROOT,
+        env={**os.environ, **DUMMY_ENV},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "max_workers" in result.stderr
+
+
+@pytest.mark.parametrize("module", ["src.journal", "src.backtest", "src.sweep"])
+def test_offline_tools_skip_the_sdks(module):
+    assert _sdk_packages(measure(["-c", f"import {module}"], repeat=1)) <= {"numpy"}
+
+
+def test_bot_import_budget(timing_headroom):
+    budget = BOT_IMPORT_BUDGET_MS * timing_headroom
+    assert total_ms(measure(["-c", "import src.bot"], repeat=2)) < budget
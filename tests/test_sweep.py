@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from src.backtest import PriceSeries, run_backtest
+from src.schemas import Settings
+from src.sweep import (
+    COLUMNS,
+    ColumnarWriter,
+    SharedPrices,
+    SweepSpace,
+    SweepTask,
+    pareto_frontier,
+    read_results,
+    run_sweep,
+    run_task,
+    ticker_settings,
+)
+from tests.test_alpaca_client import SETTINGS_KWARGS
+
+
+def make_space(**overrides):
+    return SweepSpace(
+        **{
+            "tickers": ["AAPL", "SPY"],
+            "call_margins": [0.02, 0.05, 0.1],
+            "put_margins": [0.03, 0.06],
+            "target_dtes": [None, 30],
+            **overrides,
+        }
+    )
+
+
+class TestSharedPrices:
+    def test_roundtrip(self):
+        prices = PriceSeries.synthetic(years=1, seed=3)
+        handle, shm = SharedPrices.create(prices)
+        try:
+            attached, view = handle.attach()
+            np.testing.assert_array_equal(attached.dates, prices.dates)
+            np.testing.assert_array_equal(attached.close, prices.close)
+            del attached
+            view.close()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_task_matches_direct_backtest(self):
+        prices = PriceSeries.synthetic(years=2, seed=3)
+        calls, puts = np.array([0.02, 0.08]), np.array([0.05, 0.01])
+        handle, shm = SharedPrices.create(prices)
+        try:
+            columns = run_task(SweepTask("AAPL", handle, 14, calls, puts))
+        finally:
+            shm.close()
+            shm.unlink()
+        expected = run_backtest(prices, calls, puts, target_dte=14)
+        np.testing.assert_allclose(columns["cagr"], expected.cagr)
+        assert columns["target_dte"].tolist() == [14, 14]
+
+
+class TestSweepSpace:
+    def test_grid(self):
+        groups = list(make_space().grid())
+        assert len(groups) == 2 * 2
+        assert sum(len(calls) for _, _, calls, _ in groups) == 4 * 3 * 2
+
+    def test_random(self):
+        groups = list(make_space().random(100, seed=1))
+        assert sum(len(calls) for _, _, calls, _ in groups) == 100
+        for _, _, calls, puts in groups:
+            assert calls.min() >= 0.02 and calls.max() <= 0.1
+            assert puts.min() >= 0.03 and puts.max() <= 0.06
+
+    def test_validates_against_ticker_settings(self):
+        settings = Settings(**SETTINGS_KWARGS)
+        make_space().validate(settings)
+        with pytest.raises(ValidationError):
+            make_space(put_margins=[0.5, 1.0]).validate(settings)
+        with pytest.raises(ValidationError):
+            make_space(target_dtes=[-7]).validate(settings)
+
+
+def test_pareto_frontier():
+    total_return = np.array([0.5, 0.3, 0.8, 0.2, 0.8])
+    max_drawdown = np.array([0.2, 0.1, 0.3, 0.15, 0.4])
+    # row 3 is beaten by row 1, row 4 by row 2
+    assert pareto_frontier(total_return, max_drawdown).tolist() == [1, 0, 2]
+
+
+def test_columnar_roundtrip(tmp_path):
+    path = str(tmp_path / "out.npz")
+    chunk = {
+        "ticker": np.array(["AAPL", "AAPL"]),
+        "call_option_margin": np.array([0.01, 0.02]),
+        "put_option_margin": np.array([0.03, 0.04]),
+        "target_dte": np.array([-1, 30]),
+        "total_return": np.array([0.1, 0.2]),
+        "cagr": np.array([0.01, 0.02]),
+        "max_drawdown": np.array([0.05, 0.06]),
+        "assignments": np.array([1, 2]),
+        "premiums": np.array([100.0, 200.0]),
+    }
+    with ColumnarWriter(path) as out:
+        out.append(chunk)
+        out.append({**chunk, "ticker": np.array(["SPY", "SPY"])})
+    results = read_results(path)
+    assert list(results) == list(COLUMNS)
+    assert results["ticker"].tolist() == ["AAPL", "AAPL", "SPY", "SPY"]
+    with np.load(path) as npz:
+        assert npz["premiums"].tolist() == [100.0, 200.0, 100.0, 200.0]
+    assert not os.path.exists(f"{path}.partial")
+    assert results["target_dte"].tolist() == [-1, 30, -1, 30]
+    assert ticker_settings(results, 0).target_dte is None
+    assert ticker_settings(results, 1).model_dump(exclude_defaults=True) == {
+        "ticker": "AAPL",
+        "call_option_margin": 0.02,
+        "put_option_margin": 0.04,
+        "target_dte": 30,
+    }
+
+
+def test_run_sweep(tmp_path):
+    prices = {t: PriceSeries.synthetic(years=2, seed=i) for i, t in enumerate(["AAPL", "SPY"])}
+    path = str(tmp_path / "sweep.npz")
+    rows = run_sweep(prices, make_space().grid(), path, max_workers=2, chunk_size=4)
+    assert rows == 2 * 2 * 3 * 2
+    results = read_results(path)
+    assert len(results["cagr"]) == rows
+    assert set(results["ticker"].tolist()) == {"AAPL", "SPY"}
+
+    i = int(np.flatnonzero((results["ticker"] == "SPY") & (results["target_dte"] == 30))[0])
+    expected = run_backtest(
+        prices["SPY"],
+        results["call_option_margin"][i : i + 1],
+        results["put_option_margin"][i : i + 1],
+        target_dte=30,
+    )
+    assert results["cagr"][i] == pytest.approx(expected.cagr[0])
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 from unittest.mock import AsyncMock, patch
 
+from telegram.error import RetryAfter, TimedOut
+
 from src.schemas import TelegramEnv
-from src.telegram_bot import TelegramBot
+from src.telegram_bot import MAX_MESSAGE_LENGTH, TelegramBot
 
 
 class TestTelegramBot:
     def setup_method(self):
         with patch("src.telegram_bot.telegram.Bot"):
-            self.bot = TelegramBot(TelegramEnv(bot_token="tok", chat_id="123"))
+            self.bot = TelegramBot(
+                TelegramEnv(bot_token="tok", chat_id="123"),
+                coalesce_window=0.05,
+                min_send_interval=0,
+            )
             self.bot.bot = AsyncMock()
 
+    def teardown_method(self):
+        self.bot.close(timeout=5)
+
+    def sent_texts(self):
+        return [c.kwargs["text"] for c in self.bot.bot.send_message.call_args_list]
+
     def test_send_message_formats_html(self):
         self.bot.send_message("hello <world>")
+        assert self.bot.flush(timeout=5)
         self.bot.bot.send_message.assert_called_once_with(
             chat_id="123",
             text="<code>hello &lt;world&gt;</code>",
@@ -23,9 +39,93 @@ class TestTelegramBot:
 
     def test_send_message_silent(self):
         self.bot.send_message("test", silent=True)
+        self.bot.flush(timeout=5)
         call_kwargs = self.bot.bot.send_message.call_args[1]
         assert call_kwargs["disable_notification"] is True
 
     def test_send_message_error_does_not_raise(self):
         self.bot.bot.send_message.side_effect = Exception("network error")
         self.bot.send_message("test")  # should not raise
+        assert self.bot.flush(timeout=5)
+
+    def test_send_message_does_not_wait_for_telegram(self):
+        release = threading.Event()
+        delivered = []
+
+        async def slow_send(**kwargs):
+            await asyncio.to_thread(release.wait, 5)
+            delivered.append(kwargs["text"])
+
+        self.bot.bot.send_message.side_effect = slow_send
+        self.bot.send_message("test")
+        assert delivered == []  # returned while Telegram still holds the send
+        release.set()
+        assert self.bot.flush(timeout=5)
+        assert delivered == ["<code>test</code>"]
+
+    def test_session_initialized_once(self):
+        for msg in ["a", "b"]:
+            self.bot.send_message(msg)
+            self.bot.flush(timeout=5)
+        self.bot.bot.initialize.assert_awaited_once()
+        assert self.bot.bot.send_message.await_count == 2
+
+    def test_connect_opens_session_ahead_of_first_message(self):
+        self.bot.connect().result(timeout=5)
+        self.bot.bot.initialize.assert_awaited_once()
+        self.bot.send_message("a")
+        self.bot.flush(timeout=5)
+        self.bot.bot.initialize.assert_awaited_once()
+
+    def test_burst_is_coalesced(self):
+        self.bot.send_message("🤝 trade")
+        self.bot.send_message("💰 positions", silent=True)
+        self.bot.send_message("💲 value")
+        self.bot.flush(timeout=5)
+        assert self.sent_texts() == ["<code>🤝 trade\n\n💰 positions\n\n💲 value</code>"]
+        assert self.bot.bot.send_message.call_args.kwargs["disable_notification"] is False
+
+    def test_coalescing_respects_length_limit(self):
+        long_msg = "x" * (MAX_MESSAGE_LENGTH // 3)
+        for _ in range(3):
+            self.bot.send_message(long_msg)
+        self.bot.flush(timeout=5)
+        assert len(self.sent_texts()) == 2
+        assert all(len(text) <= MAX_MESSAGE_LENGTH for text in self.sent_texts())
+
+    def test_retries_after_flood_control(self):
+        self.bot.bot.send_message.side_effect = [RetryAfter(0), None]
+        self.bot.send_message("test")
+        self.bot.flush(timeout=5)
+        assert self.bot.bot.send_message.await_count == 2
+
+    def test_backs_off_on_network_errors(self):
+        self.bot.bot.send_message.side_effect = [TimedOut(), TimedOut(), None]
+        with patch("src.telegram_bot.BACKOFF_BASE", 0.01):
+            self.bot.send_message("test")
+            self.bot.flush(timeout=5)
+        assert self.bot.bot.send_message.await_count == 3
+
+    def test_gives_up_after_max_retries(self):
+        self.bot.bot.send_message.side_effect = TimedOut()
+        with patch("src.telegram_bot.BACKOFF_BASE", 0), patch("src.telegram_bot.MAX_RETRIES", 3):
+            self.bot.send_message("test")
+            assert self.bot.flush(timeout=5)
+        assert self.bot.bot.send_message.await_count == 3
+
+    def test_sends_are_spaced_out(self):
+        self.bot.min_send_interval = 0.2
+        self.bot.coalesce_window = 0
+        sent_at = []
+        self.bot.bot.send_message.side_effect = lambda **kw: sent_at.append(time.monotonic())
+        for msg in ["a", "b", "c"]:
+            self.bot.send_message(msg)
+        self.bot.flush(timeout=5)
+        assert len(sent_at) == 3
+        assert all(b - a >= 0.19 for a, b in zip(sent_at, sent_at[1:]))
+
+    def test_close_delivers_pending_messages(self):
+        self.bot.send_message("bye")
+        self.bot.close(timeout=5)
+        assert self.sent_texts() == ["<code>bye</code>"]
+        self.bot.bot.shutdown.assert_awaited_once()
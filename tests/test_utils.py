@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from src import utils
+from src.utils import JsonFormatter, _MonthlyRotatingHandler, _next_month, cached_property_ttl
+
+
+class Counter:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+        self.gate: threading.Event | None = None  # holds computations until set
+
+    def compute(self) -> int:
+        time.sleep(self.delay)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("boom")
+        self.calls += 1
+        return self.calls
+
+
+class Cached(Counter):
+    @cached_property_ttl(ttl=60)
+    def value(self) -> int:
+        return self.compute()
+
+
+class Expiring(Counter):
+    @cached_property_ttl(ttl=0.1)
+    def value(self) -> int:
+        return self.compute()
+
+
+class Revalidating(Counter):
+    @cached_property_ttl(ttl=0.3, stale=60)
+    def value(self) -> int:
+        return self.compute()
+
+
+class TestCachedPropertyTTL:
+    def test_caches_within_ttl(self):
+        obj = Cached()
+        assert [obj.value, obj.value] == [1, 1]
+        assert Cached.value.stats(obj) == {
+            "hits": 1,
+            "stale_hits": 0,
+            "misses": 1,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    def test_expires_after_ttl(self):
+        obj = Expiring()
+        assert obj.value == 1
+        time.sleep(0.15)
+        assert obj.value == 2
+
+    def test_instances_are_independent(self):
+        a, b = Cached(), Cached()
+        assert (a.value, b.value) == (1, 1)
+        Cached.value.invalidate(a)
+        assert (a.value, b.value) == (2, 1)
+
+    def test_single_flight(self):
+        obj = Cached(delay=0.1)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            values = list(pool.map(lambda _: obj.value, range(8)))
+        assert values == [1] * 8
+        assert obj.calls == 1
+        stats = Cached.value.stats(obj)
+        assert stats["misses"] == 1 and stats["hits"] == 7
+
+    def test_invalidate(self):
+        obj = Cached()
+        assert obj.value == 1
+        Cached.value.invalidate(obj)
+        assert obj.value == 2
+
+    def test_invalidate_discards_refresh_in_flight(self):
+        obj = Cached(delay=0.2)
+        reader = threading.Thread(target=lambda: obj.value)
+        reader.start()
+        time.sleep(0.05)
+        Cached.value.invalidate(obj)  # e.g. an order was placed mid-fetch
+        reader.join()
+        assert obj.value == 2
+
+    def test_refresh(self):
+        obj = Cached()
+        assert obj.value == 1
+        assert Cached.value.refresh(obj) == 2
+        assert obj.value == 2
+        assert Cached.value.stats(obj)["refreshes"] == 1
+
+    def test_errors_are_not_cached(self):
+        obj = Cached()
+        obj.fail = True
+        with pytest.raises(RuntimeError):
+            obj.value  # noqa: B018
+        obj.fail = False
+        assert obj.value == 1
+        assert Cached.value.stats(obj)["errors"] == 1
+
+    def test_stale_while_revalidate(self):
+        obj = Revalidating()
+        assert obj.value == 1
+        time.sleep(0.35)
+        obj.gate = threading.Event()
+        assert obj.value == 1  # stale, served while the refresh is held
+        assert obj.value == 1  # refresh already running, not started again
+        assert Revalidating.value.stats(obj)["stale_hits"] == 2
+        obj.gate.set()
+        for _ in range(100):
+            if Revalidating.value.peek(obj) == 2:
+                break
+            time.sleep(0.01)
+        assert obj.value == 2
+        assert obj.calls == 2
+        assert Revalidating.value.stats(obj)["refreshes"] == 1
+
+    def test_failed_revalidation_keeps_stale_value(self):
+        obj = Revalidating()
+        assert obj.value == 1
+        time.sleep(0.35)
+        obj.fail = True
+        assert obj.value == 1
+        time.sleep(0.1)
+        assert obj.value == 1
+        assert Revalidating.value.stats(obj)["errors"] >= 1
+
+    def test_seeded_value_is_served_stale_until_refreshed(self):
+        obj = Cached(delay=0.1)
+        Cached.value.seed(obj, 0, age=3600)  # e.g. restored from disk, past the TTL
+        assert Cached.value.peek(obj) == 0
+        Cached.value.revalidate(obj)
+        assert obj.value == 0
+        time.sleep(0.15)
+        assert obj.value == 1
+        assert obj.calls == 1
+
+    def test_seeded_value_is_dropped_when_its_refresh_fails(self):
+        obj = Cached()
+        obj.fail = True
+        Cached.value.seed(obj, 0, age=3600)
+        with pytest.raises(RuntimeError):
+            for _ in range(100):  # served stale until the background refresh fails
+                assert obj.value == 0
+                time.sleep(0.01)
+        obj.fail = False
+        assert obj.value == 1
+
+    def test_seeded_value_within_ttl_is_a_hit(self):
+        obj = Cached()
+        Cached.value.seed(obj, 0, age=1)
+        assert obj.value == 0
+        assert obj.calls == 0
+
+    def test_fresh_never_serves_stale(self):
+        obj = Cached()
+        Cached.value.seed(obj, 0, age=3600)
+        assert Cached.value.fresh(obj) == 1
+        assert Cached.value.fresh(obj) == 1
+        assert obj.calls == 1
+
+    def test_instance_assignment_shadows_descriptor(self):
+        obj = Cached()
+        obj.value = 42  # tests stub cached properties this way
+        assert obj.value == 42
+
+
+def _record(msg: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord("root", logging.INFO, __file__, 1, msg, args, None)
+
+
+class TestLogging:
+    def test_next_month(self):
+        def ts(*args: int) -> float:
+            return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+        assert _next_month(ts(2026, 3, 31, 23, 59)) == ts(2026, 4, 1)
+        assert _next_month(ts(2026, 12, 15)) == ts(2027, 1, 1)
+
+    def test_rollover_compares_timestamps(self, tmp_path):
+        handler = _MonthlyRotatingHandler(str(tmp_path), encoding="utf-8")
+        try:
+            record = _record("x")
+            assert not handler.shouldRollover(record)
+            record.created = handler.rolloverAt
+            assert handler.shouldRollover(record)
+        finally:
+            handler.close()
+
+    def test_json_formatter(self):
+        formatter = JsonFormatter()
+        report = json.loads(formatter.format(_record(json.dumps({"portfolio_value": 1.5}))))
+        assert report["data"] == {"portfolio_value": 1.5}
+        assert report["time"].endswith("Z")
+        text = json.loads(formatter.format(_record("Selling %d of %s", 2, "AAPL")))
+        assert text["message"] == "Selling 2 of AAPL"
+
+    def test_records_written_by_listener_thread(self, tmp_path, monkeypatch):
+        threads = []
+        original_emit = _MonthlyRotatingHandler.emit
+
+        def emit(self, record):
+            threads.append(threading.current_thread().name)
+            original_emit(self, record)
+
+        monkeypatch.setattr(_MonthlyRotatingHandler, "emit", emit)
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        try:
+            logger = utils.setup_logger(str(tmp_path), json_format=True)
+            logger.info(json.dumps({"trade": {"symbol": "AAPL"}}))
+            utils._stop_listener()  # flushes
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        assert threads and threading.current_thread().name not in threads
+        (log_file,) = tmp_path.iterdir()
+        assert json.loads(log_file.read_text())["data"] == {"trade": {"symbol": "AAPL"}}